@@ -1,22 +1,49 @@
-import copy
-from typing import List, Set, Optional, Dict, TYPE_CHECKING
+import heapq
+import functools
+import numpy as np
+from contextlib import contextmanager
+from multiprocessing.pool import Pool
+from multiprocessing.shared_memory import SharedMemory
+from typing import List, Set, Optional, Dict, Tuple, Iterator, Any, \
+        Callable, TypeVar, TYPE_CHECKING
 if TYPE_CHECKING:
     from flitsr.args import Args
-from flitsr.spectrum import Spectrum
+from flitsr.spectrum import Spectrum, SpectrumView, Outcome
 from flitsr.errors import warning
-from flitsr.ranking import Ranking, Tiebrk, set_orig, unset_orig
+from flitsr.shared import write_segment, read_segment
+from flitsr.ranking import Ranking, Rank, Tiebrk, set_orig, unset_orig, \
+        get_orig
 from flitsr.advanced.ranker import Ranker
 from flitsr.advanced.sbfl import SBFL
-from flitsr.suspicious import Suspicious
+from flitsr.suspicious import Suspicious, VectorSuspicious, depends_on_tf
 from flitsr.advanced.attributes import existing, choices, print_name
 from flitsr import advanced
-from deprecated.sphinx import versionchanged
+from deprecated.sphinx import versionchanged, versionadded
+
+_T = TypeVar('_T')
+
+
+def _sharing_workers(compute_bases: Callable[..., _T]) -> Callable[..., _T]:
+    """
+    Decorate the `compute_bases` method of a flitsr ranker so that all of its
+    flitsr runs share the same worker processes (see `Flitsr._component_runs`).
+    """
+    @functools.wraps(compute_bases)
+    def wrapper(self: 'Flitsr', spectrum: Spectrum, formula: str) -> _T:
+        with self._component_runs(spectrum):
+            return compute_bases(self, spectrum, formula)
+    return wrapper
 
 
 class Flitsr(Ranker):
     """
     Run the main FLITSR algorithm over the spectrum to produce ranked lists.
     """
+    # The gap left in the scores between consecutive bases
+    _basis_gap = 0
+
+    @versionchanged(version='2.6.0',
+                    reason='Added the `workers` optional argument')
     @versionchanged(version='2.4.0',
                     reason='Added the `default_metric` optional argument')
     @existing('tiebrk')
@@ -26,8 +53,20 @@ class Flitsr(Ranker):
     @choices('default_metric', Suspicious.getNames(all_names=True))
     def __init__(self, args: Optional['Args'] = None,
                  internal_ranking: str = 'auto', tiebrk: Tiebrk = Tiebrk.ORIG,
-                 default_metric: str = 'ochiai'):
+                 default_metric: str = 'ochiai', workers: int = 1):
+        """
+        Constructs a `Flitsr` ranker. If `workers` is more than one, the
+        failing tests are partitioned into independent components (see
+        `Spectrum.failure_components
+        <flitsr.spectrum.Spectrum.failure_components>`), and flitsr is run
+        over each component in a pool of `workers` processes (see
+        `Flitsr.flitsr`). This is only done for metrics that do not depend on
+        the number of failing tests (see `depends_on_tf
+        <flitsr.suspicious.depends_on_tf>`), so that the ranking is the same
+        for any number of workers.
+        """
         self.tiebrk = tiebrk
+        self.workers = workers
         if (args is None):
             from flitsr.args import Args
             self.args = Args()
@@ -36,6 +75,39 @@ class Flitsr(Ranker):
         self.order_method = internal_ranking
         self.default_metric = default_metric
         self._cached_metrics: Dict[str, Ranker] = dict()
+        self._sbfl: Optional[SBFL] = None
+        self._components: Optional[_ComponentPool] = None
+
+    def __getstate__(self) -> Dict[str, Any]:
+        """
+        The global arguments cannot be pickled, and are not needed by the
+        worker processes of `Flitsr.flitsr_components`, which only rank with
+        the (already created) SBFL ranker of this ranker.
+        """
+        state = dict(self.__dict__)
+        state['args'] = None
+        state['_cached_metrics'] = {}
+        state['_components'] = None
+        return state
+
+    @contextmanager
+    def _component_runs(self, spectrum: Spectrum) -> Iterator[None]:
+        """
+        Share the pool of worker processes of `Flitsr.flitsr_components`
+        (started when first needed) between all of the flitsr runs over the
+        spectrum (or snapshots of it with tests and groups removed) within
+        this context, along with the copy of the spectrum in shared memory
+        that the workers attach to.
+        """
+        if (self._components is not None):
+            yield
+            return
+        self._components = _ComponentPool(spectrum)
+        try:
+            yield
+        finally:
+            self._components.close()
+            self._components = None
 
     def remove_faulty_elements(self, spectrum: Spectrum,
                                tests_removed: Set[Spectrum.Test],
@@ -49,48 +121,210 @@ class Flitsr(Ranker):
                     break
         tests_removed.difference_update(toRemove)
 
-    def run_metric(self, spectrum: Spectrum, formula: str) -> Ranking:
+    def _metric_ranker(self, formula: str) -> Tuple[Ranker, str]:
+        """
+        Return the ranker to use for the given formula, along with the base
+        metric to rank with.
+        """
         if (formula.upper() in self._cached_metrics):
             ranker = self._cached_metrics[formula.upper()]
-            ranking = ranker.rank(spectrum, self.default_metric)
+            return ranker, self.default_metric
         elif (hasattr(advanced.RankerType, formula.upper())):
             ranker_args = self.args.get_arg_group(formula)
             ranker = advanced.RankerType[formula.upper()].value(**ranker_args)
             self._cached_metrics[formula.upper()] = ranker
             # set the default metric
-            ranking = ranker.rank(spectrum, self.default_metric)
+            return ranker, self.default_metric
         else:
-            sbfl_args = self.args.get_arg_group('SBFL')
-            ranking = SBFL(**sbfl_args).rank(spectrum, formula)
-        return ranking
+            if (self._sbfl is None):
+                sbfl_args = self.args.get_arg_group('SBFL')
+                self._sbfl = SBFL(**sbfl_args)
+            return self._sbfl, formula
+
+    def run_metric(self, spectrum: Spectrum, formula: str) -> Ranking:
+        ranker, metric = self._metric_ranker(formula)
+        return ranker.rank(spectrum, metric)
 
+    @versionadded(version='2.6.0')
+    def iter_metric(self, spectrum: Spectrum, formula: str) -> Iterator[Rank]:
+        """
+        Lazily rank the spectrum using the given formula, yielding the same
+        ranks as `run_metric` (see `Ranker.iter_rank
+        <flitsr.advanced.ranker.Ranker.iter_rank>`).
+        """
+        ranker, metric = self._metric_ranker(formula)
+        return ranker.iter_rank(spectrum, metric)
+
+    @versionchanged(version='2.6.0', reason='Only ranks as much of the '
+                    'spectrum as is needed at each step, runs iteratively '
+                    'instead of recursively, and optionally runs over the '
+                    'independent failure components in parallel')
     def flitsr(self, spectrum: Spectrum,
                formula: str) -> List[Spectrum.Entity]:
         """
-        Executes the recursive flitsr algorithm to identify faulty elements
+        Executes the flitsr algorithm to identify faulty elements. Each step
+        of the algorithm picks the highest ranked element that explains some
+        of the remaining failing tests, and removes these tests. Once all
+        failing tests are explained, the steps are unwound in reverse order,
+        keeping each element that still explains tests that are not executed
+        by any of the faulty elements identified in later steps.
+
+        If this ranker has more than one worker, the metric does not depend
+        on the number of failing tests, and the failing tests form more than
+        one independent component, the algorithm is instead run over each
+        component in parallel (see `Flitsr.flitsr_components`).
         """
-        if (spectrum.tf == 0):
-            return []
-        ranking = self.run_metric(spectrum, formula)
-        r_iter = iter(ranking)
-        entity = next(r_iter).entity
-        tests_removed = spectrum.get_tests(entity, only_failing=True,
+        if (self.workers > 1 and spectrum.tf > 1 and
+                not depends_on_tf(formula)):
+            components = spectrum.failure_components()
+            if (len(components) > 1):
+                basis = self.flitsr_components(spectrum, formula, components)
+                if (basis is not None):
+                    return basis
+        return self._unwind(spectrum, self._flitsr_steps(spectrum, formula))
+
+    def _flitsr_steps(self, spectrum: Spectrum, formula: str) \
+            -> List[Tuple[Rank, Set[Spectrum.Test]]]:
+        """
+        Perform the steps of the flitsr algorithm until all failing tests are
+        explained, returning the (rank of the) element picked and the tests
+        removed by each step, in the order of the steps.
+        """
+        steps: List[Tuple[Rank, Set[Spectrum.Test]]] = []
+        live = (_LiveRanking.create(spectrum, formula,
+                                    self._metric_ranker(formula)[0])
+                if (spectrum.tf != 0) else None)
+        while (spectrum.tf != 0):
+            if (live is not None):
+                r_iter = live.ranks()
+            else:
+                r_iter = self.iter_metric(spectrum, formula)
+            tf = spectrum.tf
+            step = self._flitsr_step(spectrum, r_iter)
+            if (step is None):
+                break
+            steps.append(step)
+            if (spectrum.tf >= tf):  # the step made no progress
+                warning("flitsr found", spectrum.tf,
+                        "failing test(s) that it could not explain")
+                break
+        return steps
+
+    def _unwind(self, spectrum: Spectrum,
+                steps: List[Tuple[Rank, Set[Spectrum.Test]]]) \
+            -> List[Spectrum.Entity]:
+        """
+        Unwind the given flitsr steps (latest first), consuming them, and
+        return the faulty elements identified.
+        """
+        return [rank.entity for rank, kept in self._unwind_steps(spectrum,
+                                                                 steps)
+                if kept]
+
+    def _unwind_steps(self, spectrum: Spectrum,
+                      steps: List[Tuple[Rank, Set[Spectrum.Test]]]) \
+            -> Iterator[Tuple[Rank, bool]]:
+        """
+        Unwind the given flitsr steps (latest first), consuming them, and
+        yield the rank of each step along with whether its element is kept
+        as a faulty element.
+        """
+        faulty: List[Spectrum.Entity] = []
+        while (steps):
+            rank, tests_removed = steps.pop()
+            self.remove_faulty_elements(spectrum, tests_removed, faulty)
+            kept = len(tests_removed) > 0
+            if (kept):
+                faulty.append(rank.entity)
+            yield rank, kept
+
+    @versionadded(version='2.6.0')
+    def flitsr_components(self, spectrum: Spectrum, formula: str,
+                          components: List[List[Spectrum.Test]]) \
+            -> Optional[List[Spectrum.Entity]]:
+        """
+        Run the flitsr algorithm (see `Flitsr.flitsr`) over each of the given
+        independent components of failing tests in a pool of processes, and
+        merge the resulting bases. Each component is run over the spectrum
+        with only its own failing tests. The steps of all components are then
+        interleaved in the order that a single run over the whole spectrum
+        would pick their elements in, and the merged basis is unwound from
+        them. The metric must not depend on the number of failing tests (see
+        `depends_on_tf <flitsr.suspicious.depends_on_tf>`), in which case this
+        gives exactly the same basis as `Flitsr.flitsr`. The spectrum itself
+        is not changed.
+
+        Args:
+          spectrum: Spectrum: The spectrum to run flitsr over.
+          formula: str: The (base) metric to use.
+          components: List[List[Spectrum.Test]]: The independent components
+            of the failing tests (see `Spectrum.failure_components
+            <flitsr.spectrum.Spectrum.failure_components>`).
+
+        Returns:
+          The merged basis, or None if the original ranking (used for
+          tie-breaking) cannot be shared with the worker processes.
+        """
+        if (self._components is None):
+            with self._component_runs(spectrum):
+                return self.flitsr_components(spectrum, formula, components)
+        explained = [c for c in components
+                     if (spectrum.executes_any_group(c[0]))]
+        picks: List[List[Tuple[int, Tuple[Any, ...], bool]]] = []
+        if (len(explained) > 0):
+            if (self._components.pool is None):
+                orig = get_orig()
+                orig_ranks = None
+                if (orig is not None):
+                    if (not all(isinstance(r.entity, Spectrum.Group)
+                                for r in orig)):
+                        return None
+                    orig_ranks = [(r.entity.index(), r.score, r.exec)
+                                  for r in orig]
+                # create the SBFL ranker that is sent to the workers
+                self._metric_ranker(formula)
+                self._components.start(self, orig_ranks)
+            passing = np.array([t.index for t in spectrum.tests()
+                                if t.outcome is Outcome.PASSED],
+                               dtype=np.int64)
+            active = np.array([g.index() for g in spectrum.groups()],
+                              dtype=np.int64)
+            run = self._components.next_run(passing, active)
+            picks = self._components.pool.map(
+                    _component_picks, [(run, [t.index for t in c], formula)
+                                       for c in explained])
+        if (len(explained) < len(components)):
+            warning("flitsr found", spectrum.tf-sum(map(len, explained)),
+                    "failing test(s) that it could not explain")
+        # a single run picks the highest ranked of the next picks of each
+        # component, and unwinds the picks in reverse
+        groups = {g.index(): g for g in spectrum.groups()}
+        merged = heapq.merge(*picks, key=lambda pick: pick[1])
+        return [groups[i] for i, _, kept in reversed(list(merged)) if kept]
+
+    def _flitsr_step(self, spectrum: Spectrum, r_iter: Iterator[Rank]) -> \
+            Optional[Tuple[Rank, Set[Spectrum.Test]]]:
+        """
+        Perform a single step of the flitsr algorithm, removing the failing
+        tests executed by the highest ranked element (from the ranks given by
+        `r_iter`) that executes any. Returns the rank of the element and its
+        removed tests, or None if no element explains the remaining failing
+        tests.
+        """
+        rank = next(r_iter)
+        tests_removed = spectrum.get_tests(rank.entity, only_failing=True,
                                            remove=True, bucket='flitsr')
         while (len(tests_removed) == 0):  # sanity check
             if ((s2 := next(r_iter, None)) is None):
                 count_non_removed = len(spectrum.failing())
                 warning("flitsr found", count_non_removed,
                         "failing test(s) that it could not explain")
-                return []
+                return None
             # continue trying the next element if available
-            entity = s2.entity
-            tests_removed = spectrum.get_tests(entity, only_failing=True,
+            rank = s2
+            tests_removed = spectrum.get_tests(rank.entity, only_failing=True,
                                                remove=True, bucket='flitsr')
-        faulty = self.flitsr(spectrum, formula)
-        self.remove_faulty_elements(spectrum, tests_removed, faulty)
-        if (len(tests_removed) > 0):
-            faulty.append(entity)
-        return faulty
+        return rank, tests_removed
 
     def get_inverse_confidence_scores(self, spectrum: Spectrum, basis:
                                       List[Spectrum.Entity]) -> List[int]:
@@ -101,13 +335,8 @@ class Flitsr(Ranker):
         """
         confs: List[int] = []
         for entity in basis:
-            ts = list(spectrum.get_tests(entity, only_failing=True))
-            possibles: Set[Spectrum.Group] = set()
-            possibles.update(spectrum.get_executed_groups(ts[0]))
-            for test in ts[1:]:
-                possibles.intersection_update(spectrum
-                                              .get_executed_groups(test))
-            confs.append(len(possibles))
+            ts = spectrum.get_tests(entity, only_failing=True)
+            confs.append(len(spectrum.common_executed_groups(ts)))
         return confs
 
     def flitsr_ordering(self, spectrum: Spectrum, basis: List[Spectrum.Entity],
@@ -154,39 +383,355 @@ class Flitsr(Ranker):
         elif (flitsr_order == 'reverse'):
             ordered_basis = list(reversed(basis))
         elif (flitsr_order == 'original'):
-            ordered_basis = [x.entity for x in ranking if x.entity in basis]
+            basis_set = set(basis)
+            ordered_basis = [x.entity for x in ranking
+                             if x.entity in basis_set]
             # add any missing elements
             if (len(ordered_basis) < len(basis)):
-                ordered_basis.extend([e for e in basis if e not in ordered_basis])
+                ordered_set = set(ordered_basis)
+                ordered_basis.extend([e for e in basis
+                                      if e not in ordered_set])
         elif (flitsr_order == 'conf'):
             ordered_basis = [x for _, x in sorted(zip(inv_confs, basis),
                                                   key=lambda x: x[0])]
         return ordered_basis
 
-    def rank(self, spectrum: Spectrum, formula: str) -> Ranking:
+    @staticmethod
+    def _score_basis(ranking: Ranking, ordered_basis: List[Spectrum.Entity],
+                     val: int) -> None:
+        """
+        Give the basis elements in the ranking the scores val, val-1, ...,
+        in the order of `ordered_basis`.
+        """
+        positions: Dict[Spectrum.Entity, int] = {}
+        for i, entity in enumerate(ordered_basis):
+            positions.setdefault(entity, i)
+        for x in ranking:
+            if (x.entity in positions):
+                x.score = val - positions[x.entity]
+
+    @versionadded(version='2.6.0')
+    @_sharing_workers
+    def compute_bases(self, spectrum: Spectrum, formula: str) \
+            -> Tuple[Ranking, List[List[Spectrum.Entity]]]:
+        """
+        Run the flitsr algorithm over the spectrum, and return the original
+        ranking along with the bases identified (in the order identified by
+        flitsr). The bases do not depend on the basis ordering strategy, so
+        that rankings for any number of strategies can be produced from them
+        using `rank_bases`.
+
+        Args:
+          spectrum: Spectrum: The spectrum to run flitsr over.
+          formula: str: The (base) metric to use.
+
+        Returns:
+          The original ranking for the given `formula`, and the list of bases
+          (a single basis for flitsr, if it identified any).
+        """
         ranking = self.run_metric(spectrum, formula)
         set_orig(ranking)
-        val = 2**64
         basis = self.flitsr(spectrum, formula)
+        # Reset the coverage matrix and counts
         spectrum.reset(bucket='flitsr')
-        if (not basis == []):
+        unset_orig()
+        return ranking, ([basis] if (basis != []) else [])
+
+    @versionadded(version='2.6.0')
+    def rank_bases(self, spectrum: Spectrum, ranking: Ranking,
+                   bases: List[List[Spectrum.Entity]],
+                   order_method: Optional[str] = None) -> Ranking:
+        """
+        Produce the final flitsr ranking from the original ranking and bases
+        given by `compute_bases`, by ranking the elements of each basis (in
+        turn) at the top of the ranking using the given basis ordering
+        strategy (see `flitsr_ordering`). The given ranking is not changed.
+
+        Args:
+          spectrum: Spectrum: The spectrum that the bases were computed for.
+          ranking: Ranking: The original ranking.
+          bases: List[List[Spectrum.Entity]]: The bases to rank.
+          order_method: Optional[str]:  (Default value = None) The basis
+            ordering strategy, which defaults to the `internal_ranking` given
+            to this technique.
+
+        Returns:
+          The flitsr ranking.
+        """
+        if (order_method is None):
+            order_method = self.order_method
+        set_orig(ranking)
+        ranking = ranking.copy()
+        val = 2**64
+        for basis in bases:
             ordered_basis = self.flitsr_ordering(spectrum, basis, ranking,
-                                                 self.order_method)
-            for x in ranking:
-                if (x.entity in basis):
-                    x.score = val - ordered_basis.index(x.entity)
-            val = val-len(basis)
-        # Reset the coverage matrix and counts
+                                                 order_method)
+            self._score_basis(ranking, ordered_basis, val)
+            val = val-len(basis)-self._basis_gap
         ranking.sort(True)
         unset_orig()
         return ranking
 
+    @versionchanged(version='2.6.0', reason='Split into `compute_bases` and '
+                    '`rank_bases`')
+    def rank(self, spectrum: Spectrum, formula: str) -> Ranking:
+        if (isinstance(spectrum, SpectrumView)):
+            # FLITSR removes (and restores) tests while it runs
+            spectrum = spectrum.snapshot()
+        ranking, bases = self.compute_bases(spectrum, formula)
+        return self.rank_bases(spectrum, ranking, bases)
+
+
+class _LiveRanking:
+    """
+    The SBFL ranking of a spectrum that the flitsr algorithm removes failing
+    tests from, for a metric that does not depend on the number of failing
+    tests (see `depends_on_tf <flitsr.suspicious.depends_on_tf>`). Between
+    the steps of the algorithm, only the groups whose counts changed are
+    rescored. The ranks are kept in a heap (skipping outdated entries), and
+    yielded in exactly the same order as by `SBFL.iter_rank
+    <flitsr.advanced.sbfl.SBFL.iter_rank>`.
+    """
+
+    def __init__(self, spectrum: Spectrum, formula: str,
+                 orig_keys: Optional[List[Tuple[Any, ...]]]):
+        self._spectrum = spectrum
+        self._formula = formula
+        self._groups = spectrum.groups()
+        # the (negated) tie-break keys from the original ranking, which do not
+        # change, otherwise the execution counts are used
+        self._orig_keys = orig_keys
+        self._ef: Optional[np.ndarray] = None
+        self._entries: List[Tuple[Any, ...]] = []
+        self._heap: List[Tuple[Any, ...]] = []
+        self._popped: List[Tuple[Any, ...]] = []
+
+    @staticmethod
+    def create(spectrum: Spectrum, formula: str,
+               ranker: Ranker) -> Optional['_LiveRanking']:
+        """
+        Return a live ranking of the spectrum for the given formula, if the
+        ranker is a plain (deterministic) SBFL ranker and the formula does
+        not depend on the number of failing tests, otherwise None. In the
+        latter case all groups must be rescored at each step anyway, which
+        is faster using `SBFL.iter_rank <flitsr.advanced.sbfl.SBFL.iter_rank>`
+        directly.
+        """
+        if (type(ranker) is not SBFL or ranker.tiebrk == Tiebrk.RNDM or
+                depends_on_tf(formula)):
+            return None
+        orig_keys = None
+        orig = get_orig()
+        if (ranker.tiebrk == Tiebrk.ORIG and orig is not None):
+            try:
+                origs = [orig.get_rank(g, True) for g in spectrum.groups()]
+            except KeyError:
+                # let the ranking itself report the failure
+                return None
+            orig_keys = [(-o.score, -o.exec) for o in origs]
+        return _LiveRanking(spectrum, formula, orig_keys)
+
+    def _update(self) -> None:
+        """ Rescore the groups whose counts changed since the last update """
+        ef, ep, nf, np_ = self._spectrum.counts()
+        first = self._ef is None
+        if (first):
+            changed = np.arange(len(ef))
+        else:
+            changed = np.flatnonzero(ef != self._ef)
+        self._ef = ef
+        vsus = VectorSuspicious(ef[changed], ep[changed], nf[changed],
+                                np_[changed])
+        scores = Suspicious._scores(self._spectrum, vsus, self._formula)
+        exe = (vsus.ef + vsus.ep).tolist()
+        if (first):
+            self._entries = [self._entry(i, score, exe_count) for i, score,
+                             exe_count in zip(range(len(ef)), scores, exe)]
+            self._heap = list(self._entries)
+            heapq.heapify(self._heap)
+            return
+        for entry in self._popped:  # restore the popped ranks
+            heapq.heappush(self._heap, entry)
+        self._popped = []
+        for i, score, exe_count in zip(changed.tolist(), scores, exe):
+            entry = self._entries[i] = self._entry(i, score, exe_count)
+            heapq.heappush(self._heap, entry)
+
+    def _entry(self, i: int, score: Any, exe_count: int) -> Tuple[Any, ...]:
+        """
+        Return the heap entry for the i-th group, which orders the same as
+        `Ranking.sort <flitsr.ranking.Ranking.sort>`, followed by the group's
+        position, score and execution count.
+        """
+        if (self._orig_keys is not None):
+            return (-score,) + self._orig_keys[i] + (i, score, exe_count)
+        return (-score, -exe_count, i, score, exe_count)
+
+    def ranks(self) -> Iterator[Rank]:
+        """
+        Return an iterator over the current ranking of the spectrum. Only
+        the ranks of the latest iterator are valid.
+        """
+        self._update()
+        return self._iter_ranks()
+
+    def _iter_ranks(self) -> Iterator[Rank]:
+        while (self._heap):
+            entry = heapq.heappop(self._heap)
+            i, score, exe_count = entry[-3:]
+            if (entry is not self._entries[i]):  # outdated
+                continue
+            self._popped.append(entry)
+            yield Rank(self._groups[i], score, exe_count)
+
+
+class _ComponentPool:
+    """
+    The pool of worker processes used by `Flitsr.flitsr_components` within
+    `Flitsr._component_runs`, along with the spectrum they attach to (from
+    shared memory). The pool is only started when it is first needed.
+    """
+
+    def __init__(self, spectrum: Spectrum):
+        self._spectrum = spectrum
+        self._runs = 0
+        self._run_segment: Optional[SharedMemory] = None
+        self.pool: Optional[Pool] = None
+
+    def start(self, ranker: Flitsr,
+              orig_ranks: Optional[List[Tuple[int, Any, int]]]) -> None:
+        """
+        Place the spectrum in shared memory, and start the worker processes
+        with the given ranker and original ranking.
+        """
+        name = self._spectrum.to_shared()
+        self.pool = Pool(ranker.workers, initializer=_init_component_worker,
+                         initargs=(name, orig_ranks, ranker))
+
+    def next_run(self, passing: np.ndarray,
+                 active: np.ndarray) -> Tuple[int, str]:
+        """
+        Place the indices of the `passing` tests and `active` groups of a new
+        flitsr run in shared memory (replacing those of the previous run), so
+        that each worker process only reads them once per run. Returns the
+        identifier of the run and the name of its shared memory segment.
+        """
+        self._release_run()
+        self._runs += 1
+        self._run_segment = write_segment(None, {'passing': passing,
+                                                 'active': active})
+        return self._runs, self._run_segment.name
+
+    def _release_run(self) -> None:
+        if (self._run_segment is not None):
+            self._run_segment.close()
+            self._run_segment.unlink()
+            self._run_segment = None
+
+    def close(self) -> None:
+        """ Stop the worker processes and free the shared memory """
+        if (self.pool is not None):
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+            self._spectrum.release_shared()
+        self._release_run()
+
+
+# The spectrum, original ranking and ranker of each worker process used by
+# `Flitsr.flitsr_components`, along with the spectrum of the latest run
+_component_state: Dict[str, Any] = {}
+
+
+def _init_component_worker(name: str,
+                           orig_ranks: Optional[List[Tuple[int, Any, int]]],
+                           ranker: Flitsr) -> None:
+    """
+    Attach to the shared spectrum of `Flitsr.flitsr_components`, and set the
+    original ranking and the ranker (a copy of the parent's) for the worker
+    process.
+    """
+    spectrum = Spectrum.attach(name)
+    groups = spectrum.groups()
+    _component_state['tests'] = {t.index: t for t in spectrum.failing()}
+    if (orig_ranks is not None):
+        orig = Ranking(ranker.tiebrk)
+        orig.extend([Rank(groups[i], score, exe)
+                     for i, score, exe in orig_ranks])
+        set_orig(orig)
+    _component_state['spectrum'] = spectrum
+    _component_state['run'] = None
+    _component_state['ranker'] = ranker
+
+
+def _run_spectrum(run: int, name: str) -> Spectrum:
+    """
+    Return the shared spectrum with only the passing tests and active groups
+    of the given flitsr run (read from the shared memory segment with the
+    given name, see `_ComponentPool.next_run`), and none of its failing tests
+    (which are added back for each component by `_component_picks`). The
+    spectrum is only built once per run in each worker process.
+    """
+    if (_component_state['run'] != run):
+        _, arrays = read_segment(name)
+        passing = set(arrays['passing'].tolist())
+        active = set(arrays['active'].tolist())
+        del arrays
+        spectrum = _component_state['spectrum'].snapshot()
+        for test in spectrum.tests():
+            if (test.index not in passing):
+                spectrum.remove_test(test, bucket='components')
+        spectrum.retain_groups([g for g in spectrum.groups()
+                                if g.index() in active], bucket='groups')
+        _component_state['run'] = run
+        _component_state['run_spectrum'] = spectrum
+    return _component_state['run_spectrum']
+
+
+def _component_picks(task: Tuple[Tuple[int, str], List[int], str]) \
+        -> List[Tuple[int, Tuple[Any, ...], bool]]:
+    """
+    Run the flitsr algorithm over the given component of failing tests, and
+    return the index of the group picked by each step (in order), along with
+    its key in the ranking at the time, and whether it is kept in the basis.
+    """
+    run, tests, formula = task
+    spectrum = _run_spectrum(*run).snapshot()
+    for test in tests:
+        spectrum.reset_single_test(_component_state['tests'][test],
+                                   bucket='components')
+    # only the groups of the component can be picked, and the scores of the
+    # groups do not depend on each other, so the rest need not be ranked
+    spectrum.retain_groups(set().union(*(spectrum.get_executed_groups(t)
+                                         for t in spectrum.failing())),
+                           bucket='components')
+    ranker: Flitsr = _component_state['ranker']
+    steps = ranker._flitsr_steps(spectrum, formula)
+    # whether each step is kept (not each element, as the same element can
+    # be picked by more than one step)
+    unwound = list(ranker._unwind_steps(spectrum, steps))[::-1]
+    orig = get_orig()
+    tiebrk = getattr(ranker._metric_ranker(formula)[0], 'tiebrk', None)
+    picks = []
+    for rank, kept in unwound:
+        # the same keys as the ranking is sorted by (see `Ranking.sort`)
+        if (tiebrk == Tiebrk.ORIG and orig is not None):
+            o = orig.get_rank(rank.entity, True)
+            key: Tuple[Any, ...] = (-rank.score, -o.score, -o.exec)
+        else:
+            key = (-rank.score, -rank.exec)
+        index = rank.entity.index()
+        picks.append((index, key + (index,), kept))
+    return picks
+
 
 @print_name('flitsr_multi')
 class Multi(Flitsr):
     """
     Run the FLITSR* algorithm over the spectrum to produce ranked lists.
     """
+    _basis_gap = 1
+
     @versionchanged(version='2.4.0',
                     reason='Added the `cutoff` optional argument')
     @existing('args')
@@ -199,6 +744,8 @@ class Multi(Flitsr):
         super().__init__(**flitsr_opts)
         self.cutoff = cutoff
 
+    @versionchanged(version='2.6.0', reason='Checks the tests against the '
+                    'remaining groups using bitmasks')
     def multiRemove(self, spectrum: Spectrum,
                     faulty: List[Spectrum.Entity]) -> bool:
         """
@@ -221,32 +768,31 @@ class Multi(Flitsr):
 
         multiFault = False
         for test in executing:
-            for group in spectrum.groups():  # remaining groups not in faulty
-                if (spectrum[test][group]):
-                    break
-            else:
+            # check the remaining groups (not in faulty)
+            if (not spectrum.executes_any_group(test)):
                 multiFault = True
                 spectrum.remove_test(test, bucket='multi')
         return multiFault
 
-    def rank(self, spectrum: Spectrum, formula: str) -> Ranking:
+    @versionadded(version='2.6.0')
+    @_sharing_workers
+    def compute_bases(self, spectrum: Spectrum, formula: str) \
+            -> Tuple[Ranking, List[List[Spectrum.Entity]]]:
+        """
+        Run the FLITSR* algorithm over the spectrum, and return the original
+        ranking along with the bases identified by each iteration (see
+        `Flitsr.compute_bases`).
+        """
         ranking = self.run_metric(spectrum, formula)
         set_orig(ranking)
-        val = 2**64
-        i = 1
-        newSpectrum = copy.deepcopy(spectrum)
+        bases: List[List[Spectrum.Entity]] = []
+        newSpectrum = spectrum.snapshot()
         while (newSpectrum.tf > 0 and
-               (self.cutoff is None or i <= self.cutoff)):
+               (self.cutoff is None or len(bases) < self.cutoff)):
             basis = self.flitsr(newSpectrum, formula)
-            if (not basis == []):
-                ordered_basis = self.flitsr_ordering(spectrum, basis, ranking,
-                                                     self.order_method)
-                for x in ranking:
-                    if (x.entity in basis):
-                        x.score = val - ordered_basis.index(x.entity)
-                val = val-len(basis)
-            else:  # (fall-back) finish FLITSR* if basis is empty
+            if (basis == []):  # (fall-back) finish FLITSR* if basis is empty
                 break
+            bases.append(basis)
             # Reset the coverage matrix and counts
             newSpectrum.reset(bucket='flitsr')
             # Next iteration can be either multi-fault, or multi-explanation
@@ -254,8 +800,9 @@ class Multi(Flitsr):
             # multi-explanation -> we assume there are multiple explanations
             # for the same faults
             self.multiRemove(newSpectrum, basis)
-            val = val-1
-            i += 1
-        ranking.sort(True)
         unset_orig()
-        return ranking
+        return ranking, bases
+
+    def rank(self, spectrum: Spectrum, formula: str) -> Ranking:
+        ranking, bases = self.compute_bases(spectrum, formula)
+        return self.rank_bases(spectrum, ranking, bases)
@@ -1,6 +1,5 @@
 import subprocess
 import re
-import copy
 import os
 from typing import List
 import tempfile
@@ -72,7 +71,7 @@ class Parallel(Cluster):
         partitions = re.split("partition \\d+\n", output)[1:]
         spectrums: List[Spectrum] = []
         for partition in partitions:
-            new_spectrum = copy.deepcopy(spectrum)
+            new_spectrum = spectrum.snapshot()
             tests = [int(i) for i in partition.strip().split("\n")]
             toRemove = set()
             all_tests = spectrum.tests()
@@ -1,7 +1,10 @@
 from __future__ import annotations
 from abc import ABC, abstractmethod
+from itertools import islice
+from typing import Dict, Iterable, Iterator
+from deprecated.sphinx import versionadded
 from flitsr.spectrum import Spectrum
-from flitsr.ranking import Ranking
+from flitsr.ranking import Ranking, Rank
 from flitsr import advanced
 
 
@@ -31,5 +34,64 @@ class Ranker(ABC):
         """
         pass
 
+    @versionadded(version='2.6.0')
+    def rank_all(self, spectrum: Spectrum,
+                 base_metrics: Iterable[str]) -> Dict[str, Ranking]:
+        """
+        Rank the `spectrum` once for each of the given base metrics (see
+        `rank`). Techniques that can share work between the metrics should
+        override this method.
+
+        Args:
+          spectrum: Spectrum: The spectrum whose elements to rank
+          base_metrics: The names of the SBFL metrics to rank with.
+
+        Returns:
+          A dictionary containing the `Ranking <flitsr.ranking.Ranking>`
+          produced for each base metric.
+        """
+        return {metric: self.rank(spectrum, metric) for metric in base_metrics}
+
+    @versionadded(version='2.6.0')
+    def iter_rank(self, spectrum: Spectrum,
+                  base_metric: str) -> Iterator[Rank]:
+        """
+        Lazily rank the `spectrum`, yielding the same ranks in the same order
+        as the `Ranking <flitsr.ranking.Ranking>` given by `rank`. Techniques
+        that can avoid ranking the whole spectrum when only the first ranks
+        are consumed should override this method. The spectrum may be changed
+        while iterating, without affecting the ranks yielded.
+
+        Args:
+          spectrum: Spectrum: The spectrum whose elements to rank
+          base_metric: str: The name of the SBFL metric to optionally use
+            within the technique to rank the elements.
+
+        Returns:
+          An iterator over the ranks of the elements in the `spectrum`.
+        """
+        return iter(self.rank(spectrum, base_metric))
+
+    @versionadded(version='2.6.0')
+    def top_k(self, spectrum: Spectrum, base_metric: str,
+              k: int) -> Ranking:
+        """
+        Return the first `k` ranks of the `Ranking <flitsr.ranking.Ranking>`
+        given by `rank` (see `iter_rank`).
+
+        Args:
+          spectrum: Spectrum: The spectrum whose elements to rank
+          base_metric: str: The name of the SBFL metric to optionally use
+            within the technique to rank the elements.
+          k: int: The number of ranks to return.
+
+        Returns:
+          A `Ranking <flitsr.ranking.Ranking>` of (at most) the `k` highest
+          ranked elements in the `spectrum`.
+        """
+        ranking = Ranking()
+        ranking.extend(list(islice(self.iter_rank(spectrum, base_metric), k)))
+        return ranking
+
     def __init_subclass__(cls) -> None:
         advanced.register_ranker(cls)
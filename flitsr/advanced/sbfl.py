@@ -1,8 +1,11 @@
-from flitsr.ranking import Ranking, Tiebrk
+from typing import Dict, Iterable, Iterator
+from flitsr.ranking import Ranking, Rank, Tiebrk, cached_ranking, \
+        cache_ranking
 from flitsr.advanced.ranker import Ranker
 from flitsr.advanced.attributes import existing, print_name
 from flitsr.spectrum import Spectrum
 from flitsr.suspicious import Suspicious
+from deprecated.sphinx import versionchanged
 
 
 @print_name('base')
@@ -18,6 +21,24 @@ class SBFL(Ranker):
     def __init__(self, tiebrk: Tiebrk = Tiebrk.ORIG):
         self.tiebrk = tiebrk
 
+    @versionchanged(version='2.6.0', reason='Uses the ranking cache (see '
+                    '`flitsr.ranking.ranking_cache`)')
     def rank(self, spectrum: Spectrum, base_metric: str) -> Ranking:
-        return Suspicious.apply_formula(spectrum, base_metric,
-                                        tiebrk=self.tiebrk)
+        return cached_ranking(spectrum, base_metric, self.tiebrk,
+                              lambda: Suspicious.apply_formula(
+                                  spectrum, base_metric, tiebrk=self.tiebrk))
+
+    @versionchanged(version='2.6.0', reason='Adds the rankings to the ranking '
+                    'cache (see `flitsr.ranking.ranking_cache`)')
+    def rank_all(self, spectrum: Spectrum,
+                 base_metrics: Iterable[str]) -> Dict[str, Ranking]:
+        rankings = Suspicious.apply_formulas(spectrum, base_metrics,
+                                             tiebrk=self.tiebrk)
+        for metric, ranking in rankings.items():
+            cache_ranking(spectrum, metric, ranking)
+        return rankings
+
+    def iter_rank(self, spectrum: Spectrum,
+                  base_metric: str) -> Iterator[Rank]:
+        return Suspicious.iter_formula(spectrum, base_metric,
+                                       tiebrk=self.tiebrk)
@@ -18,6 +18,8 @@ from flitsr.ranking import Tiebrk
 from flitsr import advanced
 from flitsr.advanced import Config
 from flitsr.input.duplicates import DuplicateStrategy
+from flitsr.coverage import CoverageType
+from flitsr.metric_expressions import parse_metric_arg
 from flitsr.calculations import BUModel, calcs_base
 
 
@@ -436,6 +438,18 @@ class Args(argparse.Namespace, metaclass=SingletonMeta):
                 'given advanced technique is compatible with the FLITSR (or '
                 'similar) algorithm, as this is not ensured for all advanced '
                 'types.')
+        parser.add_argument('--metric-expr', dest='metric_exprs',
+                action='append', type=parse_metric_arg,
+                metavar='NAME=EXPR',
+                help='Defines a new metric with the given NAME, which is '
+                'computed by the arithmetic expression EXPR over the counts ef, '
+                'ep, nf, np, tf and tp (e.g. "ef/sqrt(tf*(ef+ep))"), and runs '
+                'it along with any metrics given by --metric. Expressions may '
+                'use the operators +, -, *, / and **, and the functions '
+                'sqrt, log, log2, log10, exp, abs, min and max. Divisions '
+                'where the numerator is zero give zero, and otherwise '
+                'divisions by zero give infinity. Option may be supplied '
+                'multiple times to define multiple metrics.')
         parser.add_argument('-r', '--ranking', action='store_true',
                 help='Changes FLITSR\'s expected input to be an SBFL ranking in '
                 'Gzoltar or FLITSR format (determined automatically), instead of '
@@ -463,6 +477,15 @@ class Args(argparse.Namespace, metaclass=SingletonMeta):
                 'duplicate elements in the spectrum, merging their spectra. '
                 'REFUSE: Raise an exception if any duplicate elements are '
                 'encountered when reading in the spectrum.')
+        parser.add_argument('--coverage', dest='coverage_type',
+                default=CoverageType.AUTO, choices=list(CoverageType),
+                type=CoverageType.from_string,
+                help='Specify how the coverage matrix of the spectrum is '
+                'stored. DENSE: Bit vectors in memory. SPARSE: Compressed '
+                'sparse rows and columns in memory. AUTO: Use SPARSE for very '
+                'large, low density spectra, and DENSE otherwise. MMAP: Bit '
+                'vectors in memory-mapped temporary files (in $TMPDIR), which '
+                'are paged in from disk on demand (default: %(default)s)')
         parser.add_argument('--split', help='When given, this option causes faults'
                 ' that are a combination of two or more sub-faults in mutually'
                 ' exclusive parts of the system to be split into separate'
@@ -766,8 +789,11 @@ class Args(argparse.Namespace, metaclass=SingletonMeta):
         if (args.metrics is None):
             if (args.all is True):
                 args.metrics = Suspicious.getNames()
+            elif (args.metric_exprs):
+                args.metrics = []
             else:
                 args.metrics = [self._default_metric]
+        args.metrics.extend(args.metric_exprs or [])
         # Set the flitsr types based on 'all' or what is set
         if (args.all is True):
             if (args.types is None):
@@ -1,5 +1,6 @@
 from enum import Enum, auto
-from typing import Optional, Callable, Dict, Any, Set, Union, List
+from typing import Optional, Callable, Dict, Any, Union, List, \
+        Mapping, AbstractSet
 from argparse import ArgumentTypeError
 
 
@@ -43,7 +44,7 @@ class BUModel:
             raise AttributeError(f"type object '{cls.__name__}' has no model "
                                  f"'{model}'")
 
-    def get_dict(self, faults: Dict[Any, Set[Any]]) \
+    def get_dict(self, faults: Mapping[Any, AbstractSet[Any]]) \
             -> Dict[Any, int]:
         func: Callable[[int], int]
         if (self.model is BUModelEnum.PERFECT):  # perfect
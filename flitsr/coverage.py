@@ -0,0 +1,580 @@
+"""
+Storage backends for the coverage matrix of a `Spectrum
+<flitsr.spectrum.Spectrum>`.
+
+The coverage matrix records, for each test (row) and spectral group
+(column), whether the group is executed by the test. Tests and groups are
+addressed by their integer positions in the spectrum. Two backends are
+available: a dense, bit-packed backend (`DenseCoverage`), and a sparse backend
+storing the row and column index arrays (`SparseCoverage`) for very large,
+low density spectra. Dense coverage may also be stored in flat arrays outside
+of Python objects (`PackedCoverage`), for instance in shared memory or in
+memory-mapped files that are paged in from disk on demand.
+"""
+from __future__ import annotations
+from abc import ABC, abstractmethod
+from argparse import ArgumentTypeError
+from enum import Enum, auto
+import tempfile
+from typing import List, Sequence, Tuple, Iterable, Dict, Optional
+from bitarray import bitarray
+from bitarray.util import count_and, any_and
+import numpy as np
+from deprecated.sphinx import versionadded
+
+
+@versionadded(version='2.6.0')
+class CoverageType(Enum):
+    """ The storage backend to use for the coverage of a spectrum. """
+
+    DENSE = auto()
+    """ Bit-packed rows and columns (see `DenseCoverage`). """
+
+    SPARSE = auto()
+    """ Row and column index arrays (see `SparseCoverage`). """
+
+    AUTO = auto()
+    """ Choose between `DENSE` and `SPARSE` based on the coverage density. """
+
+    MMAP = auto()
+    """
+    Bit-packed rows and columns in memory-mapped files (see
+    `PackedCoverage.mapped`), paged in from disk on demand.
+    """
+
+    def __str__(self) -> str:
+        return self.name
+
+    @staticmethod
+    def from_string(s: str) -> 'CoverageType':
+        try:
+            return CoverageType[s]
+        except KeyError:
+            choices = ', '.join(f"'{d}'" for d in list(CoverageType))
+            raise ArgumentTypeError(f"invalid choice: '{s}' "
+                                    f"(choose from {choices})")
+
+
+SPARSE_DENSITY = 1/32
+"""
+The density below which `CoverageType.AUTO` uses sparse coverage. Below this
+density, the two 32-bit index arrays of `SparseCoverage` take less memory than
+the two bit-packed copies of `DenseCoverage`.
+"""
+
+SPARSE_MIN_CELLS = 2**24
+""" The minimum matrix size for `CoverageType.AUTO` to use sparse coverage. """
+
+MMAP_DIR: Optional[str] = None
+"""
+The directory to create the files for `CoverageType.MMAP` coverage in. By
+default, the system's temporary directory is used (see `tempfile`).
+"""
+
+
+@versionadded(version='2.6.0')
+class Coverage(ABC):
+    """
+    A coverage matrix of a fixed number of tests (rows) and groups
+    (columns), addressed by integer position.
+    """
+
+    def __init__(self, num_tests: int, num_groups: int):
+        self.num_tests = num_tests
+        self.num_groups = num_groups
+
+    @abstractmethod
+    def get(self, test: int, group: int) -> bool:
+        """ Return whether `group` is executed by `test`. """
+        pass
+
+    @abstractmethod
+    def set(self, test: int, group: int, executed: bool) -> None:
+        """ Set whether `group` is executed by `test`. """
+        pass
+
+    @abstractmethod
+    def row(self, test: int) -> Sequence[int]:
+        """ Return the (sorted) groups executed by `test`. """
+        pass
+
+    @abstractmethod
+    def rows_and(self, tests: Sequence[int]) -> Sequence[int]:
+        """
+        Return the (sorted) groups executed by all of the given (non-empty)
+        `tests`.
+        """
+        pass
+
+    @abstractmethod
+    def row_bits(self, test: int) -> bitarray:
+        """
+        Return the groups executed by `test` as a bitarray over the groups.
+        The bitarray may be the backend's own storage, and so should not be
+        modified.
+        """
+        pass
+
+    @abstractmethod
+    def column_and(self, group: int, mask: bitarray) -> Iterable[int]:
+        """
+        Return the tests that execute `group` and are set in the test `mask`.
+        """
+        pass
+
+    @abstractmethod
+    def column_counts(self, mask: bitarray) -> np.ndarray:
+        """
+        Return, for every group, the number of tests set in the test `mask`
+        that execute the group.
+        """
+        pass
+
+    @abstractmethod
+    def nnz(self) -> int:
+        """ Return the number of executions in the matrix. """
+        pass
+
+    @abstractmethod
+    def to_dense(self) -> np.ndarray:
+        """ Return the coverage as a dense boolean (tests x groups) array. """
+        pass
+
+    @abstractmethod
+    def copy(self) -> Coverage:
+        """ Return an independent copy of this coverage. """
+        pass
+
+    @abstractmethod
+    def arrays(self) -> Tuple[str, Dict[str, np.ndarray]]:
+        """
+        Return the kind of this coverage along with the flat arrays that
+        store it, from which it can be recreated with `from_arrays`.
+        """
+        pass
+
+    def row_any(self, test: int, mask: bitarray) -> bool:
+        """
+        Return whether `test` executes any of the groups set in the group
+        `mask`.
+        """
+        return any_and(self.row_bits(test), mask)
+
+    def density(self) -> float:
+        """ Return the fraction of the matrix that is executed. """
+        cells = self.num_tests*self.num_groups
+        return self.nnz()/cells if (cells > 0) else 0.0
+
+
+class DenseCoverage(Coverage):
+    """
+    Bit-packed coverage, stored both row-major (one bitarray over the groups
+    per test) and column-major (one bitarray over the tests per group).
+    """
+
+    def __init__(self, rows: Sequence[Iterable[int]], num_groups: int):
+        super().__init__(len(rows), num_groups)
+        self._rows: List[bitarray] = []
+        self._columns = [bitarray(len(rows)) for _ in range(num_groups)]
+        for column in self._columns:
+            column.setall(0)
+        for t, groups in enumerate(rows):
+            bits = bitarray(num_groups)
+            bits.setall(0)
+            for g in groups:
+                bits[g] = 1
+                self._columns[g][t] = 1
+            self._rows.append(bits)
+
+    def get(self, test: int, group: int) -> bool:
+        return bool(self._rows[test][group])
+
+    def set(self, test: int, group: int, executed: bool) -> None:
+        self._rows[test][group] = executed
+        self._columns[group][test] = executed
+
+    def row(self, test: int) -> Sequence[int]:
+        return list(self._rows[test].itersearch(1))
+
+    def rows_and(self, tests: Sequence[int]) -> Sequence[int]:
+        common = self._rows[tests[0]].copy()
+        for t in tests[1:]:
+            common &= self._rows[t]
+        return list(common.itersearch(1))
+
+    def row_bits(self, test: int) -> bitarray:
+        return self._rows[test]
+
+    def column_and(self, group: int, mask: bitarray) -> Iterable[int]:
+        return (self._columns[group] & mask).itersearch(1)
+
+    def column_counts(self, mask: bitarray) -> np.ndarray:
+        return np.array([count_and(column, mask) for column in self._columns],
+                        dtype=np.int64)
+
+    def nnz(self) -> int:
+        return sum(row.count() for row in self._rows)
+
+    def to_dense(self) -> np.ndarray:
+        n_bytes = (self.num_groups + 7) // 8
+        packed = np.frombuffer(b''.join(r.tobytes() for r in self._rows),
+                               dtype=np.uint8)
+        packed = packed.reshape(self.num_tests, n_bytes)
+        endian = self._rows[0].endian() if (self.num_tests > 0) else 'big'
+        return np.unpackbits(packed, axis=1, count=self.num_groups,
+                             bitorder=endian).view(bool)
+
+    def copy(self) -> DenseCoverage:
+        new = object.__new__(DenseCoverage)
+        Coverage.__init__(new, self.num_tests, self.num_groups)
+        new._rows = [row.copy() for row in self._rows]
+        new._columns = [column.copy() for column in self._columns]
+        return new
+
+    def arrays(self) -> Tuple[str, Dict[str, np.ndarray]]:
+        rows = _pack_bits(self._rows, self.num_groups)
+        columns = _pack_bits(self._columns, self.num_tests)
+        return 'packed', {'rows': rows, 'columns': columns}
+
+
+def _pack_bits(bits: Sequence[bitarray], length: int) -> np.ndarray:
+    """ Pack the given bitarrays (of `length` bits) into a big-endian array """
+    packed = np.frombuffer(b''.join(b.tobytes() if b.endian() == 'big' else
+                                    bitarray(b, endian='big').tobytes()
+                                    for b in bits), dtype=np.uint8)
+    return packed.reshape(len(bits), (length + 7) // 8)
+
+
+def _mask_bytes(mask: bitarray) -> np.ndarray:
+    """ Return the given bitarray as a big-endian uint8 array """
+    if (mask.endian() != 'big'):
+        mask = bitarray(mask, endian='big')
+    return np.frombuffer(mask.tobytes(), dtype=np.uint8)
+
+
+def _map_temp(shape: Tuple[int, int],
+              source: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Return a zeroed (or copied from `source`) ``uint8`` array of the given
+    shape, memory-mapped onto an anonymous temporary file in `MMAP_DIR`.
+    """
+    if (shape[0] * shape[1] == 0):  # empty files cannot be mapped
+        return np.zeros(shape, dtype=np.uint8)
+    with tempfile.TemporaryFile(dir=MMAP_DIR) as file:
+        mapped = np.memmap(file, dtype=np.uint8, mode='w+', shape=shape)
+    if (source is not None):
+        for start in range(0, shape[0], PackedCoverage._CHUNK):
+            end = start + PackedCoverage._CHUNK
+            mapped[start:end] = source[start:end]
+    return mapped
+
+
+_POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+class PackedCoverage(Coverage):
+    """
+    Bit-packed coverage stored in two flat, big-endian ``uint8`` arrays; one
+    row-major (tests x groups) and one column-major (groups x tests). The
+    arrays may be views onto memory outside of the Python heap (such as
+    shared memory), and are processed in fixed size chunks so that whole
+    matrix queries need only a bounded amount of additional memory. The
+    groups executed by the most recently looked up rows (at most
+    `_ROW_CACHE`) are cached.
+    """
+    _CHUNK = 4096
+    _ROW_CACHE = 1024
+
+    def __init__(self, rows: np.ndarray, columns: np.ndarray):
+        super().__init__(len(rows), len(columns))
+        self._rows = rows
+        self._columns = columns
+        self._row_cache: Dict[int, np.ndarray] = {}
+
+    @classmethod
+    def mapped(cls, rows: Iterable[Iterable[int]], num_tests: int,
+               num_groups: int) -> PackedCoverage:
+        """
+        Build packed coverage for the given `num_tests` rows (see
+        `build_coverage`) in anonymous temporary files (in `MMAP_DIR`) which
+        are memory-mapped, so that the coverage is written to disk once and
+        afterwards paged in on demand. The rows are consumed one at a time, so
+        when they are given by an iterator only the coverage of a single row
+        is held in memory while the files are written.
+        """
+        row_bits = _map_temp((num_tests, (num_groups + 7) // 8))
+        col_bits = _map_temp((num_groups, (num_tests + 7) // 8))
+        for t, groups in enumerate(rows):
+            g = np.fromiter(groups, dtype=np.int64)
+            if (len(g) > 0):
+                np.bitwise_or.at(row_bits[t], g >> 3,
+                                 (0x80 >> (g & 7)).astype(np.uint8))
+                col_bits[g, t >> 3] |= np.uint8(0x80 >> (t & 7))
+        return cls(row_bits, col_bits)
+
+    def get(self, test: int, group: int) -> bool:
+        if (group < 0 or group >= self.num_groups):
+            raise IndexError("group index out of range")
+        return bool(self._rows[test, group >> 3] & (0x80 >> (group & 7)))
+
+    def set(self, test: int, group: int, executed: bool) -> None:
+        g_bit = np.uint8(0x80 >> (group & 7))
+        t_bit = np.uint8(0x80 >> (test & 7))
+        if (executed):
+            self._rows[test, group >> 3] |= g_bit
+            self._columns[group, test >> 3] |= t_bit
+        else:
+            self._rows[test, group >> 3] &= ~g_bit
+            self._columns[group, test >> 3] &= ~t_bit
+        self._row_cache.pop(test, None)
+
+    def row(self, test: int) -> Sequence[int]:
+        row = self._row_cache.pop(test, None)
+        if (row is None):
+            row = np.flatnonzero(np.unpackbits(self._rows[test],
+                                               count=self.num_groups))
+            row.flags.writeable = False
+            while (len(self._row_cache) >= self._ROW_CACHE):
+                # evict the least recently looked up rows
+                del self._row_cache[next(iter(self._row_cache))]
+        self._row_cache[test] = row
+        return row
+
+    def rows_and(self, tests: Sequence[int]) -> Sequence[int]:
+        common = np.bitwise_and.reduce(self._rows[list(tests)], axis=0)
+        return np.flatnonzero(np.unpackbits(common, count=self.num_groups))
+
+    def row_bits(self, test: int) -> bitarray:
+        bits = bitarray(endian='big')
+        bits.frombytes(self._rows[test].tobytes())
+        del bits[self.num_groups:]
+        return bits
+
+    def column_and(self, group: int, mask: bitarray) -> Iterable[int]:
+        column = self._columns[group] & _mask_bytes(mask)
+        return np.flatnonzero(np.unpackbits(column,
+                                            count=self.num_tests)).tolist()
+
+    def column_counts(self, mask: bitarray) -> np.ndarray:
+        t_mask = _mask_bytes(mask)
+        counts = np.zeros(self.num_groups, dtype=np.int64)
+        for start in range(0, self.num_groups, self._CHUNK):
+            chunk = self._columns[start:start+self._CHUNK] & t_mask
+            counts[start:start+self._CHUNK] = _POPCOUNT[chunk].sum(axis=1)
+        return counts
+
+    def nnz(self) -> int:
+        return sum(int(_POPCOUNT[self._rows[start:start+self._CHUNK]].sum())
+                   for start in range(0, self.num_tests, self._CHUNK))
+
+    def to_dense(self) -> np.ndarray:
+        return np.unpackbits(self._rows, axis=1,
+                             count=self.num_groups).view(bool)
+
+    def copy(self) -> PackedCoverage:
+        if (isinstance(self._rows, np.memmap)):
+            return PackedCoverage(_map_temp(self._rows.shape, self._rows),
+                                  _map_temp(self._columns.shape,
+                                            self._columns))
+        return PackedCoverage(np.array(self._rows), np.array(self._columns))
+
+    def arrays(self) -> Tuple[str, Dict[str, np.ndarray]]:
+        return 'packed', {'rows': self._rows, 'columns': self._columns}
+
+
+class SparseCoverage(Coverage):
+    """
+    Sparse coverage, stored both row-major (CSR) and column-major (CSC) as
+    pairs of index pointer and (sorted) index arrays. Memory use is
+    proportional to the number of executions rather than the size of the
+    matrix. Note that modifying the coverage (see `SparseCoverage.set`)
+    costs time proportional to the number of executions.
+    """
+
+    def __init__(self, rows: Sequence[Iterable[int]], num_groups: int):
+        super().__init__(len(rows), num_groups)
+        row_lists = [np.unique(np.fromiter(groups, dtype=np.int32))
+                     for groups in rows]
+        self._row_ptr = np.zeros(len(rows)+1, dtype=np.int64)
+        np.cumsum([len(r) for r in row_lists], out=self._row_ptr[1:])
+        if (len(row_lists) > 0):
+            self._row_idx = np.concatenate(row_lists).astype(np.int32)
+        else:
+            self._row_idx = np.zeros(0, dtype=np.int32)
+        self._col_ptr, self._col_idx = self._transpose(
+                self._row_ptr, self._row_idx, num_groups)
+
+    @staticmethod
+    def _transpose(ptr: np.ndarray, idx: np.ndarray,
+                   num_cols: int) -> Tuple[np.ndarray, np.ndarray]:
+        """ Convert the given CSR arrays into CSC arrays (and vice versa) """
+        owners = np.repeat(np.arange(len(ptr)-1, dtype=np.int32),
+                           np.diff(ptr))
+        order = np.argsort(idx, kind='stable')
+        t_ptr = np.zeros(num_cols+1, dtype=np.int64)
+        np.cumsum(np.bincount(idx, minlength=num_cols), out=t_ptr[1:])
+        return t_ptr, owners[order]
+
+    @staticmethod
+    def _find(ptr: np.ndarray, idx: np.ndarray, i: int,
+              j: int) -> Tuple[int, bool]:
+        """
+        Return the position of `j` in row `i` (or where it would be inserted)
+        and whether it is present.
+        """
+        start, end = ptr[i], ptr[i+1]
+        pos = start + int(np.searchsorted(idx[start:end], j))
+        return pos, bool(pos < end and idx[pos] == j)
+
+    def get(self, test: int, group: int) -> bool:
+        if (group < 0 or group >= self.num_groups):
+            raise IndexError("group index out of range")
+        return self._find(self._row_ptr, self._row_idx, test, group)[1]
+
+    def set(self, test: int, group: int, executed: bool) -> None:
+        if (self.get(test, group) == executed):
+            return
+        self._row_idx = self._set(self._row_ptr, self._row_idx, test, group,
+                                  executed)
+        self._col_idx = self._set(self._col_ptr, self._col_idx, group, test,
+                                  executed)
+
+    def _set(self, ptr: np.ndarray, idx: np.ndarray, i: int, j: int,
+             executed: bool) -> np.ndarray:
+        pos, _ = self._find(ptr, idx, i, j)
+        if (executed):
+            ptr[i+1:] += 1
+            return np.insert(idx, pos, j)
+        else:
+            ptr[i+1:] -= 1
+            return np.delete(idx, pos)
+
+    def row(self, test: int) -> Sequence[int]:
+        return self._row_idx[self._row_ptr[test]:self._row_ptr[test+1]]
+
+    def rows_and(self, tests: Sequence[int]) -> Sequence[int]:
+        common = self.row(tests[0])
+        for t in tests[1:]:
+            if (len(common) == 0):
+                break
+            common = np.intersect1d(common, self.row(t), assume_unique=True)
+        return common
+
+    def row_bits(self, test: int) -> bitarray:
+        bits = bitarray(self.num_groups)
+        bits.setall(0)
+        for g in self.row(test).tolist():
+            bits[g] = 1
+        return bits
+
+    def row_any(self, test: int, mask: bitarray) -> bool:
+        return any(mask[g] for g in self.row(test).tolist())
+
+    def column_and(self, group: int, mask: bitarray) -> Iterable[int]:
+        column = self._col_idx[self._col_ptr[group]:self._col_ptr[group+1]]
+        return [t for t in column.tolist() if mask[t]]
+
+    def column_counts(self, mask: bitarray) -> np.ndarray:
+        owners = np.repeat(np.arange(self.num_tests), np.diff(self._row_ptr))
+        t_mask = np.unpackbits(np.frombuffer(mask, dtype=np.uint8),
+                               count=len(mask),
+                               bitorder=mask.endian()).view(bool)
+        return np.bincount(self._row_idx[t_mask[owners]],
+                           minlength=self.num_groups).astype(np.int64)
+
+    def nnz(self) -> int:
+        return len(self._row_idx)
+
+    def to_dense(self) -> np.ndarray:
+        dense = np.zeros((self.num_tests, self.num_groups), dtype=bool)
+        owners = np.repeat(np.arange(self.num_tests), np.diff(self._row_ptr))
+        dense[owners, self._row_idx] = True
+        return dense
+
+    def copy(self) -> SparseCoverage:
+        new = object.__new__(SparseCoverage)
+        Coverage.__init__(new, self.num_tests, self.num_groups)
+        new._row_ptr = self._row_ptr.copy()
+        new._row_idx = self._row_idx.copy()
+        new._col_ptr = self._col_ptr.copy()
+        new._col_idx = self._col_idx.copy()
+        return new
+
+    def arrays(self) -> Tuple[str, Dict[str, np.ndarray]]:
+        return 'sparse', {'row_ptr': self._row_ptr, 'row_idx': self._row_idx,
+                          'col_ptr': self._col_ptr, 'col_idx': self._col_idx}
+
+    @classmethod
+    def _from_arrays(cls, arrays: Dict[str, np.ndarray]) -> SparseCoverage:
+        new = object.__new__(cls)
+        Coverage.__init__(new, len(arrays['row_ptr'])-1,
+                          len(arrays['col_ptr'])-1)
+        new._row_ptr = arrays['row_ptr']
+        new._row_idx = arrays['row_idx']
+        new._col_ptr = arrays['col_ptr']
+        new._col_idx = arrays['col_idx']
+        return new
+
+
+def build_coverage(rows: Iterable[Iterable[int]], num_groups: int,
+                   coverage_type: CoverageType = CoverageType.AUTO,
+                   num_tests: Optional[int] = None) -> Coverage:
+    """
+    Build the coverage matrix for the given rows using the given backend.
+
+    Args:
+      rows: For each test, the (integer) groups that the test executes. If
+        `num_tests` is given, this may be an iterator, which memory-mapped
+        coverage consumes one row at a time.
+      num_groups: The total number of groups.
+      coverage_type: (Default value = CoverageType.AUTO) The backend to use.
+        When `CoverageType.AUTO` is given, `SparseCoverage` is used for
+        matrices of at least `SPARSE_MIN_CELLS` cells with a density below
+        `SPARSE_DENSITY`, and `DenseCoverage` otherwise. `CoverageType.MMAP`
+        gives memory-mapped `PackedCoverage`.
+      num_tests: (Default value = None) The number of rows, if `rows` is not
+        a sequence.
+
+    Returns:
+      The constructed coverage matrix.
+    """
+    if (not isinstance(rows, Sequence)):
+        if (coverage_type is CoverageType.MMAP and num_tests is not None):
+            return PackedCoverage.mapped(rows, num_tests, num_groups)
+        rows = list(rows)
+    if (coverage_type is CoverageType.AUTO):
+        rows = [r if isinstance(r, (list, tuple, set)) else list(r)
+                for r in rows]
+        cells = len(rows)*num_groups
+        nnz = sum(len(r) for r in rows)
+        if (cells >= SPARSE_MIN_CELLS and nnz < cells*SPARSE_DENSITY):
+            coverage_type = CoverageType.SPARSE
+        else:
+            coverage_type = CoverageType.DENSE
+    if (coverage_type is CoverageType.SPARSE):
+        return SparseCoverage(rows, num_groups)
+    elif (coverage_type is CoverageType.MMAP):
+        return PackedCoverage.mapped(rows, len(rows), num_groups)
+    else:
+        return DenseCoverage(rows, num_groups)
+
+
+def from_arrays(kind: str, arrays: Dict[str, np.ndarray]) -> Coverage:
+    """
+    Recreate a coverage matrix from the flat arrays returned by
+    `Coverage.arrays`. The arrays are used as-is (i.e. not copied).
+
+    Args:
+      kind: The kind of coverage, as returned by `Coverage.arrays`.
+      arrays: The arrays storing the coverage, as returned by
+        `Coverage.arrays`.
+
+    Returns:
+      The coverage matrix stored in the given arrays.
+    """
+    if (kind == 'sparse'):
+        return SparseCoverage._from_arrays(arrays)
+    elif (kind == 'packed'):
+        return PackedCoverage(arrays['rows'], arrays['columns'])
+    else:
+        raise ValueError(f"Unknown coverage kind: {kind}")
@@ -1,11 +1,18 @@
 from flitsr.suspicious import Suspicious
 from flitsr.ranking import Ranking, Rank
 from flitsr.spectrum import Spectrum
-from typing import List, Dict, Any, Set, Optional
+from typing import List, Dict, Any, Optional, Mapping, AbstractSet, \
+        Iterable
+
+Faults = Mapping[Any, AbstractSet[Spectrum.Element]]
+# The cut-off strategies only consume the ranks they need from the (sorted)
+# ranking, so that a lazily sorted ranking (see `Ranker.iter_rank
+# <flitsr.advanced.ranker.Ranker.iter_rank>`) need not be sorted in full
+Ranks = Iterable[Rank]
 
 
 def basis(basis_num: int, spectrum: Spectrum,
-          faults: Dict[Any, Set[Spectrum.Element]], ranking: Ranking,
+          faults: Faults, ranking: Ranks,
           formula: str, effort: str) -> Ranking:
     new_ranking: Ranking = Ranking()
     r_iter = iter(ranking)
@@ -34,43 +41,43 @@ def basis(basis_num: int, spectrum: Spectrum,
     return new_ranking
 
 
-def oba(spectrum: Spectrum, faults: Dict[Any, Set[Spectrum.Element]],
-        ranking: Ranking, formula: str, effort: str):
+def oba(spectrum: Spectrum, faults: Faults,
+        ranking: Ranks, formula: str, effort: str):
     return method(float('inf'), spectrum, faults, ranking, effort)
 
 
-def mba_dominator(spectrum: Spectrum, faults: Dict[Any, Set[Spectrum.Element]],
-                  ranking: Ranking, formula: str, effort: str):
+def mba_dominator(spectrum: Spectrum, faults: Faults,
+                  ranking: Ranks, formula: str, effort: str):
     sus = Suspicious(spectrum.tf, spectrum.tf, spectrum.tp, spectrum.tp)
     score = sus.execute(formula)
     return method(score, spectrum, faults, ranking, effort)
 
 
-def mba_zombie(spectrum: Spectrum, faults: Dict[Any, Set[Spectrum.Element]],
-               ranking: Ranking, formula: str, effort: str):
+def mba_zombie(spectrum: Spectrum, faults: Faults,
+               ranking: Ranks, formula: str, effort: str):
     sus = Suspicious(0, spectrum.tf, 0, spectrum.tp)
     score = sus.execute(formula)
     return method(score, spectrum, faults, ranking, effort)
 
 
-def mba_5_perc(spectrum: Spectrum, faults: Dict[Any, Set[Spectrum.Element]],
-               ranking: Ranking, formula: str, effort: str):
+def mba_5_perc(spectrum: Spectrum, faults: Faults,
+               ranking: Ranks, formula: str, effort: str):
     size = 0
     for group in spectrum.groups():
         size += len(group)
     return method(int(size*0.05), spectrum, faults, ranking, effort, True)
 
 
-def mba_10_perc(spectrum: Spectrum, faults: Dict[Any, Set[Spectrum.Element]],
-                ranking: Ranking, formula: str, effort: str):
+def mba_10_perc(spectrum: Spectrum, faults: Faults,
+                ranking: Ranks, formula: str, effort: str):
     size = 0
     for group in spectrum.groups():
         size += len(group)
     return method(int(size*0.1), spectrum, faults, ranking, effort, True)
 
 
-def mba_const_add(spectrum: Spectrum, faults: Dict[Any, Set[Spectrum.Element]],
-                  ranking: Ranking, formula: str, effort: str):
+def mba_const_add(spectrum: Spectrum, faults: Faults,
+                  ranking: Ranks, formula: str, effort: str):
     tot_size = 0
     for group in spectrum.groups():
         tot_size += len(group)
@@ -101,8 +108,8 @@ def mba_const_add(spectrum: Spectrum, faults: Dict[Any, Set[Spectrum.Element]],
     return new_ranking
 
 
-def mba_optimal(spectrum: Spectrum, faults: Dict[Any, Set[Spectrum.Element]],
-                ranking: Ranking, formula: str, effort: str):
+def mba_optimal(spectrum: Spectrum, faults: Faults,
+                ranking: Ranks, formula: str, effort: str):
     sus = Suspicious(0, spectrum.tf, 0, spectrum.tp)
     zero = sus.execute(formula)
     new_ranking = Ranking()
@@ -130,8 +137,8 @@ def mba_optimal(spectrum: Spectrum, faults: Dict[Any, Set[Spectrum.Element]],
     return new_ranking
 
 
-def aba(spectrum: Spectrum, faults: Dict[Any, Set[Spectrum.Element]],
-        ranking: Ranking, formula: str, effort: str):
+def aba(spectrum: Spectrum, faults: Faults,
+        ranking: Ranks, formula: str, effort: str):
     new_ranking = Ranking()
     r_iter = iter(ranking)
     rank = next(r_iter, None)
@@ -153,7 +160,7 @@ def aba(spectrum: Spectrum, faults: Dict[Any, Set[Spectrum.Element]],
 
 
 def method(stop_score: float, spectrum: Spectrum,
-           faults: Dict[Any, Set[Spectrum.Element]], ranking: Ranking,
+           faults: Faults, ranking: Ranks,
            effort: str, by_rank=False):
     new_ranking = Ranking()
     r_iter = iter(ranking)
@@ -196,8 +203,8 @@ def getNames():
     return names
 
 
-def cut(cutoff, spectrum, faults: Dict[Any, Set[Spectrum.Element]],
-        ranking: Ranking, formula: str, effort: str):
+def cut(cutoff, spectrum, faults: Faults,
+        ranking: Ranks, formula: str, effort: str):
     # get the function
     func = funcs[cutoff]
     return func(spectrum, faults, ranking, formula, effort)
@@ -5,6 +5,7 @@ from typing import List, final, Type, overload, Optional
 from abc import ABC, abstractmethod
 from deprecated.sphinx import versionadded, versionchanged, deprecated
 from flitsr.spectrum import Spectrum
+from flitsr.coverage import CoverageType
 from flitsr.input.spectrumBuilder import SpectrumBuilder
 from flitsr.input import BaseInputType
 from flitsr.input.duplicates import DuplicateStrategy as DupStrat
@@ -24,10 +25,14 @@ class Input(ABC):
 
     @versionchanged(version='2.5.0', reason='Added the `split_faults`, '
                     '`method_level`, and `duplicate_strategy` parameters')
+    @versionchanged(version='2.6.0', reason='Added the `columnar_elements` '
+                    'and `coverage_type` parameters')
     @final
     def __init__(self, split_faults: bool = False, method_level: bool = False,
                  duplicate_strategy: DupStrat = DupStrat.REFUSE,
-                 compute_groups: Optional[bool] = None):
+                 compute_groups: Optional[bool] = None,
+                 columnar_elements: bool = False,
+                 coverage_type: CoverageType = CoverageType.AUTO):
         """
         Internal constructor for an `Input` type.
 
@@ -39,8 +44,11 @@ class Input(ABC):
         self.duplicate_strategy = duplicate_strategy
         self.split_faults = split_faults
         self.compute_groups = compute_groups
+        self.columnar_elements = columnar_elements
+        self.coverage_type = coverage_type
         self.sb = SpectrumBuilder(method_level, split_faults,
-                                  duplicate_strategy, compute_groups)
+                                  duplicate_strategy, compute_groups,
+                                  columnar_elements, coverage_type)
 
     @staticmethod
     def get_run_file_name(input_path: str) -> str:
@@ -171,7 +179,9 @@ class Input(ABC):
     def read_in(cls, input_path: str, split_faults: bool = False,
                 method_level: bool = False, duplicate_strategy:
                 DupStrat = DupStrat.REFUSE,
-                compute_groups: Optional[bool] = None) -> Spectrum:
+                compute_groups: Optional[bool] = None,
+                columnar_elements: bool = False,
+                coverage_type: CoverageType = CoverageType.AUTO) -> Spectrum:
         """
         Read in the spectrum from the given input file. When called from
         a concrete `Input` class, simply reads the spectrum using that input
@@ -187,6 +197,12 @@ class Input(ABC):
             spectrum.
           duplicate_strategy: The policy for allowing duplicate values in the
             spectrum.
+          columnar_elements: Whether to store the spectrum's elements in a
+            compact, columnar `ElementTable <flitsr.spectrum.ElementTable>`.
+          coverage_type: The storage backend for the spectrum's coverage (see
+            `CoverageType <flitsr.coverage.CoverageType>`). Use
+            `CoverageType.MMAP` to keep the coverage of very large spectra
+            on disk.
 
         Returns:
           The spectrum that was read in.
@@ -196,7 +212,7 @@ class Input(ABC):
         else:
             reader = cls
         instance = reader(split_faults, method_level, duplicate_strategy,
-                          compute_groups)
+                          compute_groups, columnar_elements, coverage_type)
         return instance._read_spectrum(input_path)
 
     @staticmethod
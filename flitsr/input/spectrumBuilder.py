@@ -1,5 +1,6 @@
 from typing import List, Dict, Any, Set, Tuple, Union, Optional
-from flitsr.spectrum import Spectrum, Outcome, Details
+from flitsr.spectrum import Spectrum, Outcome, Details, ElementTable
+from flitsr.coverage import CoverageType
 from flitsr.input.split_faults import split_spectrum_faults, NoFaultsError
 from flitsr.errors import error
 from flitsr.input.duplicates import DuplicateStrategy
@@ -15,10 +16,13 @@ class SpectrumBuilder:
 
     @versionchanged(version='2.5.0', reason='Added the `split_faults`, '
                     '`duplicate_strategy`, and `compute_groups` parameters.')
+    @versionchanged(version='2.6.0', reason='Added the `columnar_elements` '
+                    'and `coverage_type` parameters.')
     def __init__(self, collapse_methods: bool = False, split_faults:
                  bool = False, duplicate_strategy: DuplicateStrategy =
                  DuplicateStrategy.REFUSE, compute_groups:
-                 Optional[bool] = None):
+                 Optional[bool] = None, columnar_elements: bool = False,
+                 coverage_type: CoverageType = CoverageType.AUTO):
         """
         Constructs a `SpectrumBuilder` object to facilitate building a
         `Spectrum <flitsr.spectrum.Spectrum>`.
@@ -27,7 +31,14 @@ class SpectrumBuilder:
           collapse_methods: Whether to form a method level spectrum.
           duplicate_strategy: The strategy for whether duplicates are allowed,
             and how they are handled.
+          columnar_elements: Whether to store the elements' details and faults
+            in a shared `ElementTable <flitsr.spectrum.ElementTable>`, which
+            uses less memory for the details of spectra with very many
+            elements (an element object is still created for each element).
+          coverage_type: The default storage backend for the coverage of the
+            built spectrum (see `get_spectrum`).
         """
+        self._coverage_type = coverage_type
         self._collapse_methods = collapse_methods
         self._duplicate_strategy = duplicate_strategy
         self._split_faults = split_faults
@@ -38,6 +49,8 @@ class SpectrumBuilder:
         self._tests: Dict[int, Spectrum.Test] = {}
         self._executions: Dict[Spectrum.Test, Set[Spectrum.Element]] = {}
         self._duplicates: Dict[Spectrum.Element, int] = {}
+        self._element_set: Set[Spectrum.Element] = set()
+        self._element_table = ElementTable() if columnar_elements else None
         self._groups: Optional[Dict[int, Set[Spectrum.Element]]] = None
 
     def get_tests(self) -> List[Spectrum.Test]:
@@ -124,9 +137,9 @@ class SpectrumBuilder:
                 elem = self._method_map[i] = self._methods[(details[0],
                                                             details[1])]
                 # update method's faults
-                for fault in faults:
-                    if (fault not in elem.faults):
-                        elem.faults.append(fault)
+                new_faults = [f for f in faults if f not in elem.faults]
+                if (len(new_faults) > 0):
+                    elem.faults = elem.faults + new_faults
         else:
             elem = self._add_element(details, faults, index)
             self._method_map[i] = elem
@@ -150,7 +163,7 @@ class SpectrumBuilder:
         # Create element
         e = Spectrum.Element(details, index, faults)
         # Check for duplicates
-        if (e in self._elements):
+        if (e in self._element_set):
             if (self._duplicate_strategy is DuplicateStrategy.ALLOW):
                 # create updated element with index
                 if (not isinstance(details, Details)):
@@ -168,7 +181,10 @@ class SpectrumBuilder:
                 # passively ignore duplicates if DuplicateStrategy.IGNORE
                 pass
         # Record element
+        if (self._element_table is not None):
+            e = self._element_table.add(e.details, index, e.faults)
         self._elements.append(e)
+        self._element_set.add(e)
         return e
 
     def addExecution(self, test: Union[Spectrum.Test, int],
@@ -291,8 +307,22 @@ class SpectrumBuilder:
                     stack.append((nexe_elem, t_ind+1))
         return groups
 
-    def get_spectrum(self) -> Spectrum:
-        """ Return the spectrum from this `SpectrumBuilder`. """
+    @versionchanged(version='2.6.0', reason='Added the `coverage_type` '
+                    'parameter.')
+    def get_spectrum(self, coverage_type: Optional[CoverageType] =
+                     None) -> Spectrum:
+        """
+        Return the spectrum from this `SpectrumBuilder`.
+
+        Args:
+          coverage_type: The storage backend to use for the spectrum's
+            coverage. Defaults to the builder's coverage type, which is
+            `CoverageType.AUTO` unless given otherwise, under which the sparse
+            backend is chosen for very large, low density spectra (see
+            `build_coverage <flitsr.coverage.build_coverage>`).
+        """
+        if (coverage_type is None):
+            coverage_type = self._coverage_type
         # compute the groups (either if explicit or if needed)
         if (self._compute_groups is True or (self._compute_groups is None
                                              and self._groups is None)):
@@ -306,7 +336,7 @@ class SpectrumBuilder:
             groups = [Spectrum.Group(list(elems), ind)
                       for ind, elems in self._groups.items()]
         spectrum = Spectrum(self._elements, groups, self.get_tests(),
-                            self._executions)
+                            self._executions, coverage_type)
         # Split fault groups if necessary
         if (self._split_faults):
             try:
@@ -340,6 +370,7 @@ class SpectrumUpdater(SpectrumBuilder):
                  DuplicateStrategy = DuplicateStrategy.REFUSE):
         super().__init__(duplicate_strategy=duplicate_strategy)
         self._elements = spectrum._elements[:]
+        self._element_set = set(self._elements)
         self._tests = {t.index: t for t in spectrum.tests()[:]}
         self._executions = dict()
         # copy all the executions
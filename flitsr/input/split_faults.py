@@ -24,17 +24,16 @@ def split_spectrum_faults(spectrum: Spectrum) -> None:
             thrown, so this can be ignored in the client code.
     """
     faults, unexposed = split(spectrum)
+    spectrum.set_faults({elem: [] for elem in unexposed})
     for elem in unexposed:
-        elem.faults.clear()
         warning(f"Dropped faulty UUT: {elem} due to unexposure")
     # Get element's fault lists
-    fault_lists: Dict[Spectrum.Element, List[float]] = {}
+    fault_lists: Dict[Spectrum.Element, List[Any]] = {}
     for (f_num, f_locs) in faults.items():
         for elem in f_locs:
             fault_lists.setdefault(elem, []).append(f_num)
-    # Set element's fault lists
-    for (elem, f_list) in fault_lists.items():
-        elem.faults = f_list
+    # Set element's fault lists (updating the spectrum's fault index)
+    spectrum.set_faults(fault_lists)
     if (len(faults) == 0):
         raise NoFaultsError()
 
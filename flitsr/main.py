@@ -1,14 +1,14 @@
 # PYTHON_ARGCOMPLETE_OK
 import sys
-import copy
 from os import path as osp
-from typing import List, Optional, Dict, Any, Union, TextIO
+from typing import List, Optional, Dict, Any, Union, TextIO, Iterable
 from flitsr.output import print_rankings, print_spectrum_csv
 from flitsr import cutoff_points
 from flitsr.spectrum import Spectrum
-from flitsr.ranking import Ranking, Rankings
+from flitsr.ranking import Ranking, Rankings, Rank, ranking_cache
 from flitsr.args import Args
 from flitsr.advanced import ClusterType, RankerType
+from flitsr.advanced.sbfl import SBFL
 from flitsr.input.input_reader import Input
 from flitsr.errors import error
 from flitsr.advanced import Config
@@ -16,7 +16,7 @@ from flitsr.calculations import BUModel
 from flitsr.calculations.output import calculate
 
 
-def compute_cutoff(cutoff: str, ranking: Ranking, spectrum: Spectrum,
+def compute_cutoff(cutoff: str, ranking: Iterable[Rank], spectrum: Spectrum,
                    mode: str, effort: str) -> Ranking:
     faults = spectrum.get_faults()
     if (cutoff.startswith("basis")):
@@ -32,6 +32,41 @@ def compute_cutoff(cutoff: str, ranking: Ranking, spectrum: Spectrum,
     return ranking
 
 
+def output_file_name(config: Config, args: Args, metric: str,
+                     d_p: str) -> str:
+    """
+    Get the name of the file (in the current directory) that the results of
+    running the given configuration and metric on the input ``d_p`` are
+    written to.
+    """
+    input_filename = osp.basename(d_p)
+    return (config.get_file_name(args.print_params) + '_' + metric + '_'
+            + input_filename)
+
+
+def batch_rank(config: Config, args: Args, spectrum: Spectrum,
+               d_p: str) -> Dict[str, Ranking]:
+    """
+    Rank the spectrum with each of the (plain SBFL) metrics to run for the
+    given configuration in one pass, as long as the configuration only uses
+    the metrics as-is. Metrics whose output files already exist are left out
+    when not overriding. Returns the rankings for each metric that was ranked.
+    """
+    if (config.refiner(args) is not None or config.cluster(args) is not None):
+        return {}
+    ranker = config.ranker(args)
+    if (ranker is None):
+        ranker = config.build_adv_type(RankerType['SBFL'], args)
+    metrics = [m for m in args.metrics if not hasattr(RankerType, m.upper())
+               and not hasattr(ClusterType, m.upper())]
+    if (args.no_override):
+        metrics = [m for m in metrics if not
+                   osp.exists(output_file_name(config, args, m, d_p))]
+    if (not isinstance(ranker, SBFL) or len(metrics) < 2):
+        return {}
+    return ranker.rank_all(spectrum, metrics)
+
+
 def output(rankings: Rankings,
            calc_args: Optional[Dict[str, List[Optional[Dict[str, Any]]]]],
            decimals: int = 2, file: Union[str, TextIO] = sys.stdout, bu_model:
@@ -61,7 +96,8 @@ def main(argv: Optional[List[str]] = None):
     d_p = reader.get_run_file_name(args.input)
     # Read the spectrum in and setup parallel if needed
     gspectrum = reader.read_in(args.input, args.split, args.method,
-                               args.duplicates, args.compute_groups)
+                               args.duplicates, args.compute_groups,
+                               coverage_type=args.coverage_type)
     if (gspectrum is None or len(gspectrum.spectrum) == 0):
         print("ERROR: Incorrectly formatted input file, terminating...",
               file=sys.stderr)
@@ -69,18 +105,26 @@ def main(argv: Optional[List[str]] = None):
     if (args.spectrum_csv):
         print_spectrum_csv(gspectrum, file=args.output)
         return
-    # Execute techniques
+    # Execute techniques, sharing the rankings of the same spectrum and metric
+    with ranking_cache():
+        run_techniques(args, gspectrum, d_p)
+
+
+def run_techniques(args: Args, gspectrum: Spectrum, d_p: str):
+    """
+    Run each of the configurations over the spectrum with each metric, and
+    output the results.
+    """
     config: Config
     for config in args.types:
+        batch = batch_rank(config, args, gspectrum, d_p)
         for metric in args.metrics:
             # Get the output channel
             if (len(args.metrics) == 1 and len(args.types) == 1 and not args.all):
                 output_file = args.output
             else:
                 # store output files in the current directory
-                input_filename = osp.basename(d_p)
-                filename = (config.get_file_name(args.print_params) + '_'
-                            + metric + '_' + input_filename)
+                filename = output_file_name(config, args, metric, d_p)
                 try:
                     output_file = open(filename, "x")
                 except FileExistsError:
@@ -93,7 +137,7 @@ def main(argv: Optional[List[str]] = None):
                               file=sys.stderr)
                         output_file = open(filename, 'w')
             # copy spectrum
-            spectrum = copy.deepcopy(gspectrum)
+            spectrum = gspectrum.snapshot()
             # Check for spectrum refining
             refiner = config.refiner(args)
             if (refiner is not None):
@@ -116,16 +160,27 @@ def main(argv: Optional[List[str]] = None):
             for subspectrum in spectrums:
                 # Run techniques
                 ranker = config.ranker(args)
-                if (ranker is None and hasattr(RankerType, metric.upper())):
-                    metric_ranker = RankerType[metric.upper()]
-                    ranker = config.build_adv_type(metric_ranker, args)
-                    metric = args.flitsr_default_metric
-                elif (ranker is None):
-                    ranker = config.build_adv_type(RankerType['SBFL'], args)
-                ranking = ranker.rank(subspectrum, metric)
+                ranks: Iterable[Rank]
+                if (cluster is None and metric in batch):
+                    ranking = ranks = batch.pop(metric)
+                else:
+                    if (ranker is None and
+                            hasattr(RankerType, metric.upper())):
+                        metric_ranker = RankerType[metric.upper()]
+                        ranker = config.build_adv_type(metric_ranker, args)
+                        metric = args.flitsr_default_metric
+                    elif (ranker is None):
+                        ranker = config.build_adv_type(RankerType['SBFL'],
+                                                       args)
+                    if (args.cutoff_strategy):
+                        # the cut-off strategies only consume the head of
+                        # the ranking, so there is no need to sort it all
+                        ranks = ranker.iter_rank(subspectrum, metric)
+                    else:
+                        ranking = ranker.rank(subspectrum, metric)
                 # Compute cut-off
                 if (args.cutoff_strategy):
-                    ranking = compute_cutoff(args.cutoff_strategy, ranking,
+                    ranking = compute_cutoff(args.cutoff_strategy, ranks,
                                              subspectrum, metric,
                                              args.cutoff_eval)
                 rankings.append(ranking)
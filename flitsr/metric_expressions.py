@@ -0,0 +1,250 @@
+"""
+User-defined SBFL metrics, given as arithmetic expressions over the counts
+``ef``, ``ep``, ``nf``, ``np``, ``tf`` and ``tp`` (see `Suspicious
+<flitsr.suspicious.Suspicious>`), for example::
+
+    ef / sqrt(tf * (ef + ep))
+
+Each expression is compiled once into a vectorized NumPy kernel, so that
+registered metrics run at the same speed as the built-in `VectorSuspicious
+<flitsr.suspicious.VectorSuspicious>` metrics. Expressions may use numbers,
+the counts, the operators ``+``, ``-``, ``*``, ``/`` and ``**``, and the
+functions given by `FUNCTIONS`. All arithmetic is done in floating point, and
+divisions follow the same rules as the built-in metrics: ``x / y`` is ``0``
+where ``x`` is ``0``, and is otherwise infinite where ``y`` is ``0``.
+
+Metrics can be registered using `register_metric`, the ``--metric-expr``
+command line option, or by plugins through the ``flitsr.metric`` entry point
+group, where each entry point's name is the name of the metric and its object
+is the expression string.
+"""
+import ast
+import sys
+import functools
+from typing import Dict, Callable, List, Union, Set, FrozenSet
+import numpy as np
+from deprecated.sphinx import versionadded
+if sys.version_info < (3, 10):
+    from importlib_metadata import entry_points
+else:
+    from importlib.metadata import entry_points
+
+COUNTS = ('ef', 'ep', 'nf', 'np', 'tf', 'tp')
+""" The counts that may be used in metric expressions. """
+
+FUNCTIONS: Dict[str, Callable[..., np.ndarray]] = {
+    'sqrt': np.sqrt,
+    'log': np.log,
+    'log2': np.log2,
+    'log10': np.log10,
+    'exp': np.exp,
+    'abs': np.abs,
+    'min': lambda *args: functools.reduce(np.minimum, args),
+    'max': lambda *args: functools.reduce(np.maximum, args),
+}
+""" The functions that may be called in metric expressions. """
+
+_OPERATORS = (ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Pow, ast.UAdd,
+              ast.USub)
+
+
+def _safe_div(nominator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    """ Division following the rules of the built-in metrics """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result = np.where(denominator == 0, np.inf, nominator / denominator)
+    return np.where(nominator == 0, 0.0, result)
+
+
+class _Compiler(ast.NodeTransformer):
+    """
+    Checks that an expression's AST only uses the allowed constructs, and
+    replaces its divisions with calls to `_safe_div`. The counts used are
+    collected in `counts`.
+    """
+    def __init__(self) -> None:
+        self.counts: Set[str] = set()
+
+    def generic_visit(self, node: ast.AST) -> ast.AST:
+        if (not isinstance(node, (ast.Expression, ast.BinOp, ast.UnaryOp,
+                                  ast.Load) + _OPERATORS)):
+            raise ValueError(f"'{type(node).__name__}' is not allowed in "
+                             "metric expressions")
+        return super().generic_visit(node)
+
+    def visit_Constant(self, node: ast.Constant) -> ast.AST:
+        if (isinstance(node.value, bool) or
+                not isinstance(node.value, (int, float))):
+            raise ValueError(f"Invalid constant '{node.value}'")
+        return node
+
+    def visit_Name(self, node: ast.Name) -> ast.AST:
+        if (node.id not in COUNTS):
+            raise ValueError(f"Unknown count '{node.id}' (choose from "
+                             f"{', '.join(COUNTS)})")
+        self.counts.add(node.id)
+        return node
+
+    def visit_Call(self, node: ast.Call) -> ast.AST:
+        if (not isinstance(node.func, ast.Name) or
+                node.func.id not in FUNCTIONS or node.keywords):
+            func = getattr(node.func, 'id', type(node.func).__name__)
+            raise ValueError(f"Unknown function '{func}' (choose from "
+                             f"{', '.join(FUNCTIONS)})")
+        node.args = [self.visit(arg) for arg in node.args]
+        return node
+
+    def visit_BinOp(self, node: ast.BinOp) -> ast.AST:
+        node = self.generic_visit(node)  # type:ignore
+        if (isinstance(node.op, ast.Div)):
+            return ast.Call(func=ast.Name(id='_safe_div', ctx=ast.Load()),
+                            args=[node.left, node.right], keywords=[])
+        return node
+
+
+@versionadded(version='2.6.0')
+class MetricExpression:
+    """ A metric expression, compiled into a vectorized kernel. """
+
+    def __init__(self, expression: str):
+        """
+        Compile the given expression (see `compile_metric`).
+
+        Raises:
+          ValueError: If the expression is not a valid metric expression.
+        """
+        self.expression = expression
+        try:
+            tree = ast.parse(expression.strip(), mode='eval')
+        except SyntaxError as e:
+            raise ValueError(f"Invalid metric expression '{expression}': "
+                             f"{e.msg}") from None
+        compiler = _Compiler()
+        tree = ast.fix_missing_locations(compiler.visit(tree))
+        self.counts: FrozenSet[str] = frozenset(compiler.counts)
+        """ The counts used by the expression. """
+        self._code = compile(tree, f'<metric {expression}>', 'eval')
+
+    def __call__(self, ef: np.ndarray, ep: np.ndarray, nf: np.ndarray,
+                 np_: np.ndarray) -> np.ndarray:
+        """
+        Compute the metric's scores for the given count vectors.
+
+        Returns:
+          A float array with the score for each entry of the counts.
+        """
+        counts = {'ef': np.asarray(ef, dtype=float),
+                  'ep': np.asarray(ep, dtype=float),
+                  'nf': np.asarray(nf, dtype=float),
+                  'np': np.asarray(np_, dtype=float)}
+        counts['tf'] = counts['ef'] + counts['nf']
+        counts['tp'] = counts['ep'] + counts['np']
+        with np.errstate(all='ignore'):
+            scores = eval(self._code, {'__builtins__': {},
+                                       '_safe_div': _safe_div, **FUNCTIONS},
+                          counts)
+        return np.array(np.broadcast_to(scores, counts['ef'].shape),
+                        dtype=float)
+
+    def __repr__(self) -> str:
+        return f"MetricExpression('{self.expression}')"
+
+
+_metrics: Dict[str, MetricExpression] = {}
+_plugins_loaded = False
+
+
+@versionadded(version='2.6.0')
+@functools.lru_cache(maxsize=None)
+def compile_metric(expression: str) -> MetricExpression:
+    """
+    Compile the given metric expression into a kernel. Kernels are cached,
+    so each distinct expression is only compiled once.
+
+    Args:
+      expression: The metric expression to compile.
+
+    Returns:
+      The compiled metric expression.
+
+    Raises:
+      ValueError: If the expression is not a valid metric expression.
+    """
+    return MetricExpression(expression)
+
+
+@versionadded(version='2.6.0')
+def register_metric(name: str, expression: str) -> MetricExpression:
+    """
+    Register a new metric with the given name, computed by the given
+    expression. The metric can then be used in the same way as any of the
+    built-in `Suspicious <flitsr.suspicious.Suspicious>` metrics.
+
+    Args:
+      name: The name of the metric, which may not be the name of a built-in
+        metric.
+      expression: The metric expression.
+
+    Returns:
+      The compiled metric expression.
+
+    Raises:
+      ValueError: If the name or expression is not valid.
+    """
+    from flitsr.suspicious import Suspicious
+    if (not name.isidentifier() or name.startswith('_')):
+        raise ValueError(f"Invalid metric name '{name}'")
+    if (name in dir(Suspicious)):
+        raise ValueError(f"Cannot redefine the built-in metric '{name}'")
+    metric = _metrics[name] = compile_metric(expression)
+    return metric
+
+
+@versionadded(version='2.6.0')
+def get_metric(name: str) -> MetricExpression:
+    """
+    Return the registered metric with the given name.
+
+    Raises:
+      KeyError: If no metric with the given name is registered.
+    """
+    return _registered()[name]
+
+
+@versionadded(version='2.6.0')
+def metric_names() -> List[str]:
+    """ Return the names of all the registered metrics. """
+    return list(_registered())
+
+
+@versionadded(version='2.6.0')
+def parse_metric_arg(arg: str) -> str:
+    """
+    Register the metric given as ``NAME=EXPRESSION`` on the command line, and
+    return its name.
+    """
+    from argparse import ArgumentTypeError
+    name, sep, expression = arg.partition('=')
+    if (not sep):
+        raise ArgumentTypeError(f"invalid metric '{arg}' (expected "
+                                "NAME=EXPRESSION)")
+    try:
+        register_metric(name.strip(), expression)
+    except ValueError as e:
+        raise ArgumentTypeError(str(e)) from None
+    return name.strip()
+
+
+def _registered() -> Dict[str, MetricExpression]:
+    """
+    Return the registered metrics, first registering the metrics of any
+    plugins (from the ``flitsr.metric`` entry points) if not yet done.
+    """
+    global _plugins_loaded
+    if (not _plugins_loaded):
+        _plugins_loaded = True
+        for metric_ep in entry_points(group='flitsr.metric'):
+            expression: Union[str, MetricExpression] = metric_ep.load()
+            if (isinstance(expression, MetricExpression)):
+                expression = expression.expression
+            register_metric(metric_ep.name, expression)
+    return _metrics
@@ -12,16 +12,34 @@ basis orderings on these.
 
 import sys
 from os import path as osp
-from typing import List
+from typing import List, Dict
 from flitsr.args import Args
 from flitsr.main import output, compute_cutoff
-from flitsr.ranking import Rankings
+from flitsr.spectrum import Spectrum, SpectrumView
+from flitsr.ranking import Ranking, Rankings, ranking_cache
 from flitsr.input.input_reader import Input
 from flitsr.errors import error
 from flitsr.advanced import Config, RankerType, ClusterType
+from flitsr.advanced.ranker import Ranker
+from flitsr.advanced.flitsr import Flitsr
 from flitsr.output import print_spectrum_csv
 
 
+def rank_orderings(ranker: Ranker, spectrum: Spectrum, metric: str,
+                    orderings: List[str]) -> Dict[str, Ranking]:
+    """
+    Rank the spectrum with the given ranker for each of the given basis
+    orderings. The flitsr bases do not depend on the ordering, and so are only
+    computed once for all of the orderings.
+    """
+    if (not isinstance(ranker, Flitsr)):
+        return {o: ranker.rank(spectrum, metric) for o in orderings}
+    if (isinstance(spectrum, SpectrumView)):
+        spectrum = spectrum.snapshot()
+    orig, bases = ranker.compute_bases(spectrum, metric)
+    return {o: ranker.rank_bases(spectrum, orig, bases, o) for o in orderings}
+
+
 def main(argv: List[str]):
     args: Args = Args(argv, cmd_line=True)
     # If only a ranking is given, print out metrics and return
@@ -41,7 +59,8 @@ def main(argv: List[str]):
     d_p = reader.get_run_file_name(args.input)
     # Read the spectrum in and setup parallel if needed
     spectrum = reader.read_in(args.input, args.split, args.method,
-                              args.duplicates, args.compute_groups)
+                              args.duplicates, args.compute_groups,
+                              coverage_type=args.coverage_type)
     if (spectrum is None or len(spectrum.spectrum) == 0):
         print("ERROR: Incorrectly formatted input file, terminating...",
               file=sys.stderr)
@@ -49,21 +68,31 @@ def main(argv: List[str]):
     if (args.spectrum_csv):
         print_spectrum_csv(spectrum, file=args.output)
         return
-    # Execute techniques
+    # Execute techniques, sharing the rankings of the same spectrum and metric
+    with ranking_cache():
+        run_orderings(args, spectrum, d_p)
+
+
+def run_orderings(args: Args, spectrum: Spectrum, d_p: str):
+    """
+    Run each of the flitsr configurations over the spectrum with each metric
+    and basis ordering, and output the results.
+    """
     for config in [Config(RankerType['FLITSR']),
                    Config(RankerType['MULTI'])]:
         if (config.get_concrete(RankerType) in ['FLITSR', 'MULTI']):
             orderings = ['auto', 'conf', 'original', 'reverse', 'flitsr']
         else:
             orderings = ['original']
-        for ordering in orderings:
-            for metric in args.metrics:
-                # Get the output channel
-                input_filename = osp.basename(d_p)
+        for metric in args.metrics:
+            # Get the output channels
+            input_filename = osp.basename(d_p)
+            output_files = {}
+            for ordering in orderings:
                 filename = (config.get_file_name() + '_' + ordering
                             + '_' + metric + '_' + input_filename)
                 try:
-                    output_file = open(filename, "x")
+                    output_files[ordering] = open(filename, "x")
                 except FileExistsError:
                     if (args.no_override):
                         # print("WARNING: Skipping execution of already "
@@ -72,48 +101,52 @@ def main(argv: List[str]):
                     else:
                         print("WARNING: overriding file", filename,
                               file=sys.stderr)
-                        output_file = open(filename, 'w')
-                # Check for clustering
-                cluster = config.cluster(args)
-                # deal with clustering technique as metric
-                if (cluster is None and hasattr(ClusterType, metric.upper())):
-                    metric_cluster = ClusterType[metric.upper()]
-                    cluster = config.build_adv_type(metric_cluster, args)
-                    # Set default metric for clustering
-                    metric = args.flitsr_default_metric
-                if (cluster is not None):
-                    spectrums = cluster.cluster(args.input, spectrum,
-                                                args.method)
-                else:
-                    spectrums = [spectrum]
-                rankings = Rankings(spectrum.get_faults(),
+                        output_files[ordering] = open(filename, 'w')
+            if (len(output_files) == 0):
+                continue
+            # Check for clustering
+            cluster = config.cluster(args)
+            # deal with clustering technique as metric
+            if (cluster is None and hasattr(ClusterType, metric.upper())):
+                metric_cluster = ClusterType[metric.upper()]
+                cluster = config.build_adv_type(metric_cluster, args)
+                # Set default metric for clustering
+                metric = args.flitsr_default_metric
+            if (cluster is not None):
+                spectrums = cluster.cluster(args.input, spectrum,
+                                            args.method)
+            else:
+                spectrums = [spectrum]
+            rankings = {o: Rankings(spectrum.get_faults(),
                                     spectrum.elements())
-                # Run each sub-spectrum
-                for subspectrum in spectrums:
-                    # Run techniques
-                    config.set_arg(RankerType['FLITSR'], 'internal_ranking',
-                                   ordering)
-                    ranker = config.ranker(args)
-                    if (ranker is None and
-                            hasattr(RankerType, metric.upper())):
-                        metric_ranker = RankerType[metric.upper()]
-                        ranker = config.build_adv_type(metric_ranker, args)
-                        metric = args.flitsr_default_metric
-                    elif (ranker is None):
-                        ranker = config.build_adv_type(RankerType['SBFL'],
-                                                       args)
-                    ranking = ranker.rank(subspectrum, metric)
+                        for o in output_files}
+            # Run each sub-spectrum
+            for subspectrum in spectrums:
+                # Run techniques
+                ranker = config.ranker(args)
+                if (ranker is None and
+                        hasattr(RankerType, metric.upper())):
+                    metric_ranker = RankerType[metric.upper()]
+                    ranker = config.build_adv_type(metric_ranker, args)
+                    metric = args.flitsr_default_metric
+                elif (ranker is None):
+                    ranker = config.build_adv_type(RankerType['SBFL'],
+                                                   args)
+                ordered = rank_orderings(ranker, subspectrum, metric,
+                                         list(output_files))
+                for ordering, ranking in ordered.items():
                     # Compute cut-off
                     if (args.cutoff_strategy):
                         ranking = compute_cutoff(args.cutoff_strategy, ranking,
                                                  subspectrum, metric,
                                                  args.cutoff_eval)
-                    rankings.append(ranking)
-                # Compute and print output
-                output(rankings, args.calcs, decimals=args.decimals,
+                    rankings[ordering].append(ranking)
+            # Compute and print output
+            for ordering, output_file in output_files.items():
+                output(rankings[ordering], args.calcs, decimals=args.decimals,
                        file=output_file, bu_model=args.bug_understanding,
                        collapse=args.collapse, csv=args.csv)
-                spectrum.reset()
+            spectrum.reset()
 
 
 if __name__ == "__main__":
@@ -1,9 +1,14 @@
 import random
-from typing import List, Set, Optional, Dict, Iterator, Iterable, Any
+from typing import List, Optional, Dict, Iterator, Iterable, Any, \
+        Mapping, AbstractSet, FrozenSet, Tuple, Callable
+from contextlib import contextmanager
+from types import MappingProxyType
+from contextvars import ContextVar
 from enum import Enum, auto
+import numpy as np
 from flitsr.spectrum import Spectrum
 from flitsr.errors import warning
-import copy
+from deprecated.sphinx import versionchanged, versionadded
 
 
 class Tiebrk(Enum):
@@ -48,6 +53,10 @@ class Ranking(Iterable[Rank]):
         self._tiebrk = tiebrk
         self.entity_map: Dict[Spectrum.Entity, Rank] = {}
         self.place = 0
+        # The entities (in order) containing each element, for sub-group
+        # lookups in `get_rank`, built on first use
+        self._containing: Optional[Dict[Spectrum.Element,
+                                        List[Spectrum.Entity]]] = None
 
     def __getitem__(self, index: int) -> Rank:
         return self._ranks[index]
@@ -74,20 +83,42 @@ class Ranking(Iterable[Rank]):
         except KeyError as keyerror:
             if (check_sub_group):
                 # Before exiting, first check if we can find a super-group
-                if (isinstance(entity, Spectrum.Group)):
-                    # If a group, check if it is a sub-group
-                    for key in self.entity_map:
-                        if (isinstance(key, Spectrum.Group) and
-                                key.is_subgroup(entity)):
-                            return self.entity_map[key]
-                elif (isinstance(entity, Spectrum.Element)):
-                    # If an element, check if in any group
-                    for key in self.entity_map:
-                        if (entity in key):
-                            return self.entity_map[key]
+                key = self._find_super(entity)
+                if (key is not None):
+                    return self.entity_map[key]
             # if no super-group can be found, raise the KeyError
             raise keyerror
 
+    def _find_super(self, entity: Spectrum.Entity) -> \
+            Optional[Spectrum.Entity]:
+        """
+        Return the first entity in the ranking that contains the given
+        `entity`, either as a sub-group or as an element, if any.
+        """
+        if (isinstance(entity, Spectrum.Group) and len(entity) == 0):
+            # an empty group is a sub-group of any non-empty group
+            for key in self.entity_map:
+                if (isinstance(key, Spectrum.Group) and
+                        key.is_subgroup(entity)):
+                    return key
+            return None
+        elif (not isinstance(entity, (Spectrum.Group, Spectrum.Element))):
+            return None
+        if (self._containing is None):
+            self._containing = {}
+            for key in self.entity_map:
+                for elem in key:
+                    self._containing.setdefault(elem, []).append(key)
+        # any super-group of a group must contain its first element
+        for key in self._containing.get(entity[0], ()):
+            if (isinstance(entity, Spectrum.Element) or
+                    (isinstance(key, Spectrum.Group) and
+                     key.is_subgroup(entity))):
+                return key
+        return None
+
+    @versionchanged(version='2.6.0', reason='Sorts with a single '
+                    '``numpy.lexsort`` over the scores and tie-break keys')
     def sort(self, reverse: bool) -> None:
         """
         Re-sort this `Ranking` in-place by their scores, using the `Tiebrk`
@@ -96,27 +127,33 @@ class Ranking(Iterable[Rank]):
         Args:
           reverse: bool: Whether to sort by reverse order of scores.
         """
+        # sort keys, from least to most significant
+        keys: List[List[float]] = []
         if (self._tiebrk == Tiebrk.EXEC):  # Sorted by execution counts
-            self._ranks.sort(key=lambda x: x.exec, reverse=reverse)
+            keys.append([r.exec for r in self._ranks])
         elif (self._tiebrk == Tiebrk.RNDM):  # random ordering
             random.shuffle(self._ranks)
         elif (self._tiebrk == Tiebrk.ORIG):  # original ranking tie break
+            orig = _orig.get()
             if (orig is not None):  # sort by original rank then exec count
                 try:
-                    self._ranks.sort(key=lambda x:
-                                     orig.get_rank(x.entity, True).exec,
-                                     reverse=reverse)
-                    self._ranks.sort(key=lambda x:
-                                     orig.get_rank(x.entity, True).score,
-                                     reverse=reverse)
+                    origs = [orig.get_rank(r.entity, True)
+                             for r in self._ranks]
+                    keys.append([o.exec for o in origs])
+                    keys.append([o.score for o in origs])
                 except KeyError:
                     # if sorting by orig fails, print a warning and continue
                     warning("Could not sort by original ranking, despite it "
                             "being set")
                     pass
             else:  # if no orig, still sort by current execution count
-                self._ranks.sort(key=lambda x: x.exec, reverse=reverse)
-        self._ranks.sort(key=lambda x: x.score, reverse=reverse)
+                keys.append([r.exec for r in self._ranks])
+        keys.append([r.score for r in self._ranks])
+        # lexsort is stable, so negating the keys gives the same order as a
+        # (stable) reversed sort
+        sign = -1 if reverse else 1
+        order = np.lexsort([sign * _sort_key(key) for key in keys])
+        self._ranks = [self._ranks[i] for i in order.tolist()]
 
     def append(self, entity: Spectrum.Entity, score: float,
                exec_count: int) -> None:
@@ -132,6 +169,7 @@ class Ranking(Iterable[Rank]):
         created = Rank(entity, score, exec_count)
         self._ranks.append(created)
         self.entity_map[entity] = created
+        self._containing = None
 
     def extend(self, ranks: List[Rank]) -> None:
         """
@@ -143,6 +181,19 @@ class Ranking(Iterable[Rank]):
         self._ranks.extend(ranks)
         for rank in ranks:
             self.entity_map[rank.entity] = rank
+        self._containing = None
+
+    @versionadded(version='2.6.0')
+    def copy(self) -> 'Ranking':
+        """
+        Return a copy of this `Ranking`, with copies of its `Rank` objects
+        (which share the same entities), such that the scores of the copy may
+        be changed independently.
+        """
+        ranking = Ranking(self._tiebrk)
+        ranking.extend([Rank(r.entity, r.score, r.exec) for r in self._ranks])
+        ranking.place = self.place
+        return ranking
 
     def has_entity(self, entity: Spectrum.Entity) -> bool:
         """
@@ -164,27 +215,45 @@ class Ranking(Iterable[Rank]):
         return len(self._ranks)
 
 
+def _sort_key(values: List[float]) -> np.ndarray:
+    """
+    Return an array that sorts in the same order as the given values. Values
+    that cannot be exactly represented as NumPy numbers (such as very large
+    scores) are replaced by their position among the sorted distinct values.
+    """
+    arr = np.asarray(values)
+    if (arr.dtype.kind == 'i' or
+            (arr.dtype.kind == 'f' and
+             not (np.abs(arr) >= 2**53).any())):  # exact as float64
+        return arr
+    positions = {v: i for i, v in enumerate(sorted(set(values)))}
+    return np.array([positions[v] for v in values], dtype=np.int64)
+
+
 class Rankings(Iterable[Ranking]):
     """
     A collection of `Ranking` objects, which share a non-overlapping set of
     elements from a `Spectrum <flitsr.spectrum.Spectrum>`.
     """
-    def __init__(self, faults: Dict[Any, Set[Spectrum.Element]],
+    def __init__(self, faults: Mapping[Any, AbstractSet[Spectrum.Element]],
                  elements: List[Spectrum.Element],
                  rankings: Optional[Iterable[Ranking]] = None):
-        self._faults = faults
+        self._faults: Dict[Any, FrozenSet[Spectrum.Element]] = {
+            fault: frozenset(locs) for fault, locs in faults.items()}
         self._all_elems = elements
         self._rankings: List[Ranking] = []
         if (rankings is not None):
             self._rankings.extend(rankings)
 
-    def faults(self) -> Dict[Any, Set[Spectrum.Element]]:
+    @versionchanged(version='2.6.0', reason='Returns a read-only view '
+                    'instead of a copy')
+    def faults(self) -> Mapping[Any, FrozenSet[Spectrum.Element]]:
         """
-        Return a dictionary of all faults in these rankings. See
+        Return a read-only dictionary of all faults in these rankings. See
         `Spectrum.get_faults <flitsr.spectrum.Spectrum.get_faults>` for a
         description of the return value.
         """
-        return copy.deepcopy(self._faults)
+        return MappingProxyType(self._faults)
 
     def elements(self) -> List[Spectrum.Element]:
         """ Return the global list of elements for all rankings. """
@@ -210,9 +279,14 @@ class Rankings(Iterable[Ranking]):
         return len(self._rankings)
 
 
-orig: Optional[Ranking] = None
+# The original ranking is kept per context (and thus per thread), so that
+# rankings may be sorted concurrently
+_orig: ContextVar[Optional[Ranking]] = ContextVar('orig', default=None)
 
 
+@versionchanged(version='2.6.0', reason='The original ranking is set for the '
+                'current context (i.e. thread) only, and its entities are no '
+                'longer deep copied')
 def set_orig(ranking: Ranking) -> None:
     """
     Set the original SBFL `Ranking` to be used in tie-breaking (see `Tiebrk`).
@@ -222,11 +296,92 @@ def set_orig(ranking: Ranking) -> None:
     Returns:
 
     """
-    global orig
-    orig = copy.deepcopy(ranking)
+    _orig.set(ranking.copy())
 
 
 def unset_orig() -> None:
     """ """
-    global orig
-    orig = None
+    _orig.set(None)
+
+
+@versionadded(version='2.6.0')
+def get_orig() -> Optional[Ranking]:
+    """
+    Return the original SBFL `Ranking` set for tie-breaking in the current
+    context, if any (see `set_orig`).
+    """
+    return _orig.get()
+
+
+_cache: ContextVar[Optional[Dict[Tuple[Any, ...], Ranking]]] = \
+        ContextVar('ranking_cache', default=None)
+
+
+@versionadded(version='2.6.0')
+@contextmanager
+def ranking_cache() -> Iterator[None]:
+    """
+    Cache the rankings computed with `cached_ranking` within this context, so
+    that techniques which rank the same spectrum state with the same metric
+    (e.g. the base rankings of several configurations, or the original
+    ranking used by flitsr) only compute it once.
+    """
+    token = _cache.set({})
+    try:
+        yield
+    finally:
+        _cache.reset(token)
+
+
+@versionadded(version='2.6.0')
+def cached_ranking(spectrum: Spectrum, metric: str, tiebrk: Tiebrk,
+                   compute: Callable[[], Ranking]) -> Ranking:
+    """
+    Return a copy of the `Ranking` of the `spectrum` (in its current state)
+    for the given `metric` and `tiebrk` from the ranking cache of this context
+    (see `ranking_cache`), calling `compute` to compute it if it has not been
+    cached. Outside of a `ranking_cache` context, `compute` is always called.
+
+    Args:
+      spectrum: Spectrum: The spectrum that is ranked.
+      metric: str: The metric that the spectrum is ranked with.
+      tiebrk: Tiebrk: The tie-breaking method of the ranking.
+      compute: Callable[[], Ranking]: Computes the ranking if needed.
+
+    Returns:
+      The (possibly cached) ranking.
+    """
+    key = _cache_key(spectrum, metric, tiebrk)
+    if (key is None):
+        return compute()
+    cache = _cache.get()
+    ranking = cache.get(key)
+    if (ranking is None):
+        ranking = cache[key] = compute()
+    return ranking.copy()
+
+
+@versionadded(version='2.6.0')
+def cache_ranking(spectrum: Spectrum, metric: str, ranking: Ranking) -> None:
+    """
+    Add a copy of an already computed `ranking` of the `spectrum` (in its
+    current state) for the given `metric` to the ranking cache of this
+    context, if any (see `cached_ranking`).
+    """
+    key = _cache_key(spectrum, metric, ranking._tiebrk)
+    if (key is not None):
+        _cache.get()[key] = ranking.copy()
+
+
+def _cache_key(spectrum: Spectrum, metric: str,
+               tiebrk: Tiebrk) -> Optional[Tuple[Any, ...]]:
+    """
+    Return the ranking cache key for the given arguments, or None if there is
+    no cache, or the ranking cannot be cached.
+    """
+    # random tie-breaking, or tie-breaking with an original ranking, does not
+    # only depend on the spectrum
+    if (_cache.get() is None or tiebrk is Tiebrk.RNDM or
+            (tiebrk is Tiebrk.ORIG and _orig.get() is not None)):
+        return None
+    return (spectrum.fingerprint(), metric, tiebrk)
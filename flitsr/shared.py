@@ -0,0 +1,93 @@
+"""
+Helpers for storing flat arrays, along with a small (picklable) header, in a
+single `multiprocessing.shared_memory` segment, which can then be attached to
+(without copying the arrays) by other processes. See `Spectrum.to_shared
+<flitsr.spectrum.Spectrum.to_shared>`.
+
+A segment is laid out as an 8 byte header length, the pickled header and
+array layout, and the arrays themselves (each 8 byte aligned).
+"""
+import sys
+import pickle
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, Any, Tuple
+import numpy as np
+
+_ALIGN = 8
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // _ALIGN) * _ALIGN
+
+
+def write_segment(header: Any, arrays: Dict[str, np.ndarray]) -> SharedMemory:
+    """
+    Create a new shared memory segment containing the given header and
+    arrays.
+
+    Args:
+      header: Any picklable object to store along with the arrays.
+      arrays: The named arrays to store in the segment.
+
+    Returns:
+      The created shared memory segment. The caller is responsible for
+      unlinking the segment once it is no longer needed.
+    """
+    layout: Dict[str, Tuple[int, str, Tuple[int, ...]]] = {}
+    offset = 0
+    for name, arr in arrays.items():
+        layout[name] = (offset, arr.dtype.str, arr.shape)
+        offset += _aligned(arr.nbytes)
+    meta = pickle.dumps((header, layout), protocol=pickle.HIGHEST_PROTOCOL)
+    start = _aligned(8 + len(meta))
+    shm = SharedMemory(create=True, size=max(start + offset, 1))
+    shm.buf[:8] = len(meta).to_bytes(8, 'little')
+    shm.buf[8:8+len(meta)] = meta
+    for name, arr in arrays.items():
+        dst: np.ndarray = np.ndarray(arr.shape, dtype=arr.dtype,
+                                     buffer=shm.buf,
+                                     offset=start + layout[name][0])
+        dst[...] = arr
+        del dst
+    return shm
+
+
+class _Segment(np.ndarray):
+    """
+    A (read-only) byte array over an attached shared memory segment. The
+    array keeps the segment attached for as long as it (or any array viewing
+    it) is alive, after which the segment is closed along with it.
+    """
+    _shm: SharedMemory
+
+
+def read_segment(name: str) -> Tuple[Any, Dict[str, np.ndarray]]:
+    """
+    Attach to the shared memory segment with the given name, and return its
+    header and (read-only) arrays. The arrays are views onto the shared
+    memory, which stays mapped for as long as any of them is alive.
+
+    Args:
+      name: The name of the shared memory segment (see `write_segment`).
+
+    Returns:
+      The header and the named arrays stored in the segment.
+    """
+    if (sys.version_info >= (3, 13)):
+        shm = SharedMemory(name=name, track=False)
+    else:
+        # Before Python 3.13 attaching also registers the segment with the
+        # resource tracker, which is shared with the creating process (that
+        # unregisters the segment when unlinking it)
+        shm = SharedMemory(name=name)
+    segment = _Segment((shm.size,), dtype=np.uint8, buffer=shm.buf)
+    segment._shm = shm
+    segment.flags.writeable = False
+    meta_len = int.from_bytes(segment[:8].tobytes(), 'little')
+    header, layout = pickle.loads(segment[8:8+meta_len].tobytes())
+    start = _aligned(8 + meta_len)
+    arrays = {}
+    for name, (offset, dtype, shape) in layout.items():
+        arrays[name] = np.ndarray(shape, dtype=np.dtype(dtype),
+                                  buffer=segment, offset=start + offset)
+    return header, arrays
@@ -1,15 +1,22 @@
 from __future__ import annotations
-from typing import List, Dict, Any, Set, Sequence, Tuple, Callable, \
-        Union, Iterable, Iterator, Optional, TYPE_CHECKING, TypeVar, \
-        overload, Literal
-from bitarray import bitarray
+from typing import List, Dict, Any, Set, Tuple, Callable, \
+        Union, Iterable, Iterator, Optional, TYPE_CHECKING, \
+        overload, Literal, Mapping, FrozenSet
+from bitarray import bitarray, frozenbitarray
 import numpy as np
+from array import array
+from types import MappingProxyType
+from multiprocessing.shared_memory import SharedMemory
+from weakref import WeakSet
 from enum import Enum
 from abc import ABC, abstractmethod
 if TYPE_CHECKING:
     from flitsr.input import InputType
-from deprecated.sphinx import deprecated, versionadded
+from deprecated.sphinx import deprecated, versionadded, versionchanged
 from recordclass import RecordClass
+from flitsr.coverage import Coverage, CoverageType, build_coverage, \
+        from_arrays
+from flitsr.shared import write_segment, read_segment
 
 
 class GroupError(ValueError):
@@ -82,6 +89,166 @@ class Details(RecordClass):
         return cls(pname=path, method=method, line_no=line, extra=extra)
 
 
+@versionadded(version='2.6.0')
+class ElementTable:
+    """
+    A columnar store for the details and faults of a large number of
+    `Spectrum.Element` objects. Path, method, and extra strings are interned
+    into a single string table, and each element is stored as a row of 32-bit
+    integers (string ids and line number) along with its hash. Faults are
+    stored only for faulty elements. Elements created with `ElementTable.add`
+    are lightweight proxies onto a row of this table, and behave the same as
+    any other `Spectrum.Element`. Note that a proxy is still created for every
+    element when a spectrum is built (the groups and executions of a spectrum
+    hold element objects), so only the memory used by the details of the
+    elements is saved, not that of the element objects themselves.
+    """
+
+    def __init__(self) -> None:
+        self._strings: List[str] = []
+        self._string_ids: Dict[str, int] = {}
+        self._paths = array('i')
+        self._methods = array('i')
+        self._lines = array('i')
+        self._extras = array('i')
+        self._hashes = array('q')
+        self._faults: Dict[int, List[Any]] = {}
+
+    def _intern(self, string: Optional[str]) -> int:
+        """ Return the id of `string` in the string table (-1 for None). """
+        if (string is None):
+            return -1
+        string_id = self._string_ids.get(string)
+        if (string_id is None):
+            string_id = self._string_ids[string] = len(self._strings)
+            self._strings.append(string)
+        return string_id
+
+    def _string(self, string_id: int) -> Optional[str]:
+        return None if (string_id == -1) else self._strings[string_id]
+
+    def add(self, details: Union[Details, List[str]], index: int,
+            faults: List[Any]) -> Spectrum.Element:
+        """
+        Add a new element to this table.
+
+        Args:
+          details: The details of the element, either as a `Details` object or
+            a list of strings (see `Details.constructDetails`).
+          index: The index of the element.
+          faults: The list of faults that the element pertains to.
+
+        Returns:
+          The `Spectrum.Element` backed by the new row of this table.
+        """
+        if (not isinstance(details, Details)):
+            details = Details.constructDetails(details)
+        row = len(self._paths)
+        self._paths.append(self._intern(details.pname))
+        self._methods.append(self._intern(details.method))
+        self._lines.append(-1 if details.line_no is None else details.line_no)
+        self._extras.append(self._intern(details.extra))
+        self._hashes.append(hash(tuple(details)))
+        if (faults):
+            self._faults[row] = faults
+        return Spectrum.Element._from_table(self, row, index)
+
+    def element(self, row: int, index: int) -> Spectrum.Element:
+        """ Return a (new) element backed by the given row of this table """
+        return Spectrum.Element._from_table(self, row, index)
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        """ Return the integer columns of this table as arrays """
+        return {'paths': np.asarray(self._paths, dtype=np.int32),
+                'methods': np.asarray(self._methods, dtype=np.int32),
+                'lines': np.asarray(self._lines, dtype=np.int32),
+                'extras': np.asarray(self._extras, dtype=np.int32),
+                'hashes': np.asarray(self._hashes, dtype=np.int64)}
+
+    @classmethod
+    def _from_arrays(cls, strings: List[str], arrays: Dict[str, np.ndarray],
+                     faults: Dict[int, List[Any]]) -> ElementTable:
+        """
+        Create a (read-only) table over the given string table, column arrays
+        (see `ElementTable.arrays`) and faults, without copying the arrays.
+        """
+        table = cls()
+        table._strings = strings
+        table._string_ids = {string: i for i, string in enumerate(strings)}
+        for column, typecode in [('paths', 'i'), ('methods', 'i'),
+                                 ('lines', 'i'), ('extras', 'i'),
+                                 ('hashes', 'q')]:
+            # memoryviews index to plain ints (unlike numpy arrays)
+            view = memoryview(arrays[column]).cast('B').cast(typecode)
+            setattr(table, '_' + column, view)
+        table._faults = faults
+        return table
+
+    def tup(self, row: int) -> Tuple[str, Optional[str], Optional[int],
+                                     Optional[str]]:
+        """ Return the details of the given row as a tuple. """
+        line = self._lines[row]
+        return (self._strings[self._paths[row]],
+                self._string(self._methods[row]),
+                None if (line == -1) else line,
+                self._string(self._extras[row]))
+
+    def __len__(self) -> int:
+        return len(self._paths)
+
+
+class _UndoLog:
+    """
+    The removals recorded in a single bucket of a `Spectrum`, stored as
+    insertion-ordered sets of test positions and group indices so that they
+    can be replayed (or individually undone) in constant time each.
+    """
+    __slots__ = ('tests', 'groups')
+
+    def __init__(self) -> None:
+        self.tests: Dict[int, None] = {}
+        self.groups: Dict[int, None] = {}
+
+
+class _NgramIndex:
+    """
+    A substring index over a fixed list of strings, mapping each trigram to
+    the (ascending) positions of the strings containing it. A query is then
+    answered by checking only the strings in the shortest posting list of its
+    trigrams, instead of every string.
+    """
+    __slots__ = ('_strings', '_postings')
+    N = 3
+
+    def __init__(self, strings: List[str]):
+        self._strings = strings
+        postings: Dict[str, array] = {}
+        n = self.N
+        for i, string in enumerate(strings):
+            for gram in {string[j:j+n] for j in range(len(string) - n + 1)}:
+                if ((posting := postings.get(gram)) is None):
+                    posting = postings[gram] = array('i')
+                posting.append(i)
+        self._postings = postings
+
+    def search(self, part: str) -> Iterable[int]:
+        """
+        Return the (ascending) positions of the strings containing `part`.
+        """
+        strings = self._strings
+        n = self.N
+        if (len(part) < n):  # too short to use the index
+            return [i for i, s in enumerate(strings) if part in s]
+        shortest: Iterable[int] = ()
+        for j in range(len(part) - n + 1):
+            posting = self._postings.get(part[j:j+n])
+            if (posting is None):
+                return []
+            if (j == 0 or len(posting) < len(shortest)):
+                shortest = posting
+        return [i for i in shortest if part in strings[i]]
+
+
 class Spectrum(Iterable['Spectrum.Execution']):
     """An implementation for a program spectrum."""
     class Test:
@@ -148,29 +315,92 @@ class Spectrum(Iterable['Spectrum.Execution']):
         An element object holds information pertaining to a single spectral
         element (line, method, class, etc...).
         """
-        __slots__ = ('_index', 'details', 'method', 'path', 'line', 'faults',
-                     'tup', 'hash')
+        __slots__ = ('_index', '_table', '_row', '_details', '_faults',
+                     '_hash')
 
         def __init__(self, details: Union[Details, List[str]], index: int,
                      faults: List[Any]):
             self._index = index
+            self._table: Optional[ElementTable] = None
             # process details
             if (not isinstance(details, Details)):
                 details = Details.constructDetails(details)
-            self.details = details
-            self.method = self.details.method
-            self.path = self.details.pname
-            self.line = self.details.line_no
+            self._details = details
+            self._faults = faults
+            self._hash = hash(tuple(self._details))
 
-            self.faults = faults
-            self.tup = tuple(self.details)
-            self.hash = hash(self.tup)
+        @classmethod
+        def _from_table(cls, table: ElementTable, row: int,
+                        index: int) -> Spectrum.Element:
+            """
+            Create an element backed by the given `row` of an `ElementTable`,
+            which stores its details and faults (see `ElementTable.add`).
+            """
+            elem = object.__new__(cls)
+            elem._index = index
+            elem._table = table
+            # share the int object when the row and index coincide
+            elem._row = index if (row == index) else row
+            return elem
+
+        @property
+        def details(self) -> Details:
+            """ The `Details` of this `Spectrum.Element` """
+            if (self._table is None):
+                return self._details
+            return Details(*self._table.tup(self._row))
+
+        @property
+        def tup(self) -> Tuple[str, Optional[str], Optional[int],
+                               Optional[str]]:
+            """ The details of this `Spectrum.Element` as a tuple """
+            if (self._table is None):
+                return tuple(self._details)
+            return self._table.tup(self._row)
+
+        @property
+        def path(self) -> str:
+            return self.tup[0]
+
+        @property
+        def method(self) -> Optional[str]:
+            return self.tup[1]
+
+        @property
+        def line(self) -> Optional[int]:
+            return self.tup[2]
+
+        @property
+        def hash(self) -> int:
+            if (self._table is None):
+                return self._hash
+            return self._table._hashes[self._row]
+
+        @property
+        def faults(self) -> List[Any]:
+            """
+            The list of faults this element pertains to. The faults of
+            elements stored in an `ElementTable` are only changed by setting
+            them (or using `Spectrum.set_faults`), not by modifying the list.
+            """
+            if (self._table is None):
+                return self._faults
+            return self._table._faults.get(self._row, [])
+
+        @faults.setter
+        def faults(self, faults: List[Any]) -> None:
+            if (self._table is None):
+                self._faults = faults
+            else:
+                self._table._faults[self._row] = faults
 
         def isFaulty(self) -> bool:
             """
             Returns whether or not this `Spectrum.Element` pertains to a fault
             """
-            return len(self.faults) > 0
+            if (self._table is None):
+                return len(self._faults) > 0
+            return len(self._table._faults.get(self._row, ())) > 0
 
         def index(self) -> int:
             """Returns the index of this `Spectrum.Element`"""
@@ -194,7 +424,7 @@ class Spectrum(Iterable['Spectrum.Execution']):
         def __str__(self) -> str:
             return "|".join(str(i) for i in self.tup if i) + \
                    (" (FAULT {})".format(",".join(str(x) for x in self.faults))
-                    if self.faults else "")
+                    if self.isFaulty() else "")
 
         def output_str(self, type_: 'InputType',
                        incl_faults: bool = True) -> str:
@@ -214,17 +444,18 @@ class Spectrum(Iterable['Spectrum.Execution']):
             """
             seps = type_.value.get_elem_separators()
             gstring = ''
-            path_part = self.details.pname.rpartition('.')
+            details = self.details
+            path_part = details.pname.rpartition('.')
             if (path_part[0] != '' and path_part[2] != ''):
                 gstring = path_part[0] + seps[0] + path_part[2]
             elif (path_part[0] != '' or path_part[2] != ''):
                 gstring = path_part[0] + path_part[2]
-            if (self.details.method):
+            if (details.method):
                 gstring += ((seps[1] if (gstring != '') else '') +
-                            self.details.method)
-            if (self.details.line_no):
+                            details.method)
+            if (details.line_no):
                 gstring += ((seps[2] if (gstring != '') else '') +
-                            str(self.details.line_no))
+                            str(details.line_no))
             if (incl_faults and self.isFaulty()):
                 gstring += seps[3] + seps[3].join(str(x) for x in self.faults)
             return gstring
@@ -237,7 +468,9 @@ class Spectrum(Iterable['Spectrum.Execution']):
                     self.tup == other.tup)
 
         def __hash__(self) -> int:
-            return self.hash
+            if (self._table is None):
+                return self._hash
+            return self._table._hashes[self._row]
 
         @deprecated(version='2.4.0', reason='The generic element equality '
                     '(`__eq__`) is now equivalent to this function')
@@ -357,15 +590,22 @@ class Spectrum(Iterable['Spectrum.Execution']):
         The Execution object holds all of the spectral information pertaining
         to the execution of a particular test.
         """
-        __slots__ = ('_groups', '_spectrum', 'exec', 'test', '_iter')
+        __slots__ = ('_groups', '_spectrum', '_pos', 'test')
 
-        def __init__(self, test: Spectrum.Test,
-                     spectrum: Spectrum):
-            self._groups = spectrum.groups()
+        def __init__(self, test: Spectrum.Test, spectrum: Spectrum):
+            self._groups = spectrum._groups
             self._spectrum = spectrum
-            self.exec = bitarray(len(self._groups))
+            self._pos = spectrum._test_pos[test.index]
             self.test = test
 
+        @property
+        def exec(self) -> bitarray:
+            """
+            The execution information of this test as a bitarray over the group
+            indices. This bitarray should not be modified (see `update`).
+            """
+            return self._spectrum._coverage.row_bits(self._pos)
+
         def update(self, group: Spectrum.Group, executed: bool) -> None:
             """Update the execution information of a particular group
 
@@ -374,17 +614,13 @@ class Spectrum(Iterable['Spectrum.Execution']):
               executed: bool: The updated execution information; whether this
                   group is executed or not.
             """
-            self.exec[self._spectrum._group_index(group)] = executed
+            self._spectrum._update_execution(self.test, group, executed)
 
         def __len__(self) -> int:
             return len(self._groups)
 
         def __iter__(self) -> Iterator[bool]:
-            self._iter = iter(self._groups)
-            return self
-
-        def __next__(self) -> bool:
-            return self.get(next(self._iter))
+            return map(self.get, self._groups)
 
         def __getitem__(self, elem: Spectrum.Entity) -> bool:
             if (isinstance(elem, Spectrum.Group)):
@@ -396,7 +632,7 @@ class Spectrum(Iterable['Spectrum.Execution']):
 
         def __setitem__(self, group: Spectrum.Group, val: bool) -> None:
             try:
-                self.exec[self._spectrum._group_index(group)] = val
+                self._spectrum._update_execution(self.test, group, val)
             except KeyError:
                 pass
 
@@ -415,7 +651,8 @@ class Spectrum(Iterable['Spectrum.Execution']):
               `default` otherwise.
             """
             try:
-                return bool(self.exec[self._spectrum._group_index(group)])
+                return self._spectrum._coverage.get(
+                        self._pos, self._spectrum._group_index(group))
             except (KeyError, IndexError):
                 return default
 
@@ -437,16 +674,77 @@ class Spectrum(Iterable['Spectrum.Execution']):
             # Get the element's group
             try:
                 i = self._spectrum._group_index(self._spectrum.get_group(elem))
-                return bool(self.exec[i])
+                return self._spectrum._coverage.get(self._pos, i)
             except (KeyError, IndexError):
                 return default
 
+    @versionadded(version='2.6.0')
+    class Counts(Mapping['Spectrum.Group', int]):
+        """
+        A read-write, dictionary-like view of one of the spectrum's count
+        vectors (e.g. the number of passing tests executing each group). The
+        counts are stored in a contiguous integer array indexed by group index,
+        and only the groups currently in the spectrum are visible through this
+        view.
+        """
+        __slots__ = ('_spectrum', '_array')
+
+        def __init__(self, spectrum: Spectrum, array: np.ndarray):
+            self._spectrum = spectrum
+            self._array = array
+
+        def _index(self, group: Spectrum.Group) -> int:
+            g_ind = self._spectrum._group_index_map.get(group)
+            if (g_ind is None or not self._spectrum._group_mask[g_ind]):
+                raise KeyError(group)
+            return g_ind
+
+        def __getitem__(self, group: Spectrum.Group) -> int:
+            return int(self._array[self._index(group)])
+
+        def __setitem__(self, group: Spectrum.Group, count: int) -> None:
+            self._spectrum._set_count(self._array, self._index(group), count)
+
+        def __contains__(self, group: Any) -> bool:
+            try:
+                self._index(group)
+                return True
+            except (KeyError, TypeError):
+                return False
+
+        def __iter__(self) -> Iterator[Spectrum.Group]:
+            return iter(self._spectrum.groups())
+
+        def __len__(self) -> int:
+            return self._spectrum._group_mask.count()
+
+        def __repr__(self) -> str:
+            return repr(dict(self.items()))
+
+        def array(self) -> np.ndarray:
+            """
+            Return the underlying count array, indexed by group index and
+            including any groups that have been removed from the spectrum.
+            """
+            return self._array
+
     def __init__(self, elements: List[Spectrum.Element],
                  groups: List[Spectrum.Group], tests: List[Spectrum.Test],
-                 executions: Dict[Test, Set[Spectrum.Element]]):
+                 executions: Dict[Test, Set[Spectrum.Element]],
+                 coverage_type: CoverageType = CoverageType.AUTO):
+        self._init_entities(elements, groups, tests)
+        # Initialize execution information (one test at a time)
+        rows = ({self._group_map[elem].index() for elem in executions[test]}
+                for test in self._all_tests)
+        self._init_coverage(build_coverage(rows, len(self._groups),
+                                           coverage_type,
+                                           len(self._all_tests)))
+
+    def _init_entities(self, elements: List[Spectrum.Element],
+                       groups: List[Spectrum.Group],
+                       tests: List[Spectrum.Test]) -> None:
+        """ Initialize the elements, groups, and tests of this spectrum """
         self.spectrum: Dict[Spectrum.Test, Spectrum.Execution] = {}
-        self.p: Dict[Spectrum.Group, int] = dict()
-        self.f: Dict[Spectrum.Group, int] = dict()
         # Initialize element related properties
         edict = {e: i for i, e in enumerate(elements)}
         for group in groups:
@@ -457,53 +755,85 @@ class Spectrum(Iterable['Spectrum.Execution']):
         for i, group in enumerate(self._groups):
             self._group_index_map[group] = i
             group.set_index(i)
-            self.p[group] = 0
-            self.f[group] = 0
             for elem in group:
                 self._group_map[elem] = group
+        self._group_mask = bitarray(len(self._groups))
+        self._group_mask.setall(1)
         self._elements: List[Spectrum.Element] = elements
+        # The faulty elements (in group order), and the faults they form
+        self._faulty: List[Spectrum.Element] = [elem for group in self._groups
+                                                for elem in group
+                                                if elem.isFaulty()]
+        self._faults = self._index_faults(self._faulty)
+        # Substring indices for searching the tests, elements and groups by
+        # name (built when first searched)
+        self._search_indices: Dict[str, _NgramIndex] = {}
+        # Pass/fail counts per group index (`_ep` and `_ef`) are computed from
+        # the coverage below, and kept for removed groups as well
         # Initialize test related properties
-        self._removed_tests: Dict[str, List[Spectrum.Test]] = {}
-        self._removed_groups: Dict[str, List[Spectrum.Group]] = {}
-        self._tests: List[Spectrum.Test] = tests
-        self._failing: List[Spectrum.Test] = []
+        self._undo_logs: Dict[str, _UndoLog] = {}
+        self._test_buckets: Dict[int, str] = {}
+        # Tests are tracked by their position in `_all_tests`, with the active
+        # tests given by `_test_mask` (`_tests` and `_failing` are derived
+        # from the masks when needed)
+        self._all_tests: List[Spectrum.Test] = list(tests)
+        self._tests: Optional[List[Spectrum.Test]] = None
+        self._failing: Optional[List[Spectrum.Test]] = None
         self.tp: int = 0
         self.tf: int = 0
-        for test in tests:
+        self._test_pos: Dict[int, int] = {}
+        # The spectra (snapshots and views) sharing the coverage, which is
+        # copied on write while shared or when in read-only shared memory
+        self._coverage_users: WeakSet[Spectrum] = WeakSet([self])
+        self._readonly_coverage = False
+        self._shared_segments: List[SharedMemory] = []
+        # Incremented whenever the tests, groups or coverage change
+        self._version = 0
+        self._fingerprint: Optional[Tuple[int, Tuple[Any, ...]]] = None
+        # Replaced whenever the coverage or counts are changed in place
+        self._content_token = object()
+        self._matrix: Optional[np.ndarray] = None
+        self._errVector: Optional[np.ndarray] = None
+        self._sub_matrix: Optional[Tuple[int, np.ndarray, np.ndarray]] = None
+        self._test_mask = bitarray(len(tests))
+        self._test_mask.setall(1)
+        self._failing_mask = bitarray(len(tests))
+        self._failing_mask.setall(0)
+        for i, test in enumerate(tests):
+            self._test_pos[test.index] = i
             # Increment total counts & add to failing set
             if (test.outcome is Outcome.PASSED):
                 self.tp += 1
             else:
-                self._failing.append(test)
+                self._failing_mask[i] = 1
                 self.tf += 1
             # Add test execution
             self.spectrum[test] = self.Execution(test, self)
-        # Initialize execution information
-        for test in self._tests:
-            test_exe = executions[test]
-            seen: Set[Spectrum.Group] = set()
-            for elem in test_exe:
-                group = self._group_map[elem]
-                if (group not in seen):
-                    seen.add(group)
-                    self.spectrum[test].update(group, True)
-                    if (test.outcome is Outcome.PASSED):
-                        self.p[group] += 1
-                    else:
-                        self.f[group] += 1
+
+    def _init_coverage(self, coverage: Coverage,
+                       counts: Optional[Tuple[np.ndarray, np.ndarray]] = None) \
+            -> None:
+        """
+        Initialize the coverage of this spectrum, as well as the pass/fail
+        counts (computed from the coverage unless given).
+        """
+        self._coverage = coverage
+        if (counts is None):
+            self._ef = self._coverage.column_counts(self._failing_mask)
+            self._ep = self._coverage.column_counts(self._test_mask) - self._ef
+        else:
+            self._ep, self._ef = counts
+        self.p = Spectrum.Counts(self, self._ep)
+        self.f = Spectrum.Counts(self, self._ef)
 
     def __getitem__(self, t: Test) -> Spectrum.Execution:
         return self.spectrum[t]
 
     def __iter__(self) -> Iterator[Spectrum.Execution]:
-        self._iter = iter(self._tests)
-        return self
-
-    def __next__(self) -> Spectrum.Execution:
-        return self.spectrum[next(self._iter)]
+        return map(self.spectrum.__getitem__, self._active_tests())
 
     def __len__(self) -> int:
-        return len(self._tests)
+        return self.tp + self.tf
 
     def elements(self) -> List[Spectrum.Element]:
         """Returns a copy of the list of all elements in this spectrum"""
@@ -511,7 +841,7 @@ class Spectrum(Iterable['Spectrum.Execution']):
 
     def groups(self) -> List[Spectrum.Group]:
         """Returns a copy of all the groups in this spectrum"""
-        return [*self._groups]
+        return [self._groups[i] for i in self._group_mask.itersearch(1)]
 
     def tests(self, outcome: Optional[Outcome] = None) -> List[Spectrum.Test]:
         """
@@ -532,17 +862,95 @@ class Spectrum(Iterable['Spectrum.Execution']):
           outcome (if given).
         """
         if (outcome is None):
-            return [*self._tests]
+            return [*self._active_tests()]
         else:
-            return list(filter(lambda t: t.outcome is outcome, self._tests))
+            return list(filter(lambda t: t.outcome is outcome,
+                               self._active_tests()))
 
     def failing(self) -> List[Spectrum.Test]:
         """Returns a copy of all the failing tests in this spectrum"""
+        if (self._failing is None):
+            self._failing = [self._all_tests[i] for i in
+                             self._failing_mask.itersearch(1)]
         return [*self._failing]
 
+    def _active_tests(self) -> List[Spectrum.Test]:
+        """
+        Return the (cached) list of active tests in this spectrum, derived
+        from the active test mask. The returned list should not be modified.
+        """
+        if (self._tests is None):
+            self._tests = [self._all_tests[i] for i in
+                           self._test_mask.itersearch(1)]
+        return self._tests
+
+    def _set_test_active(self, test: Spectrum.Test, active: bool) -> None:
+        """
+        Activate or deactivate the given `test`, updating the test masks,
+        totals, and group counts in time proportional to its coverage.
+        """
+        pos = self._test_pos[test.index]
+        self._test_mask[pos] = active
+        self._tests = None
+        self._version += 1
+        delta = 1 if active else -1
+        if (test.outcome is Outcome.PASSED):
+            self.tp += delta
+        else:
+            self._failing_mask[pos] = active
+            self._failing = None
+            self.tf += delta
+        self._update_counts(test, delta)
+
     def locs(self) -> int:
         """Get the number of groups in this spectrum"""
-        return len(self._groups)
+        return self._group_mask.count()
+
+    @versionadded(version='2.6.0')
+    def counts(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Return the ef, ep, nf, and np counts for all groups in this spectrum
+        as integer arrays, in the same order as `Spectrum.groups`.
+
+        Returns:
+          A tuple of four arrays (ef, ep, nf, np), where the i-th entry of
+          each array is the corresponding count for the i-th group.
+        """
+        active = self._group_indices()
+        ef = self._ef[active]
+        ep = self._ep[active]
+        return ef, ep, self.tf - ef, self.tp - ep
+
+    @versionadded(version='2.6.0')
+    def fingerprint(self) -> Tuple[Any, ...]:
+        """
+        Return a hashable key for the current state of this spectrum, i.e. its
+        coverage and counts, and which of its tests and groups are active. Snapshots (and
+        views) of a spectrum have the same fingerprint as the spectrum for as
+        long as the states of both remain the same.
+
+        Returns:
+          A hashable key that is equal for spectra in the same state.
+        """
+        if (self._fingerprint is None or
+                self._fingerprint[0] != self._version):
+            # the coverage and counts are shared by snapshots until either
+            # spectrum changes them
+            key = (self._content_token, self._test_mask.tobytes(),
+                   self._group_mask.tobytes())
+            self._fingerprint = (self._version, key)
+        return self._fingerprint[1]
+
+    def _group_indices(self) -> np.ndarray:
+        """ Return the indices of the groups in this spectrum as an array. """
+        return np.flatnonzero(self._bits_to_array(self._group_mask))
+
+    @staticmethod
+    def _bits_to_array(bits: bitarray) -> np.ndarray:
+        """ Unpack the given bitarray into a boolean numpy array. """
+        return np.unpackbits(np.frombuffer(bits, dtype=np.uint8),
+                             count=len(bits),
+                             bitorder=bits.endian()).view(bool)
 
     def remove_test(self, test: Spectrum.Test,
                     bucket: Optional[str] = 'default') -> None:
@@ -560,18 +968,13 @@ class Spectrum(Iterable['Spectrum.Execution']):
           bucket:  (Default value = 'default') The bucket to store the removed
             tests in.
         """
-        if (test not in self._tests):
+        pos = self._test_pos.get(test.index)
+        if (pos is None or not self._test_mask[pos]):
             return
-        self._tests.remove(test)
-        if (test.outcome is Outcome.PASSED):
-            self.tp -= 1
-        else:
-            self._failing.remove(test)
-            self.tf -= 1
-        for group in self.groups():
-            self.remove_execution(test, group, hard=False)
+        self._set_test_active(test, False)
         if (bucket is not None):
-            self._removed_tests.setdefault(bucket, []).append(test)
+            self._undo_log(bucket).tests[pos] = None
+            self._test_buckets[pos] = bucket
 
     def remove_execution(self, test: Spectrum.Test, ent: Spectrum.Entity,
                          hard: bool = True) -> None:
@@ -592,10 +995,34 @@ class Spectrum(Iterable['Spectrum.Execution']):
                 group = ent
             if (hard):
                 self.spectrum[test][group] = False
-            if (test.outcome is Outcome.PASSED):
-                self.p[group] -= 1
-            else:
-                self.f[group] -= 1
+                # removed tests no longer count towards the totals
+                if (not self._test_mask[self._test_pos[test.index]]):
+                    return
+            counts = self._ep if (test.outcome is Outcome.PASSED) else self._ef
+            counts[self._group_index(group)] -= 1
+            self._content_changed()
+
+    def _content_changed(self) -> None:
+        """
+        Record that the coverage or counts of this spectrum were changed in
+        place (see `Spectrum.fingerprint`).
+        """
+        self._version += 1
+        self._content_token = object()
+
+    def _set_count(self, counts: np.ndarray, g_ind: int, count: int) -> None:
+        """ Set the count of the given group in one of the count vectors """
+        counts[g_ind] = count
+        self._content_changed()
+
+    def _update_counts(self, test: Spectrum.Test, delta: int) -> None:
+        """
+        Add `delta` to the pass/fail count of every group executed by `test`,
+        as a single vector operation over the groups in the test's coverage
+        row.
+        """
+        counts = self._ep if (test.outcome is Outcome.PASSED) else self._ef
+        counts[self._coverage.row(self._test_pos[test.index])] += delta
 
     def remove_group(self, group: Spectrum.Group,
                      bucket: str = 'default') -> None:
@@ -609,18 +1036,53 @@ class Spectrum(Iterable['Spectrum.Execution']):
           bucket:  (Default value = 'default') The bucket to store the group in
             for later retrieval.
         """
-        try:
-            self._groups.remove(group)  # remove if there
-            self._removed_groups.setdefault(bucket, []).append(group)
-        except ValueError:
-            # Ignore if the element is not in the list
-            pass
-        self.p.pop(group, None)  # remove if there
-        self.f.pop(group, None)  # remove if there
+        g_ind = self._group_index_map.get(group)
+        # Ignore if the group is not in the spectrum
+        if (g_ind is not None and self._group_mask[g_ind]):
+            self._group_mask[g_ind] = 0
+            self._version += 1
+            self._undo_log(bucket).groups[g_ind] = None
+
+    @versionadded(version='2.6.0')
+    def retain_groups(self, groups: Iterable[Spectrum.Group],
+                      bucket: str = 'default') -> None:
+        """
+        Remove all of the groups in the spectrum except for the given
+        `groups`, and store them in the given `bucket` (see
+        `Spectrum.remove_group`). The groups are removed together using the
+        mask of groups in the spectrum, which is much faster than removing
+        each group in turn.
+
+        Args:
+          groups: Iterable[Spectrum.Group]: The groups to keep.
+          bucket:  (Default value = 'default') The bucket to store the removed
+            groups in for later retrieval.
+        """
+        keep = bitarray(len(self._groups))
+        keep.setall(0)
+        for group in groups:
+            g_ind = self._group_index_map.get(group)
+            if (g_ind is not None):
+                keep[g_ind] = 1
+        removed = self._group_mask & ~keep
+        if (removed.any()):
+            self._group_mask &= keep
+            self._version += 1
+            self._undo_log(bucket).groups.update(
+                dict.fromkeys(removed.itersearch(1)))
+
+    def _undo_log(self, bucket: str) -> _UndoLog:
+        """ Return the undo log for the given bucket, creating it if needed """
+        log = self._undo_logs.get(bucket)
+        if (log is None):
+            log = self._undo_logs[bucket] = _UndoLog()
+        return log
 
     def reset(self, bucket: Union[None, str, List[str]] = None) -> None:
         """
-        Re-activates removed tests and recomputes counts.
+        Re-activates removed tests and groups by replaying the removals
+        recorded in each bucket's undo log, so that the cost is proportional
+        to the number of removals rather than the size of the spectrum.
         By default, or if bucket is None, all buckets are emptied and their
         removed tests reactivated. A bucket name (or Iterable of bucket names)
         may optionally be given to only reset the given name(s).
@@ -629,53 +1091,30 @@ class Spectrum(Iterable['Spectrum.Execution']):
           bucket: Union[None: str: List[str]]:  (Default value = None) The
               bucket to reset.
         """
-        # first get the groups to add back
-        groups_add_back = []
-        group_keys_remove = []
-        for key in self._removed_groups:
-            if (bucket is None or (isinstance(bucket, str) and key == bucket)
-               or (isinstance(bucket, List) and key in bucket)):
-                groups_add_back.extend(self._removed_groups[key])
-                group_keys_remove.append(key)
-        for key in group_keys_remove:
-            del self._removed_groups[key]
-        # then add back the groups, re-computing counts
-        for group in groups_add_back:
-            self._groups.insert(group.index(), group)
-            self.p[group] = len([t for t in self.tests() if t.outcome ==
-                                Outcome.PASS and self[t][group]])
-            self.f[group] = len([t for t in self.failing() if self[t][group]])
-        # next get the tests to add back
-        tests_add_back = []
-        test_keys_remove = []
-        for key in self._removed_tests:
-            if (bucket is None or (isinstance(bucket, str) and key == bucket)
-               or (isinstance(bucket, List) and key in bucket)):
-                tests_add_back.extend(self._removed_tests[key])
-                test_keys_remove.append(key)
-        for key in test_keys_remove:
-            del self._removed_tests[key]
-        # then add back the tests, re-computing counts
-        for test in tests_add_back:
-            self._add_back_removed_test(test)
+        if (bucket is None):
+            keys = list(self._undo_logs)
+        elif (isinstance(bucket, str)):
+            keys = [bucket] if (bucket in self._undo_logs) else []
+        else:
+            keys = [key for key in bucket if key in self._undo_logs]
+        # replay each bucket's log in reverse; only the removed groups and
+        # tests are touched (counts are kept for removed groups)
+        for key in keys:
+            log = self._undo_logs.pop(key)
+            for g_ind in reversed(log.groups):
+                self._group_mask[g_ind] = 1
+                self._version += 1
+            for pos in reversed(log.tests):
+                del self._test_buckets[pos]
+                self._add_back_removed_test(self._all_tests[pos])
 
     def _add_back_removed_test(self, test: Spectrum.Test) -> None:
         """
         Helper method to add back tests that have been removed from the
         spectrum.
         """
-        self._tests.append(test)
-        if (test.outcome is Outcome.PASSED):
-            self.tp += 1
-        else:
-            self._failing.append(test)
-            self.tf += 1
-        for group in self.groups():
-            if (self.spectrum[test][group]):
-                if (test.outcome is Outcome.PASSED):
-                    self.p[group] += 1
-                else:
-                    self.f[group] += 1
+        if (not self._test_mask[self._test_pos[test.index]]):
+            self._set_test_active(test, True)
 
     def reset_single_test(self, test: Spectrum.Test,
                           bucket: Optional[str] = None) -> None:
@@ -691,15 +1130,13 @@ class Spectrum(Iterable['Spectrum.Execution']):
         Raises:
           KeyError: If the test could not be found in the given bucket.
         """
-        if (bucket is None):
-            for key in self._removed_tests:
-                if (test in self._removed_tests[key]):
-                    bucket = key
-                    break
-        if (bucket is None or test not in self._removed_tests[bucket]):
+        pos = self._test_pos.get(test.index)
+        found = self._test_buckets.get(pos) if (pos is not None) else None
+        if (found is None or (bucket is not None and found != bucket)):
             raise KeyError(f"Could not find removed test {test} in "
                            f"{bucket or 'any'} bucket")
-        self._removed_tests[bucket].remove(test)
+        del self._undo_logs[found].tests[pos]
+        del self._test_buckets[pos]
         self._add_back_removed_test(test)
 
     def get_group(self, element: Spectrum.Element) -> Spectrum.Group:
@@ -730,18 +1167,257 @@ class Spectrum(Iterable['Spectrum.Execution']):
                              'elements is present in another spectrum).') \
                 from None
 
-    def get_faults(self) -> Dict[Any, Set[Spectrum.Element]]:
+    def _update_execution(self, test: Spectrum.Test, group: Spectrum.Group,
+                          executed: bool) -> None:
         """
-        Returns a dictionary of all the faults in this spectrum, with the
-        values being all the locations of each fault.
+        Update the execution of `group` in `test` in the coverage matrix.
         """
-        actual_faults: Dict[Any, Set[Spectrum.Element]] = dict()
-        for group in self.groups():
-            for elem in group:
-                if (elem.faults):
-                    for fault in elem.faults:
-                        actual_faults.setdefault(fault, set()).add(elem)
-        return actual_faults
+        g_ind = self._group_index(group)
+        if (self._readonly_coverage or len(self._coverage_users) > 1):
+            self._copy_coverage()
+        self._coverage.set(self._test_pos[test.index], g_ind, executed)
+        self._matrix = None
+        self._content_changed()
+
+    def _copy_coverage(self) -> None:
+        """
+        Give this spectrum its own copy of the coverage that it currently
+        shares with a snapshot (or the spectrum it is a snapshot of).
+        """
+        self._coverage = self._coverage.copy()
+        self._coverage_users.discard(self)
+        self._coverage_users = WeakSet([self])
+        self._readonly_coverage = False
+
+    @versionadded(version='2.6.0')
+    def snapshot(self) -> Spectrum:
+        """
+        Return a lightweight copy of this spectrum, which can be used in place
+        of ``copy.deepcopy``. The snapshot shares the elements, groups, and
+        coverage of this spectrum, and only copies the state that changes when
+        tests and groups are removed (the removed tests and groups, and the
+        counts). The coverage is copied on write, i.e. only once either
+        spectrum's coverage is modified while the other is still in use (see
+        `Spectrum.remove_execution`).
+
+        The faults of the shared elements are not copied, so faults changed
+        by `Spectrum.set_faults` on either spectrum are also changed in the
+        other, whose fault index is then out of date. `Spectrum.set_faults`
+        should therefore not be called on a snapshot (or the spectrum it was
+        taken from) while the other is still in use.
+
+        Returns:
+          A snapshot of this spectrum in its current state.
+        """
+        snap = Spectrum.__new__(Spectrum)
+        snap.__dict__.update(self.__dict__)
+        snap.spectrum = {t: Spectrum.Execution(t, snap)
+                         for t in self.spectrum}
+        snap._test_mask = bitarray(self._test_mask)
+        snap._failing_mask = bitarray(self._failing_mask)
+        snap._group_mask = bitarray(self._group_mask)
+        snap._ep = self._ep.copy()
+        snap._ef = self._ef.copy()
+        snap.p = Spectrum.Counts(snap, snap._ep)
+        snap.f = Spectrum.Counts(snap, snap._ef)
+        snap._undo_logs = {}
+        for bucket, log in self._undo_logs.items():
+            snap_log = snap._undo_logs[bucket] = _UndoLog()
+            snap_log.tests.update(log.tests)
+            snap_log.groups.update(log.groups)
+        snap._test_buckets = dict(self._test_buckets)
+        snap._faulty = list(self._faulty)
+        snap._faults = dict(self._faults)
+        snap._search_indices = dict(self._search_indices)
+        snap._shared_segments = []
+        self._coverage_users.add(snap)
+        return snap
+
+    @versionadded(version='2.6.0')
+    def view(self) -> SpectrumView:
+        """
+        Return a frozen, read-only `SpectrumView` of this spectrum in its
+        current state. Like a `Spectrum.snapshot`, the view shares the
+        elements, groups and coverage of this spectrum, and is not affected by
+        later changes to this spectrum.
+
+        Returns:
+          A read-only view of this spectrum.
+        """
+        view = SpectrumView.__new__(SpectrumView)
+        view.__dict__.update(self.snapshot().__dict__)
+        view.spectrum = {t: Spectrum.Execution(t, view) for t in self.spectrum}
+        view._test_mask = frozenbitarray(view._test_mask)
+        view._failing_mask = frozenbitarray(view._failing_mask)
+        view._group_mask = frozenbitarray(view._group_mask)
+        view._ep.flags.writeable = False
+        view._ef.flags.writeable = False
+        view.p = Spectrum.Counts(view, view._ep)
+        view.f = Spectrum.Counts(view, view._ef)
+        self._coverage_users.add(view)
+        # fill the lazy caches, so that the view is never written to
+        view._active_tests()
+        view.failing()
+        return view
+
+    @versionadded(version='2.6.0')
+    def to_shared(self) -> str:
+        """
+        Place this spectrum in a shared memory segment, which other processes
+        can `Spectrum.attach` to instead of re-reading or unpickling the
+        spectrum. The coverage, counts and element details are stored as flat
+        arrays which are shared (not copied) by all attached spectra. Attached
+        spectra contain all the tests and groups of this spectrum, including
+        any that have been removed.
+
+        The segment belongs to this spectrum, and must be freed with
+        `Spectrum.release_shared` once it is no longer needed. Note that
+        before Python 3.13, processes that attach to the spectrum should be
+        started from this process (e.g. using ``multiprocessing``), otherwise
+        the segment is freed when they exit.
+
+        Returns:
+          The name of the shared memory segment to give to `Spectrum.attach`.
+        """
+        table = ElementTable()
+        rows = {}
+        for row, elem in enumerate(self._elements):
+            table.add(elem.details, elem.index(), elem.faults)
+            rows[id(elem)] = row
+        arrays = table.arrays()
+        arrays['indices'] = np.array([e.index() for e in self._elements],
+                                     dtype=np.int64)
+        group_elems = [rows[id(elem)] for group in self._groups
+                       for elem in group]
+        arrays['group_elems'] = np.array(group_elems, dtype=np.int32)
+        arrays['group_ptr'] = np.zeros(len(self._groups)+1, dtype=np.int64)
+        np.cumsum([len(group) for group in self._groups],
+                  out=arrays['group_ptr'][1:])
+        # the counts over all tests (including removed tests)
+        if (self._test_mask.all()):
+            arrays['ep'], arrays['ef'] = self._ep, self._ef
+        else:
+            failing = bitarray([t.outcome is not Outcome.PASSED
+                                for t in self._all_tests])
+            arrays['ef'] = self._coverage.column_counts(failing)
+            arrays['ep'] = self._coverage.column_counts(~failing)
+        kind, coverage = self._coverage.arrays()
+        for name, arr in coverage.items():
+            arrays['coverage.' + name] = arr
+        header = {'tests': [(t.name, t.index, t.outcome.name)
+                            for t in self._all_tests],
+                  'strings': table._strings, 'faults': table._faults,
+                  'coverage': kind}
+        shm = write_segment(header, arrays)
+        self._shared_segments.append(shm)
+        return shm.name
+
+    @classmethod
+    @versionadded(version='2.6.0')
+    def attach(cls, name: str) -> Spectrum:
+        """
+        Attach to a spectrum placed in shared memory by `Spectrum.to_shared`.
+        The returned spectrum reads its coverage and element details directly
+        from the shared memory, and only copies the coverage if it is modified
+        (see `Spectrum.remove_execution`). The segment is closed once neither
+        the spectrum nor any snapshot of it reads from it anymore.
+
+        Args:
+          name: The name of the shared memory segment returned by
+            `Spectrum.to_shared`.
+
+        Returns:
+          The spectrum stored in the shared memory segment.
+        """
+        header, arrays = read_segment(name)
+        table = ElementTable._from_arrays(header['strings'], arrays,
+                                         header['faults'])
+        elements = [table.element(row, index) for row, index in
+                    enumerate(arrays['indices'].tolist())]
+        ptr = arrays['group_ptr'].tolist()
+        group_elems = arrays['group_elems'].tolist()
+        groups = [Spectrum.Group([elements[row] for row in
+                                  group_elems[ptr[g]:ptr[g+1]]], g)
+                  for g in range(len(ptr)-1)]
+        tests = [Spectrum.Test(t_name, index, Outcome[outcome])
+                 for t_name, index, outcome in header['tests']]
+        spectrum = cls.__new__(cls)
+        spectrum._init_entities(elements, groups, tests)
+        coverage = {name[len('coverage.'):]: arr for name, arr in
+                    arrays.items() if name.startswith('coverage.')}
+        spectrum._init_coverage(from_arrays(header['coverage'], coverage),
+                                (arrays['ep'].copy(), arrays['ef'].copy()))
+        # the shared coverage is read-only, so copy it on write
+        spectrum._readonly_coverage = True
+        return spectrum
+
+    @versionadded(version='2.6.0')
+    def release_shared(self) -> None:
+        """
+        Free the shared memory segments created by `Spectrum.to_shared`.
+        Spectra already attached to the segments remain usable.
+        """
+        for shm in self._shared_segments:
+            shm.close()
+            shm.unlink()
+        self._shared_segments = []
+
+    @versionchanged(version='2.6.0', reason='Returns a read-only view of '
+                    'a fault index maintained by the spectrum, instead of a '
+                    'new dictionary')
+    def get_faults(self) -> Mapping[Any, FrozenSet[Spectrum.Element]]:
+        """
+        Returns a read-only dictionary of all the faults in this spectrum,
+        with the values being all the locations of each fault. The faults are
+        indexed when the spectrum is created, and so should only be changed
+        using `Spectrum.set_faults`.
+        """
+        if (self._group_mask.all()):
+            faults = self._faults
+        else:
+            faults = self._index_faults(
+                    [elem for elem in self._faulty
+                     if self._group_mask[self._group_map[elem].index()]])
+        return MappingProxyType(faults)
+
+    @versionadded(version='2.6.0')
+    def set_faults(self, faults: Mapping[Spectrum.Element, List[Any]]) -> None:
+        """
+        Set the faults of the given elements, updating the fault index of this
+        spectrum (see `Spectrum.get_faults`). The elements are shared with any
+        snapshots of this spectrum (see `Spectrum.snapshot`).
+
+        Args:
+          faults: A mapping from each element to update to its new list of
+            faults (an empty list marks the element as not faulty).
+        """
+        faulty = set(self._faulty)
+        added = False
+        for elem, elem_faults in faults.items():
+            elem.faults = elem_faults
+            if (elem not in faulty and elem in self._group_map):
+                faulty.add(elem)
+                added = True
+        if (added):
+            def order(elem: Spectrum.Element) -> Tuple[int, int]:
+                group = self._group_map[elem]
+                return group.index(), group._elems.index(elem)
+            self._faulty = sorted(faulty, key=order)
+        self._faulty = [elem for elem in self._faulty if elem.isFaulty()]
+        self._faults = self._index_faults(self._faulty)
+        # the names of the elements (and thus groups) include their faults
+        self._search_indices = {k: i for k, i in self._search_indices.items()
+                                if k == 'tests'}
+
+    @staticmethod
+    def _index_faults(elems: List[Spectrum.Element]) \
+            -> Dict[Any, FrozenSet[Spectrum.Element]]:
+        """ Group the given faulty elements by fault """
+        faults: Dict[Any, Set[Spectrum.Element]] = {}
+        for elem in elems:
+            for fault in elem.faults:
+                faults.setdefault(fault, set()).add(elem)
+        return {fault: frozenset(locs) for fault, locs in faults.items()}
 
     def get_tests(self, entity: Spectrum.Entity, only_failing: bool = False,
                   remove: bool = False,
@@ -764,11 +1440,14 @@ class Spectrum(Iterable['Spectrum.Execution']):
             The set of `Spectrum.Test` that `entity` is executed in.
 
         """
-        executing = set()
-        tests = self.failing() if only_failing else self.tests()
-        for test in tests:
-            if (self[test][entity]):
-                executing.add(test)
+        if (isinstance(entity, Spectrum.Element)):
+            try:
+                entity = self.get_group(entity)
+            except KeyError:
+                return set()
+        mask = self._failing_mask if only_failing else self._test_mask
+        executing = {self._all_tests[i] for i in self._coverage.column_and(
+                         self._group_index(entity), mask)}
         if (remove):
             for test in executing:
                 self.remove_test(test, bucket=bucket)
@@ -801,6 +1480,86 @@ class Spectrum(Iterable['Spectrum.Execution']):
         """
         return self._get_executed_entities(test, groups=False)
 
+    @versionadded(version='2.6.0')
+    def executes_any_group(self, test: Spectrum.Test) -> bool:
+        """
+        Return whether the given `test` executes any of the groups in the
+        spectrum (i.e. whether `Spectrum.get_executed_groups` is non-empty),
+        by intersecting the test's coverage row with the mask of groups in
+        the spectrum.
+
+        Args:
+          test: Spectrum.Test: The test to check.
+
+        Returns:
+          True if `test` executes any group in the spectrum, False otherwise.
+        """
+        return self._coverage.row_any(self._test_pos[test.index], self._group_mask)
+
+    @versionadded(version='2.6.0')
+    def common_executed_groups(self, tests: Iterable[Spectrum.Test]) \
+            -> Set[Spectrum.Group]:
+        """
+        Return the set of groups that are executed in every one of the given
+        `tests`. The coverage rows of the tests are intersected before any
+        groups are looked up, which is much faster than intersecting the
+        results of `Spectrum.get_executed_groups`.
+
+        Args:
+          tests: Iterable[Spectrum.Test]: The tests whose commonly executed
+            groups to return.
+
+        Returns:
+          The set of `Spectrum.Group` that are executed in all of the given
+          `tests`. If no tests are given, all groups in the spectrum are
+          returned.
+        """
+        positions = [self._test_pos[test.index] for test in tests]
+        if (len(positions) == 0):
+            return set(self.groups())
+        return {self._groups[g] for g in self._coverage.rows_and(positions)
+                if self._group_mask[g]}
+
+    @versionadded(version='2.6.0')
+    def failure_components(self) -> List[List[Spectrum.Test]]:
+        """
+        Partition the failing tests into the connected components of the graph
+        between the failing tests and the groups they execute, such that no
+        two failing tests in different components execute the same group.
+        Failing tests that execute no groups each form their own component.
+
+        Returns:
+          The components of failing tests, in order of their first test.
+        """
+        parent: Dict[int, int] = {}
+
+        def find(g: int) -> int:
+            root = g
+            while (parent[root] != root):
+                root = parent[root]
+            while (parent[g] != root):  # compress the path
+                parent[g], g = root, parent[g]
+            return root
+        failing = self.failing()
+        firsts: List[Optional[int]] = []
+        for test in failing:
+            row = [g for g in self._coverage.row(self._test_pos[test.index])
+                   if self._group_mask[g]]
+            for g in row:
+                parent.setdefault(g, g)
+            if (len(row) > 0):
+                root = find(row[0])
+                for g in row[1:]:
+                    other = find(g)
+                    if (other != root):
+                        parent[other] = root
+            firsts.append(row[0] if (len(row) > 0) else None)
+        components: Dict[Any, List[Spectrum.Test]] = {}
+        for test, first in zip(failing, firsts):
+            key = find(first) if (first is not None) else test
+            components.setdefault(key, []).append(test)
+        return list(components.values())
+
     def get_removed_tests(self, bucket: Optional[str] = 'default') \
             -> List[Spectrum.Test]:
         """
@@ -818,7 +1577,8 @@ class Spectrum(Iterable['Spectrum.Execution']):
         if (bucket is None):
             return self._all_removed_tests()
         else:
-            return [*self._removed_tests[bucket]]
+            return [self._all_tests[pos] for pos in
+                    self._undo_logs[bucket].tests]
 
     @overload
     def _get_executed_entities(self, test: Spectrum.Test, groups:
@@ -833,65 +1593,51 @@ class Spectrum(Iterable['Spectrum.Execution']):
                                               Set[Spectrum.Element]]:
         """
         Finds either the groups (default) or the elements (groups = False)
-        executed in the given test.
+        executed in the given test, by scanning the set bits of the test's
+        coverage row.
         """
-        entities: Union[Sequence[Spectrum.Group], Sequence[Spectrum.Element]]
+        row = self._coverage.row(self._test_pos[test.index])
         if (groups):
-            entities = self._groups
-            return self._get_e_e_generic(entities, test)
+            return {self._groups[g] for g in row if self._group_mask[g]}
         else:
-            entities = self._elements
-            return self._get_e_e_generic(entities, test)
-
-    T = TypeVar('T', bound=Entity)
-
-    def _get_e_e_generic(self, entities: List[T],
-                         test: Spectrum.Test) -> Set[T]:
-        executed = set()
-        for ent in entities:
-            if (self[test][ent]):
-                executed.add(ent)
-        return executed
+            return {elem for g in row for elem in self._groups[g]}
 
     def _all_removed_tests(self) -> List[Spectrum.Test]:
         """ Get a list of the removed tests in all buckets """
         all_removed = []
-        for key in self._removed_tests:
-            all_removed.extend(self._removed_tests[key])
+        for log in self._undo_logs.values():
+            all_removed.extend(self._all_tests[pos] for pos in log.tests)
         return all_removed
 
     def to_matrix(self) -> Tuple[np.ndarray, np.ndarray]:
         """
         Converts the current spectrum into a numpy matrix and error vector.
+        The result is cached (and read-only) until the spectrum changes.
 
         Returns:
           A numpy matrix representing the spectrum, and numpy array
           representing the error vector.
         """
-        # If no matrix already, create one
-        if (not hasattr(self, '_matrix')):
-            # Use all test cases and most elements
-            self._matrix_tests = list(self.spectrum.keys())
-            self._matrix_elems = list(self._groups)
-            self._matrix = np.zeros((len(self._matrix_tests),
-                                     len(self._matrix_elems)),
-                                    dtype=bool)
-            self._errVector = np.zeros(len(self._matrix_tests),
-                                       dtype=bool)
-            for (i, test) in enumerate(self._matrix_tests):
-                for (j, elem) in enumerate(self._matrix_elems):
-                    self._matrix[i][j] = self.spectrum[test][elem]
-                self._errVector[i] = 0 if (test.outcome is
-                                           Outcome.PASSED) else 1
-        # Extract submatrix
-        test_set = set(self._tests)
-        tmask = np.array([item in test_set for item in self._matrix_tests])
-        # tmask = np.isin(self._matrix_tests, self._tests)
-        group_set = set(self._groups)
-        emask = np.array([item in group_set for item in self._matrix_elems])
-        # emask = np.isin(self._matrix_elems, self._groups)
-        matrix = self._matrix[np.ix_(tmask, emask)]
-        errVector = self._errVector[tmask]
+        if (self._sub_matrix is not None and
+                self._sub_matrix[0] == self._version):
+            return self._sub_matrix[1], self._sub_matrix[2]
+        # If no matrix already, build one from the coverage
+        if (self._matrix is None):
+            self._matrix = self._coverage.to_dense()
+            self._errVector = np.array([t.outcome is not Outcome.PASSED
+                                        for t in self._all_tests], dtype=bool)
+        # Extract submatrix (the full matrix is used as-is if possible)
+        if (self._test_mask.all() and self._group_mask.all()):
+            matrix = self._matrix
+            errVector = self._errVector
+        else:
+            tmask = self._bits_to_array(self._test_mask)
+            gmask = self._bits_to_array(self._group_mask)
+            matrix = self._matrix[np.ix_(tmask, gmask)]
+            errVector = self._errVector[tmask]
+        matrix.flags.writeable = False
+        errVector.flags.writeable = False
+        self._sub_matrix = (self._version, matrix, errVector)
         return matrix, errVector
 
     def search_tests(self, name_part: str, incl_removed: bool = False) \
@@ -908,10 +1654,13 @@ class Spectrum(Iterable['Spectrum.Execution']):
         Returns:
           A list of all the tests that match `name_part`.
         """
-        results = [t for t in self.tests() if t.name.find(name_part) != -1]
+        matches = self._search_index('tests').search(name_part)
+        results = [self._all_tests[i] for i in matches if self._test_mask[i]]
         if (incl_removed):
-            results.extend([t for t in self._all_removed_tests()
-                            if t.name.find(name_part) != -1])
+            matched = set(matches)
+            results.extend([self._all_tests[pos]
+                            for log in self._undo_logs.values()
+                            for pos in log.tests if pos in matched])
         return results
 
     def search_elements(self, name_part: str, groups: bool = False) \
@@ -928,6 +1677,64 @@ class Spectrum(Iterable['Spectrum.Execution']):
         Returns:
           A list of all the entitied that match `name_part`.
         """
-        elems = self._groups if groups else self._elements
-        results = [e for e in elems if str(e).find(name_part) != -1]
-        return results
+        if (groups):
+            matches = self._search_index('groups').search(name_part)
+            return [self._groups[i] for i in matches if self._group_mask[i]]
+        else:
+            matches = self._search_index('elements').search(name_part)
+            return [self._elements[i] for i in matches]
+
+    def _search_index(self, kind: str) -> _NgramIndex:
+        """
+        Get the substring index over the names of all the tests, elements or
+        groups (given by `kind`) of this spectrum, building it if necessary.
+        """
+        index = self._search_indices.get(kind)
+        if (index is None):
+            if (kind == 'tests'):
+                names = [t.name for t in self._all_tests]
+            elif (kind == 'groups'):
+                names = [str(g) for g in self._groups]
+            else:
+                names = [str(e) for e in self._elements]
+            index = _NgramIndex(names)
+            # replace (rather than fill in) the cache, as it may be shared
+            self._search_indices = {**self._search_indices, kind: index}
+        return index
+
+
+@versionadded(version='2.6.0')
+class SpectrumView(Spectrum):
+    """
+    A frozen, read-only `Spectrum` (see `Spectrum.view`). Any method that
+    would modify the view raises a `TypeError`; use `SpectrumView.snapshot`
+    to get a modifiable copy instead.
+
+    A view does not keep any iteration state, and its remaining caches are
+    only ever replaced as a whole, so a single view may be read (and iterated
+    over) by several threads at once, e.g. by rankers run in a thread pool.
+    """
+
+    def _read_only(self, *args: Any, **kwargs: Any) -> None:
+        raise TypeError("A SpectrumView cannot be modified, use "
+                        "SpectrumView.snapshot for a modifiable copy")
+
+    remove_test = _read_only
+    remove_execution = _read_only
+    remove_group = _read_only
+    retain_groups = _read_only
+    reset = _read_only
+    reset_single_test = _read_only
+    set_faults = _read_only
+    _update_execution = _read_only
+    _set_count = _read_only
+
+    def get_tests(self, entity: Spectrum.Entity, only_failing: bool = False,
+                  remove: bool = False,
+                  bucket: str = 'default') -> Set[Spectrum.Test]:
+        if (remove):
+            self._read_only()
+        return super().get_tests(entity, only_failing)
+
+    def view(self) -> SpectrumView:
+        return self
@@ -1,9 +1,12 @@
 import math
 import argparse
 import sys
-from typing import List
+from typing import List, Union, Dict, Iterable, Iterator
+import numpy as np
+from deprecated.sphinx import versionadded, versionchanged
 from flitsr.spectrum import Spectrum
-from flitsr.ranking import Ranking, Tiebrk
+from flitsr.ranking import Ranking, Rank, Tiebrk, _sort_key
+from flitsr import metric_expressions
 
 
 class Suspicious():
@@ -29,32 +32,123 @@ class Suspicious():
         self.nf = tf - ef
         self.np = tp - ep
 
+    @versionchanged(version='2.6.0', reason='Supports the metrics registered '
+                    'in `flitsr.metric_expressions`')
     def execute(self, metric: str) -> float:
+        if (not hasattr(self, metric) and
+                metric in metric_expressions.metric_names()):
+            score = metric_expressions.get_metric(metric)(
+                np.array([self.ef]), np.array([self.ep]),
+                np.array([self.nf]), np.array([self.np])).item()
+            if (math.isinf(score)):
+                return Suspicious.inf if (score > 0) else -Suspicious.inf
+            return score
         func = getattr(self, metric)
         return func()
 
     @staticmethod
+    @versionchanged(version='2.6.0', reason='Scores all groups at once using '
+                    '`VectorSuspicious` where the formula has a vectorized '
+                    'implementation')
     def apply_formula(spec: Spectrum, formula: str,
                       tiebrk: Tiebrk, reverse: bool = True) -> Ranking:
         """
         Calculate the scores for each of the elements using the given formula.
         Assumes a non-empty spectrum.
         """
-        ranking: Ranking = Ranking(tiebrk)
-        for elem in spec.groups():
-            sus = Suspicious(spec.f[elem], spec.tf, spec.p[elem], spec.tp)
-            exect = spec.p[elem]+spec.f[elem]
-            ranking.append(elem, sus.execute(formula), exect)
-        ranking.sort(reverse)
-        return ranking
+        return Suspicious.apply_formulas(spec, [formula], tiebrk,
+                                         reverse)[formula]
 
     @staticmethod
+    @versionadded(version='2.6.0')
+    def apply_formulas(spec: Spectrum, formulas: Iterable[str],
+                       tiebrk: Tiebrk,
+                       reverse: bool = True) -> Dict[str, Ranking]:
+        """
+        Calculate the scores for each of the elements using each of the given
+        formulas (see `apply_formula`). The counts of the spectrum are only
+        gathered once for all of the formulas. Assumes a non-empty spectrum.
+
+        Returns:
+          A dictionary containing the ranking produced by each formula.
+        """
+        ef, ep, nf, np_ = spec.counts()
+        groups = spec.groups()
+        exe = (ef + ep).tolist()
+        vsus = VectorSuspicious(ef, ep, nf, np_)
+        rankings: Dict[str, Ranking] = {}
+        for formula in formulas:
+            scores = Suspicious._scores(spec, vsus, formula)
+            ranking = rankings[formula] = Ranking(tiebrk)
+            for elem, score, exe_count in zip(groups, scores, exe):
+                ranking.append(elem, score, exe_count)
+            ranking.sort(reverse)
+        return rankings
+
+    @staticmethod
+    @versionadded(version='2.6.0')
+    def iter_formula(spec: Spectrum, formula: str, tiebrk: Tiebrk,
+                     reverse: bool = True) -> Iterator[Rank]:
+        """
+        Lazily rank the elements using the given formula, yielding the same
+        ranks in the same order as `apply_formula`, but only sorting as much
+        of the ranking as is consumed. The ranks are selected (using
+        ``numpy.argpartition``) and sorted in chunks of doubling size, where
+        each chunk includes all ranks tied with its last rank. The scores are
+        computed when this method is called, so that the spectrum may be
+        changed while iterating. Assumes a non-empty spectrum.
+        """
+        ef, ep, nf, np_ = spec.counts()
+        groups = list(spec.groups())
+        exe = (ef + ep).tolist()
+        scores = Suspicious._scores(spec, VectorSuspicious(ef, ep, nf, np_),
+                                    formula)
+        key = _sort_key(scores)
+        if (reverse):
+            key = -key
+
+        def ranks() -> Iterator[Rank]:
+            remaining = np.arange(len(scores))
+            size = 1
+            while (remaining.size > 0):
+                if (size < remaining.size):
+                    rem_key = key[remaining]
+                    last = rem_key[np.argpartition(rem_key, size-1)[size-1]]
+                    chunk = rem_key <= last
+                    selected, remaining = remaining[chunk], remaining[~chunk]
+                else:
+                    selected, remaining = remaining, remaining[:0]
+                ranking = Ranking(tiebrk)
+                for i in selected.tolist():
+                    ranking.append(groups[i], scores[i], exe[i])
+                ranking.sort(reverse)
+                yield from ranking
+                size *= 2
+        return ranks()
+
+    @staticmethod
+    def _scores(spec: Spectrum, vsus: 'VectorSuspicious',
+                formula: str) -> List[Union[int, float]]:
+        """
+        Return the scores of the given formula for each of the groups of the
+        spectrum, whose counts are given by `vsus`.
+        """
+        if (VectorSuspicious.has_formula(formula)):
+            return vsus.to_scores(formula, vsus.execute(formula))
+        return [Suspicious(e_f, spec.tf, e_p, spec.tp).execute(formula)
+                for e_f, e_p in zip(vsus.ef.tolist(), vsus.ep.tolist())]
+
+    @staticmethod
+    @versionchanged(version='2.6.0', reason='All names include the metrics '
+                    'registered in `flitsr.metric_expressions`')
     def getNames(all_names: bool = False) -> List[str]:
         if (all_names):
             _all_names = dir(Suspicious)
             names = [x for x in _all_names if (not x.startswith("_")
                      and x != "execute" and x != "getNames"
-                     and x != "apply_formula" and x != "inf")]
+                     and x != "apply_formula" and x != "apply_formulas"
+                     and x != "iter_formula" and x != "inf")]
+            names.extend(metric_expressions.metric_names())
         else:
             names = ['artemis', 'barinel', 'dstar', 'gp13', 'harmonic',
                      'hyperbolic', 'jaccard', 'naish2', 'ochiai', 'overlap',
@@ -382,6 +476,332 @@ class Suspicious():
         return h**(self.ep) * (1-h)**(11)
 
 
+def _div(nominator: Union[np.ndarray, float],
+         denominator: Union[np.ndarray, float]) -> np.ndarray:
+    """
+    Return nominator/denominator as floats wherever the denominator is
+    non-zero (the result elsewhere is meaningless, and should be masked).
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.asarray(nominator / np.where(denominator == 0, 1,
+                                               denominator), dtype=float)
+
+
+def _ratio(nominator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    """
+    Return nominator/denominator, which is 0.0 where the nominator is 0, and
+    otherwise infinite where the denominator is 0 (see `VectorSuspicious`).
+    """
+    return np.where(nominator == 0, 0.0,
+                    np.where(denominator == 0, np.inf,
+                             _div(nominator, denominator)))
+
+
+# The metrics whose scores do not depend on tf (or nf), i.e. on failing tests
+# that do not execute the element
+_TF_INDEPENDENT = frozenset(['euclid', 'gp13', 'hamming', 'm2', 'naish2',
+                             'sbi', 'wong1', 'wong2', 'wong3'])
+
+
+@versionadded(version='2.6.0')
+def depends_on_tf(metric: str) -> bool:
+    """
+    Return whether the scores of the given metric may depend on the total
+    number of failing tests (tf), and thus on the failing tests that do not
+    execute an element (nf). If not, an element's score only changes when
+    its own ef, ep or np counts change.
+    """
+    if (metric in _TF_INDEPENDENT):
+        return False
+    if (metric in metric_expressions.metric_names()):
+        counts = metric_expressions.get_metric(metric).counts
+        return not counts.isdisjoint(('tf', 'nf'))
+    return True
+
+
+@versionadded(version='2.6.0')
+class VectorSuspicious():
+    """
+    NumPy array implementations of the `Suspicious` metrics, which compute the
+    scores of many elements at once. Each metric has the same name, and gives
+    exactly the same scores (including for divisions by zero) as the
+    corresponding scalar `Suspicious` metric, except that the scalar
+    `Suspicious.inf` is given as ``numpy.inf`` (see `to_scores`).
+    """
+
+    def __init__(self, ef: np.ndarray, ep: np.ndarray, nf: np.ndarray,
+                 np_: np.ndarray):
+        """
+        The four basic count vectors that are parameters to the different
+        metrics, each of which has an entry per element.
+
+        Args:
+          ef: The number of failed tests that execute each element.
+          ep: The number of passed tests that execute each element.
+          nf: The number of failed tests that do not execute each element.
+          np_: The number of passed tests that do not execute each element.
+        """
+        self.ef = np.asarray(ef)
+        self.ep = np.asarray(ep)
+        self.nf = np.asarray(nf)
+        self.np = np.asarray(np_)
+        self.tf = self.ef + self.nf
+        self.tp = self.ep + self.np
+        # an upper bound on each count, used by `_exact`
+        self._n = int((self.tf + self.tp).max(initial=0))
+
+    def execute(self, metric: str) -> np.ndarray:
+        if (not hasattr(self, metric) and
+                metric in metric_expressions.metric_names()):
+            return metric_expressions.get_metric(metric)(self.ef, self.ep,
+                                                         self.nf, self.np)
+        func = getattr(self, metric)
+        return func()
+
+    @staticmethod
+    def has_formula(metric: str) -> bool:
+        """
+        Return whether the given metric has a vectorized implementation,
+        including the metrics registered in `flitsr.metric_expressions`.
+        """
+        return ((not metric.startswith('_') and
+                 callable(getattr(VectorSuspicious, metric, None)) and
+                 metric not in ('execute', 'has_formula', 'to_scores')) or
+                metric in metric_expressions.metric_names())
+
+    def to_scores(self, metric: str,
+                  scores: np.ndarray) -> List[Union[int, float]]:
+        """
+        Convert the scores computed for the given metric to a list of the
+        same Python values (and types) that `Suspicious` gives.
+        """
+        values = scores.tolist()
+        if (scores.dtype.kind == 'f'):
+            for i in np.flatnonzero(np.isinf(scores)).tolist():
+                values[i] = (Suspicious.inf if (values[i] > 0)
+                             else -Suspicious.inf)
+            if (metric == 'wong3'):  # integral for small ep
+                for i in np.flatnonzero(self.ep <= 2).tolist():
+                    values[i] = int(values[i])
+        return values
+
+    def _exact(self, magnitude: int,
+               limit: int = 2**53) -> 'VectorSuspicious':
+        """
+        Return counts for which any (integer) intermediate value up to the
+        given magnitude is exact, and converted to a float the same way as in
+        Python. If the magnitude exceeds `limit`, the counts are given as
+        Python integers (as object arrays), otherwise as they are.
+        """
+        if (magnitude < limit):
+            return self
+        return VectorSuspicious(self.ef.astype(object), self.ep.astype(object),
+                                self.nf.astype(object), self.np.astype(object))
+
+    def ample(self) -> np.ndarray:
+        t1 = np.where(self.ef == 0, 0.0, _div(self.ef, self.tf))
+        t2 = np.where(self.ep == 0, 0.0, _div(self.ep, self.tp))
+        return abs(t1 - t2)
+
+    def anderberg(self) -> np.ndarray:
+        denominator = (self.ef + 2*(self.nf + self.ep))
+        return np.where(self.ef == 0, 0.0, _div(self.ef, denominator))
+
+    def arith_mean(self) -> np.ndarray:
+        c = self._exact(4 * self._n**2)
+        denominator = (c.ef + c.ep)*(c.np + c.nf) + c.tf*c.tp
+        nominator = 2*c.ef*c.np - 2*c.nf*c.ep
+        return _ratio(nominator, denominator)
+
+    def cohen(self) -> np.ndarray:
+        c = self._exact(4 * self._n**2)
+        denominator = (c.ef + c.ep)*c.tp + c.tf*(c.nf + c.np)
+        nominator = 2*c.ef*c.np - 2*c.nf*c.ep
+        return _ratio(nominator, denominator)
+
+    def dice(self) -> np.ndarray:
+        denominator = self.tf + self.ep
+        return np.where(self.ef == 0, 0.0, _div(2*self.ef, denominator))
+
+    def euclid(self) -> np.ndarray:
+        return np.sqrt(self.ef + self.np)
+
+    def fleiss(self) -> np.ndarray:
+        c = self._exact(4 * self._n**3)
+        denominator = (2*c.ef*c.nf*c.ep) + (2*c.np*c.nf*c.ep)
+        nominator = (4*c.ef*c.np) - (4*c.nf*c.ep) - (c.nf - c.ep)**2
+        return _ratio(nominator, denominator)
+
+    def geometric(self) -> np.ndarray:
+        c = self._exact(self._n**4, limit=2**63)
+        denominator = np.sqrt(np.asarray(
+            (c.ef + c.ep)*(c.np + c.nf)*c.tf*c.tp, dtype=float))
+        nominator = c.ef*c.np - c.nf*c.ep
+        return _ratio(nominator, denominator)
+
+    def goodman(self) -> np.ndarray:
+        denominator = 2*self.ef + self.nf + self.ep
+        nominator = 2*self.ef - self.nf - self.ep
+        return _ratio(nominator, denominator)
+
+    def hamann(self) -> np.ndarray:
+        denominator = self.tf + self.tp
+        nominator = self.ef + self.np - self.nf - self.ep
+        return _ratio(nominator, denominator)
+
+    def hamming(self) -> np.ndarray:
+        return self.ef + self.np
+
+    def harmonic(self) -> np.ndarray:
+        c = self._exact(2 * self._n**4)
+        n1 = (c.ef*c.np - c.nf*c.ep)
+        n2 = ((c.ef + c.ep)*(c.np + c.nf) + c.tf*c.tp)
+        nominator = n1*n2
+        denominator = (c.ef + c.ep)*(c.np + c.nf)*c.tf*c.tp
+        return _ratio(nominator, denominator)
+
+    def jaccard(self) -> np.ndarray:
+        denominator = self.tf + self.ep
+        return np.where(self.ef == 0, 0.0, _div(self.ef, denominator))
+
+    def kulczynski1(self) -> np.ndarray:
+        return _ratio(self.ef, self.nf + self.ep)
+
+    def kulczynski2(self) -> np.ndarray:
+        t1 = np.where(self.ef == 0, 0.0, _div(self.ef, self.tf))
+        t2 = np.where(self.ef == 0, 0.0, _div(self.ef, self.ef + self.ep))
+        return 0.5*(t1 + t2)
+
+    def m1(self) -> np.ndarray:
+        return _ratio(self.ef + self.np, self.nf + self.ep)
+
+    def m2(self) -> np.ndarray:
+        denominator = self.ef + self.np + 2*(self.ef + self.ep)
+        return np.where(self.ef == 0, 0.0, _div(self.ef, denominator))
+
+    def ochiai(self) -> np.ndarray:
+        c = self._exact(self._n**2, limit=2**63)
+        denominator = np.sqrt(np.asarray(c.tf * (c.ef + c.ep), dtype=float))
+        return _ratio(self.ef, denominator)
+
+    def ochiai2(self) -> np.ndarray:
+        c = self._exact(self._n**4, limit=2**63)
+        nominator = c.ef*c.np
+        denominator = np.sqrt(np.asarray(
+            (c.ef + c.ep)*(c.np + c.nf)*c.tf*c.tp, dtype=float))
+        return _ratio(nominator, denominator)
+
+    def overlap(self) -> np.ndarray:
+        denominator = np.minimum(np.minimum(self.ef, self.nf), self.ep)
+        return _ratio(self.ef, denominator)
+
+    def rogers_tanimoto(self) -> np.ndarray:
+        nominator = self.ef + self.np
+        denominator = self.ef + self.np + 2*(self.nf + self.ep)
+        return _ratio(nominator, denominator)
+
+    def rogot1(self) -> np.ndarray:
+        t1 = np.where(self.ef == 0, 0.0,
+                      _div(self.ef, 2*self.ef + self.nf + self.ep))
+        t2 = np.where(self.np == 0, 0.0,
+                      _div(self.np, 2*self.np + self.nf + self.ep))
+        return 0.5*(t1 + t2)
+
+    def rogot2(self) -> np.ndarray:
+        t1 = np.where(self.ef == 0, 0.0, _div(self.ef, self.ef + self.ep))
+        t2 = np.where(self.ef == 0, 0.0, _div(self.ef, self.tf))
+        t3 = np.where(self.np == 0, 0.0, _div(self.np, self.tp))
+        t4 = np.where(self.np == 0, 0.0, _div(self.np, self.np + self.nf))
+        return 0.25*(t1 + t2 + t3 + t4)
+
+    def russell_rao(self) -> np.ndarray:
+        denominator = self.tf + self.tp
+        return np.where(self.ef == 0, 0.0, _div(self.ef, denominator))
+
+    def sbi(self) -> np.ndarray:
+        return np.where(self.ef == 0, 0.0, _div(self.ef, self.ef + self.ep))
+
+    def scott(self) -> np.ndarray:
+        c = self._exact(9 * self._n**2)
+        nominator = 4*c.ef*c.np - 4*c.nf*c.ep - (c.nf - c.ep)**2
+        denominator = (2*c.ef + c.nf + c.ep)*(2*c.np + c.nf + c.ep)
+        return _ratio(nominator, denominator)
+
+    def simpl_match(self) -> np.ndarray:
+        nominator = self.ef + self.np
+        denominator = self.tf + self.tp
+        return np.where(nominator == 0, 0.0, _div(nominator, denominator))
+
+    def sokal(self) -> np.ndarray:
+        nominator = 2*(self.ef + self.np)
+        denominator = nominator + self.nf + self.ep
+        return np.where(nominator == 0, 0.0, _div(nominator, denominator))
+
+    def sorensen_dice(self) -> np.ndarray:
+        nominator = 2*self.ef
+        denominator = nominator + self.nf + self.ep
+        return np.where(nominator == 0, 0.0, _div(nominator, denominator))
+
+    def tarantula(self) -> np.ndarray:
+        nominator = _div(self.ef, self.tf)
+        passed_component = np.where(self.ep == 0, 0.0,
+                                    _div(self.ep, self.tp))
+        denominator = nominator + passed_component
+        return np.where(self.ef == 0, 0.0, _div(nominator, denominator))
+
+    def wong1(self) -> np.ndarray:
+        return self.ef.copy()
+
+    def wong2(self) -> np.ndarray:
+        return self.ef - self.ep
+
+    def wong3(self) -> np.ndarray:
+        return np.where(self.ep <= 2, self.ef - self.ep,
+                        np.where(self.ep <= 10,
+                                 self.ef - (2 + 0.1*(self.ep - 2)),
+                                 self.ef - (2.8 + 0.001*(self.ep - 10))))
+
+    def zoltar(self) -> np.ndarray:
+        c = self._exact(10000 * self._n**2)
+        multifault_component = _div(10000*(c.nf*c.ep), c.ef)
+        denominator = self.tf + self.ep + multifault_component
+        return np.where(self.ef == 0, 0.0, _div(self.ef, denominator))
+
+    def naish2(self) -> np.ndarray:
+        return self.ef - _div(self.ep, self.tp + 1)
+
+    def dstar(self, p: int = 2) -> np.ndarray:
+        c = self._exact(self._n**p)
+        nominator = c.ef**p
+        denominator = c.ep + c.nf
+        return _ratio(nominator, denominator)
+
+    def gp13(self) -> np.ndarray:
+        denominator = 2*self.ep + self.ef
+        return np.where(self.ef == 0, 0.0,
+                        self.ef*(1 + _div(1, denominator)))
+
+    def hyperbolic(self) -> np.ndarray:
+        K1 = 0.375
+        K2 = 0.768
+        K3 = 0.711
+        t1 = _div(1, K1 + _div(self.nf, self.tf))
+        t2 = _div(K3, K2 + _div(self.ep, self.ef + self.ep))
+        return np.where((self.ef + self.ep == 0) | (self.tf == 0), 0.0,
+                        t1 + t2)
+
+    def barinel(self) -> np.ndarray:
+        h = np.where(self.ep == 0, 0.0, _div(self.ep, self.ep + self.ef))
+        # use Python's float power, which (unlike numpy's vectorized power
+        # on some platforms) is the same as for the scalar metric
+        scores = np.fromiter(map(pow, h.tolist(), self.ep.tolist()),
+                             dtype=float, count=len(h))
+        scores *= np.fromiter((x**11 for x in (1 - h).tolist()), dtype=float,
+                              count=len(h))
+        return np.where((self.nf == 0) | (self.ep + self.ef == 0), 0.0,
+                        scores)
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Prints the pre-selected "
                                      "list of popular metrics.")
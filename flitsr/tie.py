@@ -3,7 +3,8 @@ from itertools import permutations, chain
 from collections import defaultdict
 from math import factorial, ceil
 from typing import List, Any, Optional, Set, Dict, Tuple, Iterable, \
-        Collection, NamedTuple, Union, overload, Literal, Iterator, TypeVar
+        Collection, NamedTuple, Union, overload, Literal, Iterator, TypeVar, \
+        Mapping, AbstractSet
 from flitsr.spectrum import Spectrum
 from flitsr.ranking import Rankings, Ranking, Rank
 from flitsr.calculations.bu_model import BUModel
@@ -354,7 +355,7 @@ class Ties(Iterable[Tie]):
 
     @staticmethod
     def _get_faults(entities: Iterable[Spectrum.Entity],
-                    faults: Dict[Any, Set[Spectrum.Element]],
+                    faults: Mapping[Any, AbstractSet[Spectrum.Element]],
                     to_inspect: Dict[Any, int]) -> Tuple[
                     Dict[Any, _CollapsableFault],
                     Dict[Any, int]]:
@@ -0,0 +1,147 @@
+import random
+from flitsr.spectrum import Outcome
+from flitsr.input.spectrumBuilder import SpectrumBuilder
+from flitsr.advanced import flitsr
+from flitsr.advanced.flitsr import Flitsr, Multi
+from flitsr.args import Args
+from flitsr.suspicious import depends_on_tf
+from pytest import mark as pytestr
+
+
+def test_flitsr_many_steps():
+    # more independent failures than the default recursion limit
+    num = 1500
+    builder = SpectrumBuilder()
+    passing = builder.addTest('passing', Outcome.PASSED)
+    index = {}
+    for i in range(num):
+        test = builder.addTest(f'failing{i}', Outcome.FAILED)
+        elem = index[i] = builder.addElement([f'elem{i}'], [i])
+        builder.addExecution(test, elem)
+        if (i % 2 == 0):
+            builder.addExecution(passing, elem)
+    spectrum = builder.get_spectrum()
+    basis = Flitsr(Args([])).flitsr(spectrum, 'ochiai')
+    assert len(basis) == num
+    assert set(basis) == set(spectrum.groups())
+    # the odd elements are not executed by the passing test, so they are
+    # found first, and are last in the basis
+    odd = {elem for i, elem in index.items() if i % 2 == 1}
+    assert all(g[0] in odd for g in basis[num//2:])
+
+
+def test_flitsr_no_progress(monkeypatch):
+    builder = SpectrumBuilder()
+    test = builder.addTest('failing', Outcome.FAILED)
+    builder.addExecution(test, builder.addElement(['elem'], []))
+    spectrum = builder.get_spectrum()
+    # a step that explains no failing tests must not loop forever
+    monkeypatch.setattr(Flitsr, '_flitsr_step',
+                        lambda self, spectrum, r_iter: (next(r_iter), set()))
+    assert Flitsr(Args([])).flitsr(spectrum, 'ochiai') == []
+    assert spectrum.tf == 1
+
+
+@pytestr.parametrize('metric', ['wong2', 'hamming', 'gp13', 'ochiai'])
+@pytestr.randomize(seed=int, min_num=0, max_num=int(1e15), ncalls=5)
+def test_flitsr_live_ranking(monkeypatch, metric, seed):
+    rand = random.Random(seed)
+    builder = SpectrumBuilder()
+    elems = [builder.addElement([f'elem{i}'], [i] if i < 5 else [])
+             for i in range(60)]
+    for i in range(40):
+        test = builder.addTest(f'test{i}', Outcome.FAILED if i < 15
+                               else Outcome.PASSED)
+        for elem in rand.sample(elems[5:], rand.randint(1, 15)):
+            builder.addExecution(test, elem)
+        if (i < 15):
+            builder.addExecution(test, elems[i % 5])
+    spectrum = builder.get_spectrum()
+    ranker = Flitsr(Args([]))
+    # with (and without) the original ranking for tie breaking
+    ranking = ranker.rank(spectrum, metric)
+    basis = ranker.flitsr(spectrum, metric)
+    spectrum.reset(bucket='flitsr')
+    monkeypatch.setattr(flitsr._LiveRanking, 'create',
+                        lambda *args: None)
+    expected = ranker.rank(spectrum, metric)
+    assert [(r.entity, r.score) for r in ranking] == \
+        [(r.entity, r.score) for r in expected]
+    assert basis == ranker.flitsr(spectrum, metric)
+
+
+@pytestr.parametrize('ranker_type', [Flitsr, Multi])
+@pytestr.randomize(seed=int, min_num=0, max_num=int(1e15), ncalls=3)
+def test_rank_bases(ranker_type, seed):
+    rand = random.Random(seed)
+    builder = SpectrumBuilder()
+    elems = [builder.addElement([f'elem{i}'], [i] if i < 5 else [])
+             for i in range(40)]
+    for i in range(30):
+        test = builder.addTest(f'test{i}', Outcome.FAILED if i < 10
+                               else Outcome.PASSED)
+        for elem in rand.sample(elems, rand.randint(1, 10)):
+            builder.addExecution(test, elem)
+    spectrum = builder.get_spectrum()
+    # the bases are shared between all of the basis orderings
+    ranker = ranker_type(Args([]))
+    orig, bases = ranker.compute_bases(spectrum, 'ochiai')
+    for ordering in ['auto', 'conf', 'original', 'reverse', 'flitsr']:
+        ranking = ranker.rank_bases(spectrum, orig, bases, ordering)
+        ranker.order_method = ordering
+        expected = ranker.rank(spectrum, 'ochiai')
+        assert [(r.entity, r.score) for r in ranking] == \
+            [(r.entity, r.score) for r in expected]
+
+
+@pytestr.parametrize('ranker_type', [Flitsr, Multi])
+@pytestr.parametrize('metric', ['wong2', 'gp13', 'ochiai'])
+def test_flitsr_components(ranker_type, metric, monkeypatch):
+    rand = random.Random(metric)
+    builder = SpectrumBuilder()
+    for c in range(5):
+        elems = [builder.addElement([f'c{c}e{i}'], [c] if i == 0 else [])
+                 for i in range(15)]
+        for i in range(12):
+            test = builder.addTest(f'c{c}t{i}', Outcome.FAILED if i < 4
+                                   else Outcome.PASSED)
+            for elem in rand.sample(elems[1:], rand.randint(1, 6)):
+                builder.addExecution(test, elem)
+            if (i < 4 and rand.random() < 0.8):
+                builder.addExecution(test, elems[0])
+    spectrum = builder.get_spectrum()
+    assert len(spectrum.failure_components()) > 1
+    ranker = ranker_type(Args([]))
+    expected = ranker.rank(spectrum, metric)
+    # the components give exactly the same ranking (metrics that depend on
+    # the number of failing tests are not run over the components)
+    ranker.workers = 3
+    starts = []
+    start = flitsr._ComponentPool.start
+    monkeypatch.setattr(flitsr._ComponentPool, 'start',
+                        lambda pool, *args: starts.append(pool) or
+                        start(pool, *args))
+    ranking = ranker.rank(spectrum, metric)
+    # the workers are started once, and shared by all flitsr iterations
+    assert len(starts) == (0 if depends_on_tf(metric) else 1)
+    assert [(r.entity, r.score) for r in ranking] == \
+        [(r.entity, r.score) for r in expected]
+    assert spectrum.tf == 20
+
+
+def test_flitsr_components_duplicate_names():
+    builder = SpectrumBuilder()
+    elems = [builder.addElement([f'elem{i}'], [i]) for i in range(4)]
+    for i, name in enumerate(['t', 't', 'u', 'u']):
+        test = builder.addTest(name, Outcome.FAILED)
+        builder.addExecution(test, elems[i])
+    passing = builder.addTest('passing', Outcome.PASSED)
+    builder.addExecution(passing, elems[0])
+    spectrum = builder.get_spectrum()
+    assert len(spectrum.failure_components()) == 2
+    ranker = Flitsr(Args([]))
+    expected = ranker.flitsr(spectrum, 'wong2')
+    spectrum.reset(bucket='flitsr')
+    ranker.workers = 2
+    assert ranker.flitsr(spectrum, 'wong2') == expected
+    assert spectrum.tf == 4
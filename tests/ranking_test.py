@@ -0,0 +1,98 @@
+import random
+from flitsr.spectrum import Spectrum, Outcome
+from flitsr.input.spectrumBuilder import SpectrumBuilder
+from flitsr.suspicious import Suspicious
+from flitsr.ranking import Ranking, Tiebrk, set_orig, unset_orig, \
+        ranking_cache, cached_ranking
+from pytest import mark as pytestr
+
+
+def _reference_sort(ranks, orig, reverse):
+    """ The original (multi-pass) sort using the original ranking """
+    ranks = list(ranks)
+    ranks.sort(key=lambda x: orig.get_rank(x.entity, True).exec,
+               reverse=reverse)
+    ranks.sort(key=lambda x: orig.get_rank(x.entity, True).score,
+               reverse=reverse)
+    ranks.sort(key=lambda x: x.score, reverse=reverse)
+    return ranks
+
+
+@pytestr.parametrize('reverse', [True, False])
+@pytestr.randomize(seed=int, min_num=0, max_num=int(1e15), ncalls=5)
+def test_sort_orig(seed, reverse):
+    rand = random.Random(seed)
+    elems = [Spectrum.Element(['e'+str(i), 'm', str(i)], i, [])
+             for i in range(200)]
+    groups = [Spectrum.Group(elems[i:i+4], i) for i in range(0, 200, 4)]
+    huge = 2**64
+    orig = Ranking(Tiebrk.EXEC)
+    for group in groups:
+        orig.append(group, rand.choice([0.0, 0.5, 1, huge, huge+1]),
+                    rand.randint(0, 5))
+    orig.sort(True)
+    set_orig(orig)
+    try:
+        # rank elements and sub-groups of the original groups
+        ranking = Ranking(Tiebrk.ORIG)
+        for elem in elems[:100]:
+            ranking.append(elem, rand.randint(0, 3) / 3, rand.randint(0, 5))
+        for group in groups[25:]:
+            ranking.append(Spectrum.Group(list(group)[:2]),
+                           rand.randint(0, 3) / 3, rand.randint(0, 5))
+        expected = _reference_sort(ranking, orig, reverse)
+        ranking.sort(reverse)
+        assert [r.entity for r in ranking] == [r.entity for r in expected]
+    finally:
+        unset_orig()
+
+
+@pytestr.parametrize('reverse', [True, False])
+def test_sort_exec(reverse):
+    ranking = Ranking(Tiebrk.EXEC)
+    scores = [1, 2**70, 0.5, 2**70 + 1, 1.0, 0.5]
+    for i, score in enumerate(scores):
+        ranking.append(Spectrum.Element(['e'+str(i)], i, []), score, i % 2)
+    expected = sorted(sorted(ranking, key=lambda r: r.exec, reverse=reverse),
+                      key=lambda r: r.score, reverse=reverse)
+    ranking.sort(reverse)
+    assert [r.entity for r in ranking] == [r.entity for r in expected]
+
+
+def test_ranking_cache():
+    builder = SpectrumBuilder()
+    elems = [builder.addElement([f'e{i}'], []) for i in range(4)]
+    for i in range(4):
+        test = builder.addTest(f't{i}', Outcome.FAILED if i < 2
+                               else Outcome.PASSED)
+        for elem in elems[i:]:
+            builder.addExecution(test, elem)
+    spectrum = builder.get_spectrum()
+    calls = []
+
+    def rank(spec, tiebrk=Tiebrk.ORIG):
+        def compute():
+            calls.append(spec)
+            return Suspicious.apply_formula(spec, 'ochiai', tiebrk)
+        return cached_ranking(spec, 'ochiai', tiebrk, compute)
+    rank(spectrum)
+    rank(spectrum)
+    assert len(calls) == 2  # not cached outside of a cache context
+    with ranking_cache():
+        ranking = rank(spectrum)
+        # snapshots in the same state share the cached ranking
+        snapshot = spectrum.snapshot()
+        cached = rank(snapshot)
+        assert len(calls) == 3
+        assert cached is not ranking
+        assert [(r.entity, r.score) for r in cached] == \
+            [(r.entity, r.score) for r in ranking]
+        snapshot.remove_test(snapshot.failing()[0])
+        rank(snapshot)
+        rank(spectrum)
+        assert len(calls) == 4
+        snapshot.reset()
+        rank(snapshot)
+        rank(spectrum, Tiebrk.RNDM)
+        rank(spectrum, Tiebrk.RNDM)
+        assert len(calls) == 6
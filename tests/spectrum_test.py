@@ -0,0 +1,438 @@
+from flitsr.input import Input
+from flitsr.spectrum import Spectrum, Outcome, ElementTable
+from flitsr import coverage
+from flitsr.coverage import (DenseCoverage, SparseCoverage, PackedCoverage,
+                             CoverageType)
+import pytest
+import gc
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from bitarray import bitarray
+from numpy.testing import assert_array_equal
+from tests import resources
+from importlib.resources import files
+
+
+@pytest.fixture(params=[DenseCoverage, SparseCoverage, PackedCoverage])
+def spectrum(request, monkeypatch, tmp_path) -> Spectrum:
+    coverage_type = CoverageType.AUTO
+    if (request.param is SparseCoverage):
+        # force the automatic backend selection to choose sparse coverage
+        monkeypatch.setattr(coverage, 'SPARSE_MIN_CELLS', 0)
+        monkeypatch.setattr(coverage, 'SPARSE_DENSITY', 2)
+    elif (request.param is PackedCoverage):
+        monkeypatch.setattr(coverage, 'MMAP_DIR', str(tmp_path))
+        coverage_type = CoverageType.MMAP
+    inp_file = files(resources).joinpath("input").joinpath("motiv.tcm")
+    spectrum = Input.read_in(inp_file, compute_groups=True,
+                             coverage_type=coverage_type)
+    assert isinstance(spectrum._coverage, request.param)
+    return spectrum
+
+
+def _scan_tests(spectrum: Spectrum, entity: Spectrum.Entity,
+                only_failing: bool = False):
+    tests = spectrum.failing() if only_failing else spectrum.tests()
+    return {t for t in tests if spectrum[t][entity]}
+
+
+def test_get_tests_column_major(spectrum):
+    for group in spectrum.groups():
+        assert spectrum.get_tests(group) == _scan_tests(spectrum, group)
+        assert (spectrum.get_tests(group, only_failing=True) ==
+                _scan_tests(spectrum, group, only_failing=True))
+    for elem in spectrum.elements():
+        assert spectrum.get_tests(elem) == _scan_tests(spectrum, elem)
+
+
+def test_get_tests_after_removal(spectrum):
+    group = spectrum.groups()[0]
+    removed = spectrum.get_tests(group, only_failing=True, remove=True)
+    assert len(removed) > 0
+    assert spectrum.get_tests(group, only_failing=True) == set()
+    other = spectrum.tests()[0]
+    spectrum.remove_execution(other, group)
+    assert other not in spectrum.get_tests(group)
+    spectrum.reset()
+    assert spectrum.get_tests(group, only_failing=True) == removed
+
+
+def test_count_vectors(spectrum):
+    spectrum.get_tests(spectrum.groups()[1], only_failing=True, remove=True)
+    spectrum.remove_group(spectrum.groups()[0])
+    ef, ep, nf, np_ = spectrum.counts()
+    for i, group in enumerate(spectrum.groups()):
+        tests = _scan_tests(spectrum, group)
+        failing = _scan_tests(spectrum, group, only_failing=True)
+        assert spectrum.f[group] == ef[i] == len(failing)
+        assert spectrum.p[group] == ep[i] == len(tests) - len(failing)
+        assert nf[i] == spectrum.tf - ef[i]
+        assert np_[i] == spectrum.tp - ep[i]
+    assert len(spectrum.f) == spectrum.locs() == len(ef)
+    spectrum.reset()
+    assert len(spectrum.p) == len(spectrum.groups())
+
+
+def test_remove_restore_tests(spectrum):
+    tests = spectrum.tests()
+    failing = spectrum.failing()
+    tp, tf = spectrum.tp, spectrum.tf
+    spectrum.remove_test(failing[0])
+    spectrum.remove_test(failing[0])  # removing twice is a no-op
+    spectrum.remove_test(tests[-1], bucket='other')
+    assert len(spectrum) == len(tests) - 2
+    assert failing[0] not in spectrum.tests()
+    assert spectrum.failing() == failing[1:]
+    assert spectrum.tf == tf - 1
+    spectrum.reset('other')
+    assert tests[-1] in spectrum.tests()
+    assert failing[0] not in spectrum.tests()
+    spectrum.reset_single_test(failing[0])
+    assert spectrum.tests() == tests
+    assert spectrum.failing() == failing
+    assert (spectrum.tp, spectrum.tf) == (tp, tf)
+
+
+def test_remove_duplicate_test_names(tmp_path):
+    inp_file = tmp_path.joinpath("dup.tcm")
+    inp_file.write_text("#tests\nt FAILED\nt FAILED\nu PASSED\n\n"
+                        "#uuts\na\nb\n\n#matrix\n0 1 1 1\n1 1\n0 1\n")
+    spectrum = Input.read_in(str(inp_file))
+    assert spectrum.tf == 2
+    for test in spectrum.failing():
+        spectrum.remove_test(test)
+    assert spectrum.tf == 0
+    assert spectrum.failing() == []
+    spectrum.reset()
+    assert spectrum.tf == 2
+
+
+def test_reset_buckets(spectrum):
+    groups = spectrum.groups()
+    counts = spectrum.counts()
+    spectrum.get_tests(groups[1], only_failing=True, remove=True,
+                       bucket='a')
+    spectrum.remove_group(groups[0], bucket='a')
+    removed_b = spectrum.get_tests(groups[-1], remove=True, bucket='b')
+    assert set(spectrum.get_removed_tests('b')) == removed_b
+    test = next(iter(removed_b))
+    spectrum.reset_single_test(test)
+    assert test in spectrum.tests()
+    with pytest.raises(KeyError):
+        spectrum.reset_single_test(test)
+    spectrum.reset(['a', 'missing'])
+    assert spectrum.groups() == groups
+    spectrum.reset('b')
+    assert spectrum.get_removed_tests(None) == []
+    for orig, new in zip(counts, spectrum.counts()):
+        assert (orig == new).all()
+
+
+def test_snapshot(spectrum):
+    group = spectrum.groups()[0]
+    spectrum.remove_test(spectrum.failing()[0], bucket='a')
+    snap = spectrum.snapshot()
+    assert snap.tests() == spectrum.tests()
+    assert snap.get_removed_tests('a') == spectrum.get_removed_tests('a')
+    # removals are independent
+    snap.get_tests(group, only_failing=True, remove=True)
+    snap.remove_group(group)
+    assert spectrum.tf > snap.tf
+    assert group in spectrum.groups() and group not in snap.groups()
+    # coverage is copied on write
+    test = next(iter(spectrum.get_tests(group, only_failing=True)))
+    snap.remove_execution(test, group)
+    assert not snap[test][group] and spectrum[test][group]
+    assert test in spectrum.get_tests(group)
+    snap.reset()
+    spectrum.reset()
+    assert spectrum.f[group] == snap.f[group] + 1
+    # once the snapshots are gone, the coverage is no longer copied
+    coverage = spectrum._coverage
+    del snap
+    spectrum.snapshot()
+    gc.collect()
+    spectrum.remove_execution(test, group)
+    assert spectrum._coverage is coverage
+    snap = spectrum.snapshot()
+    test = next(iter(spectrum.get_tests(group)))
+    spectrum.remove_execution(test, group)
+    assert spectrum._coverage is not coverage and snap[test][group]
+
+
+def _scan_matrix(spectrum: Spectrum):
+    groups = spectrum.groups()
+    return ([[spectrum[t][g] for g in groups] for t in spectrum.tests()],
+            [t.outcome is not Outcome.PASSED for t in spectrum.tests()])
+
+
+def test_to_matrix(spectrum):
+    matrix, err = spectrum.to_matrix()
+    assert matrix.shape == (len(spectrum.tests()), spectrum.locs())
+    assert_array_equal(matrix, _scan_matrix(spectrum)[0])
+    assert spectrum.to_matrix()[0] is matrix  # cached until changed
+    spectrum.get_tests(spectrum.groups()[2], remove=True)
+    spectrum.remove_group(spectrum.groups()[0])
+    spectrum.remove_execution(spectrum.tests()[0], spectrum.groups()[1])
+    matrix, err = spectrum.to_matrix()
+    exp_matrix, exp_err = _scan_matrix(spectrum)
+    assert_array_equal(matrix, exp_matrix)
+    assert_array_equal(err, exp_err)
+
+
+def test_coverage_backends_match_dense():
+    rows = [[0, 3], [], [1, 2, 3], [3]]
+    dense = DenseCoverage(rows, 5)
+    sparse = SparseCoverage(rows, 5)
+    mapped = PackedCoverage.mapped(iter(rows), len(rows), 5)
+    assert isinstance(mapped._rows, np.memmap)
+    mask = bitarray('1011')
+    for cov in (dense, sparse, mapped):
+        cov.set(1, 4, True)
+        cov.set(2, 2, False)
+        cov.set(0, 0, True)
+    mapped_copy = mapped.copy()
+    assert isinstance(mapped_copy._columns, np.memmap)
+    for cov in (sparse, mapped, mapped_copy):
+        assert_array_equal(cov.to_dense(), dense.to_dense())
+        assert_array_equal(cov.column_counts(mask), dense.column_counts(mask))
+        for t in range(4):
+            assert list(cov.row(t)) == list(dense.row(t))
+            assert cov.row_bits(t) == dense.row_bits(t)
+        for g in range(5):
+            assert list(cov.column_and(g, mask)) == \
+                list(dense.column_and(g, mask))
+        assert cov.nnz() == dense.nnz() == 6
+    # the looked up rows are updated along with the coverage
+    for cov in (dense, sparse, mapped):
+        cov.set(3, 1, True)
+        assert list(cov.row(3)) == [1, 3]
+    # only the most recently looked up rows are cached
+    mapped = PackedCoverage.mapped(iter(rows), len(rows), 5)
+    mapped._ROW_CACHE = 2
+    for t in [0, 1, 2, 1]:
+        mapped.row(t)
+    assert list(mapped._row_cache) == [2, 1]
+
+
+def test_executed_entities(spectrum):
+    group = spectrum.groups()[1]
+    spectrum.remove_group(group)
+    for test in spectrum.tests():
+        assert spectrum.get_executed_groups(test) == \
+            {g for g in spectrum.groups() if spectrum[test][g]}
+        assert spectrum.get_executed_elements(test) == \
+            {e for e in spectrum.elements() if spectrum[test][e]}
+
+
+def test_common_executed_groups(spectrum):
+    failing = spectrum.failing()
+    for i in range(len(failing)):
+        tests = failing[:i+1]
+        expected = set(spectrum.groups())
+        for test in tests:
+            expected &= spectrum.get_executed_groups(test)
+        assert spectrum.common_executed_groups(tests) == expected
+    assert spectrum.common_executed_groups([]) == set(spectrum.groups())
+
+
+def test_executes_any_group(spectrum):
+    groups = spectrum.groups()
+    for group in groups[::2]:
+        spectrum.remove_group(group)
+    for test in spectrum.tests():
+        assert spectrum.executes_any_group(test) == \
+            (len(spectrum.get_executed_groups(test)) > 0)
+    spectrum.reset()
+
+
+def test_failure_components(spectrum):
+    components = spectrum.failure_components()
+    assert sorted(t.name for c in components for t in c) == \
+        sorted(t.name for t in spectrum.failing())
+    executed = [set().union(*(spectrum.get_executed_groups(t) for t in c))
+                for c in components]
+    for i, groups in enumerate(executed):
+        assert all(groups.isdisjoint(other) for other in executed[i+1:])
+    # removing the shared groups splits the components
+    for group in spectrum.groups():
+        spectrum.remove_group(group)
+    assert len(spectrum.failure_components()) == spectrum.tf
+    spectrum.reset()
+
+
+def test_fingerprint(spectrum):
+    snapshot = spectrum.snapshot()
+    assert snapshot.fingerprint() == spectrum.fingerprint()
+    test = spectrum.failing()[0]
+    group = next(iter(spectrum.get_executed_groups(test)))
+    fingerprints = {spectrum.fingerprint()}
+    # every change to the counts or coverage gives a new fingerprint
+    spectrum.remove_execution(test, group, hard=False)
+    fingerprints.add(spectrum.fingerprint())
+    spectrum.p[group] = spectrum.p[group] + 1
+    fingerprints.add(spectrum.fingerprint())
+    spectrum.remove_execution(test, group)
+    fingerprints.add(spectrum.fingerprint())
+    assert len(fingerprints) == 4
+    assert snapshot.fingerprint() in fingerprints
+    assert snapshot.fingerprint() != spectrum.fingerprint()
+
+
+def test_columnar_elements():
+    inp_file = files(resources).joinpath("input").joinpath("motiv.tcm")
+    plain = Input.read_in(inp_file, compute_groups=True)
+    columnar = Input.read_in(inp_file, compute_groups=True,
+                             columnar_elements=True)
+    assert all(e._table is not None for e in columnar.elements())
+    assert columnar.elements() == plain.elements()
+    for elem, other in zip(columnar.elements(), plain.elements()):
+        assert hash(elem) == hash(other)
+        assert str(elem) == str(other)
+        assert elem.details == other.details
+        assert (elem.path, elem.method, elem.line) == \
+            (other.path, other.method, other.line)
+        assert elem.faults == other.faults
+    assert columnar.get_faults() == plain.get_faults()
+    assert columnar.groups() == plain.groups()
+
+
+def test_element_table():
+    table = ElementTable()
+    elem = table.add(['a.B', 'm', '3'], 0, [])
+    other = table.add(['a.B', 'm', '4'], 1, [0])
+    assert table._strings == ['a.B', 'm']
+    assert elem == Spectrum.Element(['a.B', 'm', '3'], 0, [])
+    assert not elem.isFaulty() and other.isFaulty()
+    # reading the faults does not add them to the table
+    elem.faults.append(1)
+    assert not elem.isFaulty() and elem.faults == []
+    assert table._faults == {1: [0]}
+    elem.faults = [1]
+    assert elem.isFaulty() and elem.faults == [1]
+    other.faults = []
+    assert not other.isFaulty()
+
+
+def _scan_faults(spectrum: Spectrum):
+    faults = {}
+    for group in spectrum.groups():
+        for elem in group:
+            for fault in elem.faults:
+                faults.setdefault(fault, set()).add(elem)
+    return faults
+
+
+def test_fault_index(spectrum):
+    faults = spectrum.get_faults()
+    assert faults == _scan_faults(spectrum)
+    with pytest.raises(TypeError):
+        faults['new'] = set()
+    faulty = next(iter(faults[next(iter(faults))]))
+    spectrum.remove_group(spectrum.get_group(faulty))
+    assert spectrum.get_faults() == _scan_faults(spectrum)
+    spectrum.reset()
+    other = next(e for e in spectrum.elements() if not e.isFaulty())
+    spectrum.set_faults({faulty: [], other: ['new']})
+    assert spectrum.get_faults() == _scan_faults(spectrum)
+    assert spectrum.get_faults()['new'] == {other}
+
+
+def test_search(spectrum):
+    parts = ['', 'c', 'c1', 'l1', 'l10', 'FAULT', 'AULT 0', '([l6', 'x']
+    spectrum.remove_test(spectrum.tests()[1], bucket='search')
+    spectrum.remove_group(spectrum.groups()[0])
+    for part in parts:
+        assert spectrum.search_tests(part) == \
+            [t for t in spectrum.tests() if part in t.name]
+        assert spectrum.search_tests(part, incl_removed=True) == \
+            [t for t in spectrum.tests() if part in t.name] + \
+            [t for t in spectrum._all_removed_tests() if part in t.name]
+        assert spectrum.search_elements(part) == \
+            [e for e in spectrum.elements() if part in str(e)]
+        assert spectrum.search_elements(part, groups=True) == \
+            [g for g in spectrum.groups() if part in str(g)]
+    # the index is rebuilt when the element names change
+    elem = spectrum.search_elements('FAULT')[0]
+    spectrum.set_faults({elem: []})
+    assert elem not in spectrum.search_elements('FAULT')
+
+
+def _rank_all(spectrum):
+    from flitsr.advanced.sbfl import SBFL
+    from flitsr.advanced.flitsr import Flitsr
+    from flitsr.args import Args
+    rankers = (SBFL(), Flitsr(Args([])))
+    return [[(str(r.entity), r.score) for r in ranker.rank(spectrum, metric)]
+            for ranker in rankers for metric in ('ochiai', 'dstar')]
+
+
+def test_spectrum_view(spectrum):
+    view = spectrum.view()
+    tests = spectrum.tests()
+    spectrum.remove_test(tests[0])
+    spectrum.remove_group(spectrum.groups()[0])
+    spectrum.reset()
+    assert view.tests() == tests
+    for mutate in (lambda: view.remove_test(tests[0]),
+                   lambda: view.remove_group(view.groups()[0]),
+                   lambda: view.retain_groups(view.groups()[:1]),
+                   lambda: view.reset(),
+                   lambda: view[tests[0]].update(view.groups()[0], True),
+                   lambda: view.p.__setitem__(view.groups()[0], 0),
+                   lambda: view.get_tests(view.groups()[0], remove=True)):
+        with pytest.raises(TypeError):
+            mutate()
+    # iteration is reentrant
+    assert [(e1.test, e2.test) for e1 in view for e2 in view] == \
+        [(t1, t2) for t1 in tests for t2 in tests]
+    assert [list(ex) for ex in view] == \
+        [[ex[g] for g in view.groups()] for ex in view]
+    snap = view.snapshot()
+    snap.remove_test(tests[0])
+    assert view.tests() == tests
+    # searching a snapshot does not touch the caches of the view
+    indices = view._search_indices
+    snap.search_tests(tests[0].name)
+    assert view._search_indices is indices and 'tests' not in indices
+    # rankers can share the view across threads
+    expected = _rank_all(spectrum)
+    with ThreadPoolExecutor(4) as pool:
+        results = list(pool.map(_rank_all, [view] * 8))
+    assert all(result == expected for result in results)
+
+
+def _attached_summary(name):
+    spectrum = Spectrum.attach(name)
+    return ([str(t) for t in spectrum.tests()],
+            [str(e) for e in spectrum.elements()],
+            spectrum.to_matrix()[0].tolist())
+
+
+def test_shared_spectrum(spectrum):
+    spectrum.remove_test(spectrum.failing()[0])
+    name = spectrum.to_shared()
+    try:
+        spectrum.reset()
+        attached = Spectrum.attach(name)
+        assert attached.tests() == spectrum.tests()
+        assert attached.elements() == spectrum.elements()
+        assert attached.groups() == spectrum.groups()
+        assert attached.get_faults() == spectrum.get_faults()
+        for group in spectrum.groups():
+            assert attached.p[group] == spectrum.p[group]
+            assert attached.f[group] == spectrum.f[group]
+        assert_array_equal(attached.to_matrix()[0], spectrum.to_matrix()[0])
+        # modifying the attached spectrum leaves the shared copy untouched
+        test, group = attached.failing()[0], attached.groups()[0]
+        attached.remove_execution(test, group)
+        assert not attached[test][group]
+        assert Spectrum.attach(name)[test][group] == spectrum[test][group]
+        with multiprocessing.get_context('spawn').Pool(1) as pool:
+            tests, elements, matrix = pool.apply(_attached_summary, (name,))
+        assert tests == [str(t) for t in spectrum.tests()]
+        assert elements == [str(e) for e in spectrum.elements()]
+        assert matrix == spectrum.to_matrix()[0].tolist()
+    finally:
+        spectrum.release_shared()
@@ -1,4 +1,13 @@
-from flitsr.suspicious import Suspicious
+import random
+import numpy
+from flitsr.suspicious import Suspicious, VectorSuspicious, depends_on_tf
+from flitsr.ranking import Tiebrk
+from flitsr import metric_expressions
+from flitsr.input import Input
+from flitsr.advanced.sbfl import SBFL
+from tests import resources
+from importlib.resources import files
+import pytest
 from pytest import mark as pytestr
 
 
@@ -14,3 +23,124 @@ def test_metrics(metric, ef, nf, ep, np):
             assert ans <= 0.0
     except NotImplementedError:
         pass
+
+
+def _assert_matches_scalar(metric, tf, tp, ef, ep):
+    vsus = VectorSuspicious(numpy.array(ef), numpy.array(ep),
+                            tf - numpy.array(ef), tp - numpy.array(ep))
+    scores = vsus.to_scores(metric, vsus.execute(metric))
+    for e_f, e_p, score in zip(ef, ep, scores):
+        expected = Suspicious(e_f, tf, e_p, tp).execute(metric)
+        assert score == expected and type(score) is type(expected), \
+            (e_f, tf, e_p, tp)
+
+
+@pytestr.parametrize('metric', Suspicious.getNames(True))
+def test_vector_metrics_small(metric):
+    # all counts for small spectra, including every division by zero
+    for tf in range(5):
+        for tp in range(5):
+            pairs = [(e_f, e_p) for e_f in range(tf+1) for e_p in range(tp+1)]
+            _assert_matches_scalar(metric, tf, tp, [p[0] for p in pairs],
+                                   [p[1] for p in pairs])
+
+
+@pytestr.parametrize('metric', Suspicious.getNames(True))
+@pytestr.randomize(seed=int, tf=int, tp=int, min_num=1, max_num=10**6,
+                   ncalls=4)
+def test_vector_metrics(metric, seed, tf, tp):
+    rand = random.Random(seed)
+    ef = [rand.randint(0, tf) for _ in range(100)] + [0, tf]
+    ep = [rand.randint(0, tp) for _ in range(100)] + [0, tp]
+    _assert_matches_scalar(metric, tf, tp, ef, ep)
+
+
+def test_apply_formulas():
+    inp_file = files(resources).joinpath("input").joinpath("motiv.tcm")
+    spectrum = Input.read_in(inp_file, compute_groups=True)
+    metrics = Suspicious.getNames(True)
+    rankings = Suspicious.apply_formulas(spectrum, metrics, Tiebrk.EXEC)
+    assert list(rankings) == metrics
+    for metric in metrics:
+        single = Suspicious.apply_formula(spectrum, metric, Tiebrk.EXEC)
+        assert [(r.entity, r.score, r.exec) for r in rankings[metric]] == \
+            [(r.entity, r.score, r.exec) for r in single]
+
+
+def test_metric_expressions(monkeypatch):
+    monkeypatch.setattr(metric_expressions, '_metrics', {})
+    metric_expressions.register_metric('my_ochiai',
+                                       'ef / sqrt(tf * (ef + ep))')
+    assert 'my_ochiai' in Suspicious.getNames(True)
+    assert VectorSuspicious.has_formula('my_ochiai')
+    inp_file = files(resources).joinpath("input").joinpath("motiv.tcm")
+    spectrum = Input.read_in(inp_file, compute_groups=True)
+    rankings = Suspicious.apply_formulas(spectrum, ['ochiai', 'my_ochiai'],
+                                         Tiebrk.EXEC)
+    assert [(r.entity, r.exec) for r in rankings['ochiai']] == \
+        [(r.entity, r.exec) for r in rankings['my_ochiai']]
+    for r1, r2 in zip(rankings['ochiai'], rankings['my_ochiai']):
+        assert r1.score == pytest.approx(r2.score)
+    assert Suspicious(3, 4, 1, 5).execute('my_ochiai') == \
+        pytest.approx(Suspicious(3, 4, 1, 5).execute('ochiai'))
+
+
+def test_metric_expression_division(monkeypatch):
+    monkeypatch.setattr(metric_expressions, '_metrics', {})
+    metric_expressions.register_metric('ratio', 'ef / ep')
+    metric_expressions.register_metric('neg_ratio', '-(ef / ep)')
+    assert Suspicious(0, 4, 0, 5).execute('ratio') == 0.0
+    assert Suspicious(2, 4, 0, 5).execute('ratio') == Suspicious.inf
+    assert Suspicious(2, 4, 0, 5).execute('neg_ratio') == -Suspicious.inf
+    assert Suspicious(2, 4, 4, 5).execute('ratio') == 0.5
+    vsus = VectorSuspicious(numpy.array([0, 2, 2]), numpy.array([0, 0, 4]),
+                            numpy.array([4, 2, 2]), numpy.array([5, 5, 1]))
+    assert vsus.to_scores('ratio', vsus.execute('ratio')) == \
+        [0.0, Suspicious.inf, 0.5]
+    assert vsus.to_scores('neg_ratio', vsus.execute('neg_ratio')) == \
+        [0.0, -Suspicious.inf, -0.5]
+
+
+@pytestr.parametrize('expression', ['ef.real', '__import__("os")', 'foo',
+                                    'ef +', 'ef if ep else np', '"ef"',
+                                    'sqrt(x=ef)', 'lambda: ef'])
+def test_invalid_metric_expressions(expression):
+    with pytest.raises(ValueError):
+        metric_expressions.compile_metric(expression)
+
+
+def test_metric_expression_names(monkeypatch):
+    monkeypatch.setattr(metric_expressions, '_metrics', {})
+    for name in ['ochiai', 'execute', '_private', 'not a name']:
+        with pytest.raises(ValueError):
+            metric_expressions.register_metric(name, 'ef')
+    assert metric_expressions.metric_names() == []
+    assert metric_expressions.compile_metric('ef - ep') is \
+        metric_expressions.compile_metric('ef - ep')
+
+
+@pytestr.parametrize('tiebrk', [Tiebrk.EXEC, Tiebrk.ORIG])
+@pytestr.parametrize('reverse', [True, False])
+def test_iter_formula(tiebrk, reverse):
+    inp_file = files(resources).joinpath("input").joinpath("motiv.tcm")
+    spectrum = Input.read_in(inp_file, compute_groups=True)
+    for metric in Suspicious.getNames(True):
+        ranking = Suspicious.apply_formula(spectrum, metric, tiebrk, reverse)
+        ranks = Suspicious.iter_formula(spectrum, metric, tiebrk, reverse)
+        assert [(r.entity, r.score, r.exec) for r in ranks] == \
+            [(r.entity, r.score, r.exec) for r in ranking]
+    top = SBFL(tiebrk).top_k(spectrum, 'ochiai', 3)
+    assert [r.entity for r in top] == \
+        [r.entity for r in list(SBFL(tiebrk).rank(spectrum, 'ochiai'))[:3]]
+
+
+@pytestr.parametrize('metric', [m for m in Suspicious.getNames(True)
+                                if not depends_on_tf(m)])
+def test_tf_independent_metrics(metric):
+    for tf in range(1, 5):
+        for tp in range(5):
+            for e_f in range(tf+1):
+                for e_p in range(tp+1):
+                    score = Suspicious(e_f, tf, e_p, tp).execute(metric)
+                    assert Suspicious(e_f, tf+3, e_p, tp).execute(metric) \
+                        == score